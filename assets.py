@@ -0,0 +1,298 @@
+"""Folha de estilos e fontes como arquivos estáticos com hash no nome.
+
+O CSS global saía num st.markdown a cada rerun de cada sessão e ainda
+importava as fontes do Google Fonts. Agora ele mora em
+assets/neuros.css; na inicialização (serve.py) o processo monta
+neuros.<hash>.css em memória e a página só leva um <link> para ele.
+Nada é gravado na árvore do app: o serve.py põe GeneratedStatic na
+frente do Starlette do Streamlit, que responde os arquivos gerados
+(publish) em /app/static. Como o nome muda quando o conteúdo muda, o
+arquivo pode ser guardado pelo navegador indefinidamente
+(`Cache-Control: immutable`, também nos nomes com hash de static/, via
+ImmutableStatic); o servidor auxiliar (/assets) faz o mesmo. Rodando
+`streamlit run fm.py` direto, sem o middleware, o CSS volta a ir
+inline na página.
+
+Para um CDN (NEUROS_ASSETS_BASE_URL), `python assets.py css --out DIR`
+grava o neuros.<hash>.css no diretório de build.
+
+Fontes: `python assets.py fonts Montserrat.ttf SpaceGrotesk.ttf` recorta
+as fontes (variáveis, OFL) para o subconjunto latino e grava
+static/fonts/<família>.<hash>.woff2; as regras @font-face entram no CSS
+gerado. Os woff2 não vêm no repositório: enquanto static/fonts/ não
+tiver fontes, o CSS gerado segue importando as do Google Fonts, como
+antes. O recorte exige fontTools e brotli, só na máquina que gera os
+arquivos.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import settings
+import sidecar
+
+SOURCE_CSS = settings.BASE_DIR / "assets" / "neuros.css"
+STATIC_DIR = settings.BASE_DIR / "static"
+FONTS_DIR = STATIC_DIR / "fonts"
+FONTS_INDEX = FONTS_DIR / "fonts.json"
+
+# Latim básico + Latim-1 + pontuação comum: cobre o português da página.
+LATIN_UNICODES = "U+0000-00FF,U+0131,U+0152-0153,U+02C6,U+02DA,U+02DC,U+2000-206F,U+20AC,U+2122"
+
+# Família CSS -> (peso mínimo, peso máximo) usados pela página.
+FAMILIES = {
+    "Montserrat": (400, 800),
+    "Space Grotesk": (500, 700),
+}
+
+# Até existirem woff2 recortados em static/fonts/.
+REMOTE_FONTS = ("https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800"
+                "&family=Space+Grotesk:wght@500;700&display=swap")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Arquivos de static/ cujo nome leva o hash do conteúdo.
+HASHED = re.compile(r"/app/static/(?:neuros|fonts/[\w-]+)\.[0-9a-f]{10}\.(?:css|woff2)$")
+
+# Arquivos gerados pelo processo: nome em /app/static -> (tipo, Cache-Control, corpo).
+_generated = {}
+
+# GeneratedStatic instalado (serve.py): os gerados têm URL na mesma origem.
+_mounted = False
+
+_stylesheet = None
+_inline = None
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def static_base() -> str:
+    """Caminho absoluto de /app/static, com o server.baseUrlPath do Streamlit."""
+    from streamlit import config
+
+    prefix = (config.get_option("server.baseUrlPath") or "").strip("/")
+    return f"/{prefix}/app/static" if prefix else "/app/static"
+
+
+def publish(name: str, data: bytes, content_type: str, cache_control: str = IMMUTABLE):
+    """Disponibiliza `data` como /app/static/<name> (e /assets/<name>)."""
+    _generated[name] = (content_type, cache_control, data)
+
+
+def _font_faces(fonts_url: str) -> str:
+    try:
+        fonts = json.loads(FONTS_INDEX.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        fonts = {}
+    rules = []
+    for family, filename in sorted(fonts.items()):
+        low, high = FAMILIES.get(family, (400, 700))
+        rules.append(
+            "@font-face {\n"
+            f"    font-family: '{family}';\n"
+            f"    src: local('{family}'), url('{fonts_url}/{filename}') format('woff2');\n"
+            f"    font-weight: {low} {high};\n"
+            "    font-style: normal;\n"
+            "    font-display: swap;\n"
+            f"    unicode-range: {LATIN_UNICODES};\n"
+            "}\n"
+        )
+    return "\n".join(rules)
+
+
+def _font_rules(fonts_url: str = "fonts") -> str:
+    """@font-face das fontes recortadas ou, sem elas, o @import remoto."""
+    return _font_faces(fonts_url) or f"@import url('{REMOTE_FONTS}');\n"
+
+
+def build_stylesheet(fonts_url: str = "fonts") -> tuple:
+    """(nome com hash, conteúdo) do CSS global."""
+    data = (_font_rules(fonts_url) + "\n").encode() + SOURCE_CSS.read_bytes()
+    return f"neuros.{_digest(data)}.css", data
+
+
+def publish_stylesheet() -> str:
+    """Monta o CSS global em memória, publica-o e devolve o nome."""
+    global _stylesheet
+    name, data = build_stylesheet()
+    publish(name, data, "text/css; charset=utf-8")
+    _stylesheet = name
+    return name
+
+
+def stylesheet_href():
+    """URL do CSS global, ou None se não há quem o sirva (CSS vai inline).
+
+    O CSS é montado uma vez por processo — na inicialização, pelo
+    serve.py.
+    """
+    if _stylesheet is None:
+        publish_stylesheet()
+    base = settings.ASSETS_BASE_URL
+    if not base:
+        return f"{static_base()}/{_stylesheet}" if _mounted else None
+    if base.startswith(settings.SIDECAR_PUBLIC_URL):
+        sidecar.ensure_started()
+    return f"{base}/{_stylesheet}"
+
+
+def head_html() -> str:
+    """Única marcação enviada por rerun no lugar do antigo bloco <style>."""
+    global _inline
+    href = stylesheet_href()
+    if href is None:
+        if _inline is None:
+            _inline = build_stylesheet(f"{static_base()}/fonts")[1].decode()
+        style = f"<style>{_inline}</style>"
+    else:
+        style = f'<link rel="stylesheet" href="{href}">'
+    return style + '<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=yes">'
+
+
+def middleware() -> list:
+    """Middlewares ASGI para o Starlette do Streamlit (ver serve.py)."""
+    from starlette.middleware import Middleware
+
+    global _mounted
+    _mounted = True
+    return [Middleware(GeneratedStatic), Middleware(ImmutableStatic)]
+
+
+class GeneratedStatic:
+    """Middleware ASGI: responde em /app/static os arquivos de `publish`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        found = None
+        if scope["type"] == "http" and scope.get("method") in ("GET", "HEAD"):
+            base = static_base() + "/"
+            path = scope.get("path", "")
+            if path.startswith(base):
+                found = _generated.get(path[len(base):])
+        if found is None:
+            await self.app(scope, receive, send)
+            return
+        content_type, cache_control, body = found
+        etag = f'"{_digest(body)}"'.encode()
+        headers = [(b"cache-control", cache_control.encode()), (b"etag", etag)]
+        if etag in dict(scope.get("headers", ())).get(b"if-none-match", b""):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers += [(b"content-type", content_type.encode()),
+                    (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+class ImmutableStatic:
+    """Middleware ASGI: cache longo para os arquivos com hash de static/.
+
+    O Streamlit serve static/ só com ETag, e o navegador revalidaria as
+    fontes a cada abertura. Instalado pelo serve.py no servidor Starlette.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not HASHED.search(scope.get("path", "")):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_cached(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message.get("headers", ()) if k.lower() != b"cache-control"]
+                headers.append((b"cache-control", IMMUTABLE.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_cached)
+
+
+def subset_fonts(sources):
+    """Recorta cada fonte para o subconjunto latino em woff2 com hash no nome."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    FONTS_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        index = json.loads(FONTS_INDEX.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        index = {}
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["kern", "liga", "calt"]
+    options.name_IDs = ["*"]
+    for src in sources:
+        font = TTFont(src)
+        family = font["name"].getBestFamilyName()
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=subset.parse_unicodes(LATIN_UNICODES))
+        subsetter.subset(font)
+        tmp = FONTS_DIR / "subset.tmp"
+        subset.save_font(font, str(tmp), options)
+        slug = family.lower().replace(" ", "-")
+        name = f"{slug}.{_digest(tmp.read_bytes())}.woff2"
+        os.replace(tmp, FONTS_DIR / name)
+        old = index.get(family)
+        if old and old != name:
+            (FONTS_DIR / old).unlink(missing_ok=True)
+        index[family] = name
+        print(f"{family}: {src} -> static/fonts/{name} ({(FONTS_DIR / name).stat().st_size} bytes)")
+    FONTS_INDEX.write_text(json.dumps(index, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+@sidecar.route("assets")
+def serve(handler, rest, query):
+    """Arquivos gerados e os de static/ com cache longo (os nomes levam hash)."""
+    if rest in _generated:
+        content_type, cache_control, body = _generated[rest]
+    else:
+        path = (STATIC_DIR / rest).resolve()
+        if STATIC_DIR.resolve() not in path.parents or not path.is_file():
+            handler.send_error(404)
+            return
+        types = {".css": "text/css", ".woff2": "font/woff2", ".json": "application/json"}
+        content_type, cache_control = types.get(path.suffix, "application/octet-stream"), IMMUTABLE
+        body = path.read_bytes()
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.send_header("Cache-Control", cache_control)
+    # Fontes pedidas por CSS de outra origem exigem CORS.
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera os arquivos estáticos do Neuros Som.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("css", help="grava neuros.<hash>.css para um CDN")
+    p.add_argument("--out", default=".", help="diretório de build (padrão: o atual)")
+    p = sub.add_parser("fonts", help="recorta fontes TTF/OTF para woff2 latino")
+    p.add_argument("sources", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "fonts":
+        subset_fonts(args.sources)
+        return
+    name, data = build_stylesheet()
+    os.makedirs(args.out, exist_ok=True)
+    target = os.path.join(args.out, name)
+    with open(target, "wb") as fh:
+        fh.write(data)
+    print(target)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Loop asyncio compartilhado para tarefas de rede em segundo plano.
+
+O script do Streamlit roda em threads de sessão que não podem esperar
+por rede; sondagens e leituras de stream rodam neste loop único, numa
+thread daemon criada sob demanda e reaproveitada por todo o processo.
+"""
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Devolve o loop de fundo, iniciando a thread na primeira chamada."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="neuros-background", daemon=True
+                ).start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro):
+    """Agenda `coro` no loop de fundo e devolve um concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
@@ -0,0 +1,587 @@
+"""Benchmarks do Neuros Som.
+
+Uso:
+    python bench.py catalog [--sizes 10 100 1000 10000]
+    python bench.py render [--sizes 10 100 1000] [--update-baselines]
+    python bench.py quality [ARQUIVO ...] [--stations 10]
+    python bench.py connect [URL ...]
+    python bench.py shared [--replicas 1 2 4 8] [--urls 40] [--seconds 10]
+    python bench.py pwa [--kbps 1600] [--rtt 150]
+    python bench.py css [--kbps 1600] [--rtt 150]
+
+`render` roda o app sem navegador (streamlit.testing.v1.AppTest) e
+falha (código 1) quando algum número passa do baseline gravado em
+bench_baselines.json.
+
+`quality` mede o scanner de quadros (quality.scan) em amostras
+gravadas (ex.: `curl -m 5 URL > amostra.mp3`) ou, sem arquivos, em
+amostras sintéticas MP3 e ADTS com trechos corrompidos, comparando com
+o caminho quadro a quadro do frames.py.
+
+`connect` decompõe o tempo até o primeiro byte de cada stream (por
+padrão, os do catálogo) em DNS, TCP, TLS e resposta: sem dicas o
+navegador paga tudo depois do clique; com preconnect, só a resposta.
+No navegador, NEUROS_HINTS=ab mede o mesmo em /playback.
+
+`shared` sobe N réplicas (subprocessos) contra streams falsos locais,
+cada uma fazendo reruns com a sondagem de saúde ligada, e conta as
+requisições que chegam à origem com e sem o cache compartilhado
+(SQLite), além da latência de leitura do cache e do rerun.
+
+`pwa` sobe o app e conta requisições e bytes (com gzip) até a grade:
+app completo (HTML e bundles do Streamlit; websocket e render não
+entram) contra a casca do app instalado na primeira abertura e nas
+seguintes, servidas pelo service worker sem rede. O tempo "modelo"
+converte os bytes e os níveis de dependência numa rede móvel lenta.
+
+`css` sobe o app pelo serve.py e mede o que a primeira pintura com
+estilo espera depois que o render chega: o CSS com hash (cabeçalhos,
+bytes, tempo local) e, na visita repetida, se o navegador ainda vai à
+rede revalidar (ETag, 304) ou usa o cache direto (immutable). O
+@import do Google Fonts, enquanto não há woff2 locais, conta como uma
+origem nova (DNS, TCP, TLS) mais a requisição, bloqueando o CSS.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+BASELINES = ROOT / "bench_baselines.json"
+
+# Folga sobre o baseline antes de acusar regressão: tempo de parede é
+# ruidoso; contagem de elementos e bytes são determinísticos.
+TOLERANCE = {"wall_ms": 1.5, "elements": 1.05, "delta_bytes": 1.05}
+
+
+def make_catalog(n: int) -> dict:
+    """Gera um catálogo sintético com n estações válidas."""
+    return {
+        "stations": [
+            {
+                "id": f"radio-{i}",
+                "name": f"Rádio {i}",
+                "url": f"https://stream{i % 50}.example.com/radio{i}.mp3",
+                "color": "#FF6B6B",
+                "icon": "📻",
+                "genre": ("Pop", "Rock", "80s", "Jazz")[i % 4],
+                "format": "audio/mpeg",
+            }
+            for i in range(n)
+        ]
+    }
+
+
+def write_catalog(directory: str, n: int) -> str:
+    path = os.path.join(directory, f"radios_{n}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(make_catalog(n), fh, ensure_ascii=False)
+    return path
+
+
+def _per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def bench_catalog(sizes, calls):
+    """Custo por rerun de obter o catálogo, conforme ele cresce.
+
+    Compara a reconstrução do dicionário a cada rerun (como o antigo
+    get_radios()) com a leitura do CatalogStore compartilhado.
+    """
+    from catalog import CatalogStore
+
+    print(f"{'estações':>9} {'carga (ms)':>11} {'rebuild/rerun (µs)':>19} {'store/rerun (µs)':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = write_catalog(tmp, n)
+            store = CatalogStore(path, check_interval=1.0)
+
+            start = time.perf_counter()
+            store.get()
+            load_ms = (time.perf_counter() - start) * 1e3
+
+            stations = make_catalog(n)["stations"]
+            rebuild = _per_call(
+                lambda: {s["name"]: dict(s) for s in stations}, max(1, calls // max(1, n // 10))
+            )
+            cached = _per_call(store.get, calls)
+            print(f"{n:>9} {load_ms:>11.2f} {rebuild * 1e6:>19.2f} {cached * 1e6:>17.3f}")
+
+
+def _walk(node):
+    """(elementos, bytes serializados) da subárvore do AppTest."""
+    proto = getattr(node, "proto", None)
+    count, size = (1, proto.ByteSize()) if proto is not None else (0, 0)
+    for child in getattr(node, "children", {}).values():
+        c, b = _walk(child)
+        count += c
+        size += b
+    return count, size
+
+
+def _measure(at, action, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        action(at).run()
+        times.append((time.perf_counter() - start) * 1e3)
+    elements, delta_bytes = _walk(at._tree)
+    return {
+        "wall_ms": round(statistics.median(times), 2),
+        "elements": elements,
+        "delta_bytes": delta_bytes,
+    }
+
+
+def render_scenarios(repeats: int) -> dict:
+    """Roda os cenários no processo atual, com o catálogo de NEUROS_CATALOG."""
+    from streamlit.testing.v1 import AppTest
+
+    import assets
+
+    # Como no serve.py: o CSS sai num <link> servido pelo middleware.
+    assets.middleware()
+    at = AppTest.from_file(str(ROOT / "fm.py"), default_timeout=120)
+    results = {"cold": _measure(at, lambda a: a, 1)}
+    results["rerun"] = _measure(at, lambda a: a, repeats)
+
+    flip = iter(range(10**6))
+    # Alterna entre as duas primeiras rádios: cada clique é uma troca.
+    results["switch"] = _measure(
+        at, lambda a: a.button(key=f"btn_radio-{next(flip) % 2}").click(), repeats
+    )
+    return results
+
+
+def bench_render(sizes, repeats, update: bool) -> int:
+    """Mede cada tamanho de catálogo num subprocesso e compara com o baseline."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            env = {
+                **os.environ,
+                "NEUROS_CATALOG": write_catalog(tmp, n),
+                "NEUROS_CACHE_DIR": tmp,
+                # Sem rede: os números medem só o render.
+                "NEUROS_HEALTH": "0",
+                "NEUROS_SNIFF": "0",
+                "NEUROS_NOWPLAYING": "0",
+            }
+            out = subprocess.run(
+                [sys.executable, __file__, "_render-child", "--repeats", str(repeats)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            results[str(n)] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    failures = []
+    print(f"{'estações':>9} {'cenário':>8} {'parede (ms)':>12} {'elementos':>10} {'bytes':>10}")
+    for size, scenarios in results.items():
+        for name, metrics in scenarios.items():
+            print(f"{size:>9} {name:>8} {metrics['wall_ms']:>12.2f} "
+                  f"{metrics['elements']:>10} {metrics['delta_bytes']:>10}")
+            base = baselines.get(size, {}).get(name, {})
+            for metric, limit in TOLERANCE.items():
+                if metric in base and metrics[metric] > base[metric] * limit:
+                    failures.append(f"{size}/{name}/{metric}: {metrics[metric]} > "
+                                    f"{base[metric]} x {limit}")
+
+    if update:
+        BASELINES.write_text(json.dumps({**baselines, **results}, indent=2) + "\n")
+        print(f"baselines gravados em {BASELINES.name}")
+        return 0
+    for failure in failures:
+        print("REGRESSÃO", failure)
+    return 1 if failures else 0
+
+
+def synthetic_samples(seconds: float = 5.0, seed: int = 0) -> dict:
+    """Amostras MP3 128 kbps e AAC ~96 kbps com conteúdo aleatório e lixo."""
+    import random
+
+    from fakestream import mp3_frame
+
+    rng = random.Random(seed)
+    frame_seconds = 1152 / 44100
+    mp3 = bytearray()
+    for i in range(int(seconds / frame_seconds)):
+        frame = bytearray(mp3_frame(128))
+        frame[4:] = rng.randbytes(len(frame) - 4)
+        mp3 += frame
+        if i % 50 == 49:
+            mp3 += rng.randbytes(300)          # perda de sincronia
+    adts = bytearray()
+    for _ in range(int(seconds * 44100 / 1024)):
+        length = 278
+        adts += bytes((0xFF, 0xF1, 0x50, 0x80 | (length >> 11), (length >> 3) & 0xFF,
+                       ((length & 7) << 5) | 0x1F, 0xFC)) + rng.randbytes(length - 7)
+    return {"sintético.mp3": bytes(mp3), "sintético.aac": bytes(adts)}
+
+
+def _scan_python(buf: bytes) -> int:
+    """Referência quadro a quadro com frames.find_sync/parse_frame."""
+    from frames import find_sync, parse_frame
+
+    count, pos = 0, find_sync(buf)
+    while pos is not None:
+        header = parse_frame(buf, pos)
+        if header is None:
+            pos = find_sync(buf, pos + 1)
+            continue
+        count += 1
+        pos += header.length
+    return count
+
+
+def bench_quality(files, stations: int, calls: int):
+    """Vazão do scanner e quantas rádios um núcleo acompanha."""
+    import settings
+    from quality import scan
+
+    samples = {os.path.basename(f): Path(f).read_bytes() for f in files} or synthetic_samples()
+    scan(b"\xff\xfb\x90\x64" * 4)      # monta as tabelas fora da medida
+    print(f"{'amostra':>16} {'KB':>7} {'quadros':>8} {'kbps':>7} {'perda':>7} "
+          f"{'numpy (ms)':>11} {'python (ms)':>12} {'MB/s':>7}")
+    per_byte = []
+    for name, buf in samples.items():
+        stats = scan(buf)
+        fast = _per_call(lambda: scan(buf), calls)
+        slow = _per_call(lambda: _scan_python(buf), max(1, calls // 20))
+        per_byte.append(fast / len(buf))
+        print(f"{name:>16} {len(buf) / 1024:>7.1f} {stats.frames:>8} {stats.bitrate_kbps:>7.1f} "
+              f"{stats.sync_loss:>7.2%} {fast * 1e3:>11.3f} {slow * 1e3:>12.3f} "
+              f"{len(buf) / fast / 1e6:>7.1f}")
+
+    # Bytes por rodada: todas as rádios a 128 kbps pelo tempo de amostra.
+    round_bytes = stations * 128_000 / 8 * settings.QUALITY_SAMPLE_SECONDS
+    worst = max(per_byte)
+    print(f"rodada com {stations} rádios ({round_bytes / 1e6:.1f} MB): "
+          f"{worst * round_bytes * 1e3:.1f} ms de CPU")
+    print(f"um núcleo analisaria ~{int(1 / (worst * 128_000 / 8))} rádios de 128 kbps "
+          f"ouvidas sem parar")
+
+
+def _connect_phases(url: str, timeout: float) -> dict:
+    import socket
+    import ssl
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    tls = parts.scheme == "https"
+    port = parts.port or (443 if tls else 80)
+    phases = {}
+    start = time.perf_counter()
+    addr = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)[0]
+    phases["dns"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    sock = socket.socket(addr[0], addr[1], addr[2])
+    sock.settimeout(timeout)
+    try:
+        sock.connect(addr[4])
+        phases["tcp"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        if tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        phases["tls"] = time.perf_counter() - mark
+        mark = time.perf_counter()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                     "Connection: close\r\n\r\n".encode("latin-1"))
+        sock.recv(1)
+        phases["resposta"] = time.perf_counter() - mark
+    finally:
+        sock.close()
+    return {k: v * 1e3 for k, v in phases.items()}
+
+
+def bench_connect(urls, timeout: float):
+    """Quanto do primeiro byte cada dica de conexão elimina, por stream."""
+    from urllib.parse import urlsplit
+
+    if not urls:
+        from catalog import get_catalog
+
+        urls = [info["url"] for info in get_catalog().radios.values()]
+    print(f"{'host':>36} {'dns':>7} {'tcp':>7} {'tls':>7} {'resp.':>7} "
+          f"{'sem dicas':>10} {'preconnect':>11}")
+    cold, warm = [], []
+    for url in urls:
+        host = urlsplit(url).netloc[-36:]
+        try:
+            p = _connect_phases(url, timeout)
+        except OSError as exc:
+            print(f"{host:>36} falhou: {exc}")
+            continue
+        total = sum(p.values())
+        cold.append(total)
+        warm.append(p["resposta"])
+        print(f"{host:>36} {p['dns']:>7.1f} {p['tcp']:>7.1f} {p['tls']:>7.1f} "
+              f"{p['resposta']:>7.1f} {total:>10.1f} {p['resposta']:>11.1f}")
+    if cold:
+        print(f"mediana (ms): sem dicas {statistics.median(cold):.1f}, "
+              f"com preconnect {statistics.median(warm):.1f}")
+
+
+def _percentiles(samples) -> tuple:
+    samples = sorted(samples) or [0.0]
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def shared_replica(seconds: float, page: int) -> dict:
+    """Uma réplica: reruns a cada 50 ms consultando a saúde da primeira página."""
+    import catalog
+    import health
+    import sharedcache
+
+    radios = dict(list(catalog.get_catalog().radios.items())[:page])
+    shared = sharedcache.get_cache()
+    keys = [f"health:{info['url']}" for info in radios.values()]
+    reruns, reads = [], []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        health.monitor.check(radios)
+        states = [health.monitor.state(info) for info in radios.values()]
+        reruns.append(time.perf_counter() - start)
+        if shared is not None:
+            start = time.perf_counter()
+            shared.get_many(keys)
+            reads.append(time.perf_counter() - start)
+        time.sleep(0.05)
+    return {"reruns": [round(x * 1e6, 1) for x in reruns],
+            "reads": [round(x * 1e6, 1) for x in reads],
+            "ok": states.count(health.OK)}
+
+
+def bench_shared(replicas, urls: int, seconds: float, ttl: float):
+    """Requisições à origem e latência de leitura com N réplicas, com e sem cache comum."""
+    import fakestream
+
+    class Counting(fakestream._Handler):
+        def do_GET(self):
+            with self.server.hits_lock:
+                self.server.hits += 1
+            super().do_GET()
+
+    print(f"{'réplicas':>8} {'cache':>7} {'req. origem':>12} {'req/URL/TTL':>12} "
+          f"{'rerun p50/p99 (µs)':>19} {'leitura p50/p99 (µs)':>21} {'ok':>5}")
+    for n in replicas:
+        for backend in ("local", "sqlite"):
+            with tempfile.TemporaryDirectory() as tmp, \
+                    fakestream.FakeStreamServer(handler=Counting) as server:
+                server.hits, server.hits_lock = 0, threading.Lock()
+                stations = make_catalog(urls)["stations"]
+                for i, station in enumerate(stations):
+                    station["url"] = server.url(f"/ok/radio-{i}")
+                path = os.path.join(tmp, "radios.json")
+                with open(path, "w", encoding="utf-8") as fh:
+                    json.dump({"stations": stations}, fh)
+                env = {
+                    **os.environ,
+                    "NEUROS_CATALOG": path,
+                    "NEUROS_CACHE_DIR": tmp,
+                    "NEUROS_HEALTH_TTL": str(ttl),
+                    "NEUROS_SHARED_CACHE": os.path.join(tmp, "shared.sqlite3") if backend == "sqlite" else "",
+                    "NEUROS_SNIFF": "0",
+                    "NEUROS_NOWPLAYING": "0",
+                }
+                children = [
+                    subprocess.Popen(
+                        [sys.executable, __file__, "_shared-child", "--seconds", str(seconds),
+                         "--page", str(urls)],
+                        env=env, stdout=subprocess.PIPE, text=True,
+                    )
+                    for _ in range(n)
+                ]
+                outs = [json.loads(c.communicate()[0].strip().splitlines()[-1]) for c in children]
+                hits = server.hits
+            reruns = _percentiles([x for o in outs for x in o["reruns"]])
+            reads = [x for o in outs for x in o["reads"]]
+            reads = "{:.0f}/{:.0f}".format(*_percentiles(reads)) if reads else "-"
+            windows = max(1.0, seconds / ttl)
+            print(f"{n:>8} {backend:>7} {hits:>12} {hits / urls / windows:>12.2f} "
+                  f"{reruns[0]:>9.0f}/{reruns[1]:<9.0f} {reads:>21} "
+                  f"{min(o['ok'] for o in outs):>5}")
+
+
+def _fetch(url: str) -> tuple:
+    """(bytes transferidos, ms) de um GET, aceitando gzip como o navegador."""
+    start = time.perf_counter()
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        size = len(response.read())
+    return size, (time.perf_counter() - start) * 1e3
+
+
+def _visit(base: str, paths, levels: int) -> dict:
+    fetched = [_fetch(base + p) for p in paths]
+    return {"requests": len(fetched), "bytes": sum(b for b, _ in fetched),
+            "ms": sum(ms for _, ms in fetched), "levels": levels}
+
+
+def bench_pwa(kbps: float, rtt: float):
+    """Bytes e requisições até a grade: app completo x casca do app instalado."""
+    import re
+
+    import loadtest
+    import settings
+
+    os.environ.update(NEUROS_HEALTH="0", NEUROS_SNIFF="0", NEUROS_NOWPLAYING="0")
+    with tempfile.TemporaryDirectory() as tmp:
+        server = loadtest.ServerProcess(str(settings.CATALOG_PATH), tmp)
+        try:
+            server.wait_ready()
+            base = f"http://127.0.0.1:{server.port}/"
+            with urllib.request.urlopen(base, timeout=30) as response:
+                page = response.read().decode()
+            assets = [a.lstrip("./") for a in re.findall(r'(?:src|href)="([^"]+\.(?:js|css))"', page)
+                      if "://" not in a]
+            visits = {
+                # HTML, depois seus scripts e CSS em paralelo; a grade ainda
+                # espera o websocket e o primeiro render (não contados).
+                "app completo": _visit(base, [""] + assets, 2),
+                # Primeira abertura pelo ícone: casca e catálogo.
+                "casca (1ª vez)": _visit(base, ["app/static/shell.html", "app/static/catalog.json"], 2),
+                # Aberturas seguintes: tudo sai do cache do service worker;
+                # a revalidação vai para a rede depois da pintura.
+                "casca (repetida)": {"requests": 0, "bytes": 0, "ms": 0.0, "levels": 0},
+            }
+        finally:
+            server.stop()
+
+    print(f"{'visita':<18} {'req.':>5} {'KB':>9} {'ms local':>9} {'modelo (s)':>11}")
+    for name, v in visits.items():
+        modeled = v["levels"] * rtt / 1000 + v["bytes"] * 8 / (kbps * 1000)
+        print(f"{name:<18} {v['requests']:>5} {v['bytes'] / 1024:>9.1f} {v['ms']:>9.1f} {modeled:>11.2f}")
+    print(f"modelo: {kbps:.0f} kbps, RTT {rtt:.0f} ms por nível de dependência")
+
+
+def bench_css(kbps: float, rtt: float):
+    """Primeira pintura com estilo: rede até o CSS aplicar, 1ª visita e repetida."""
+    import assets
+    import loadtest
+    import settings
+
+    name, data = assets.build_stylesheet()
+    remote_fonts = assets.REMOTE_FONTS.encode() in data
+    os.environ.update(NEUROS_HEALTH="0", NEUROS_SNIFF="0", NEUROS_NOWPLAYING="0")
+    with tempfile.TemporaryDirectory() as tmp:
+        server = loadtest.ServerProcess(str(settings.CATALOG_PATH), tmp)
+        try:
+            server.wait_ready()
+            url = f"http://127.0.0.1:{server.port}/app/static/{name}"
+            with urllib.request.urlopen(url, timeout=30) as response:
+                headers = response.headers
+            size, first_ms = _fetch(url)
+            cache_control = headers.get("Cache-Control") or "-"
+            immutable = "immutable" in cache_control
+            start = time.perf_counter()
+            request = urllib.request.Request(url, headers={"If-None-Match": headers.get("ETag") or "",
+                                                          "Accept-Encoding": "gzip"})
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    revalidation, repeat_bytes = "200", len(response.read())
+            except urllib.error.HTTPError as exc:
+                revalidation, repeat_bytes = str(exc.code), 0
+            repeat_ms = 0.0 if immutable else (time.perf_counter() - start) * 1e3
+        finally:
+            server.stop()
+
+    # Origem nova do @import: DNS + TCP + TLS + a requisição do CSS das fontes.
+    font_levels = 4 if remote_fonts else 0
+    visits = {
+        "1ª visita": {"requests": 1 + bool(remote_fonts), "bytes": size, "ms": first_ms,
+                      "levels": 1 + font_levels},
+        # O CSS das fontes do Google vem com max-age de um dia.
+        "repetida": {"requests": 0 if immutable else 1, "bytes": 0 if immutable else repeat_bytes,
+                     "ms": repeat_ms,
+                     "levels": 0 if immutable else 1},
+    }
+    print(f"CSS: {name} ({size} bytes), Cache-Control: {cache_control}, "
+          f"revalidação: {'sem requisição' if immutable else revalidation}")
+    print(f"fontes: {'@import do Google Fonts' if remote_fonts else 'woff2 locais (static/fonts)'}")
+    print(f"{'visita':<12} {'req.':>5} {'KB':>9} {'ms local':>9} {'modelo (s)':>11}")
+    for label, v in visits.items():
+        modeled = v["levels"] * rtt / 1000 + v["bytes"] * 8 / (kbps * 1000)
+        print(f"{label:<12} {v['requests']:>5} {v['bytes'] / 1024:>9.1f} {v['ms']:>9.1f} {modeled:>11.2f}")
+    print(f"modelo: {kbps:.0f} kbps, RTT {rtt:.0f} ms por nível de dependência")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("catalog", help="custo por rerun do catálogo")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    p.add_argument("--calls", type=int, default=100_000)
+
+    p = sub.add_parser("render", help="cenários de render com AppTest")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    p.add_argument("--repeats", type=int, default=5)
+    p.add_argument("--update-baselines", action="store_true")
+
+    p = sub.add_parser("quality", help="scanner de quadros em amostras gravadas")
+    p.add_argument("files", nargs="*")
+    p.add_argument("--stations", type=int, default=10)
+    p.add_argument("--calls", type=int, default=200)
+
+    p = sub.add_parser("connect", help="DNS/TCP/TLS até o primeiro byte, por stream")
+    p.add_argument("urls", nargs="*")
+    p.add_argument("--timeout", type=float, default=5.0)
+
+    p = sub.add_parser("shared", help="réplicas com e sem cache compartilhado")
+    p.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--urls", type=int, default=40)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--ttl", type=float, default=2.0)
+
+    p = sub.add_parser("pwa", help="primeira pintura: app completo x casca instalada")
+    p.add_argument("--kbps", type=float, default=1600.0)
+    p.add_argument("--rtt", type=float, default=150.0)
+
+    p = sub.add_parser("css", help="primeira pintura com estilo: CSS com hash e fontes")
+    p.add_argument("--kbps", type=float, default=1600.0)
+    p.add_argument("--rtt", type=float, default=150.0)
+
+    p = sub.add_parser("_render-child")
+    p.add_argument("--repeats", type=int, default=5)
+
+    p = sub.add_parser("_shared-child")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--page", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "catalog":
+        bench_catalog(args.sizes, args.calls)
+    elif args.cmd == "render":
+        sys.exit(bench_render(args.sizes, args.repeats, args.update_baselines))
+    elif args.cmd == "quality":
+        bench_quality(args.files, args.stations, args.calls)
+    elif args.cmd == "connect":
+        bench_connect(args.urls, args.timeout)
+    elif args.cmd == "shared":
+        bench_shared(args.replicas, args.urls, args.seconds, args.ttl)
+    elif args.cmd == "pwa":
+        bench_pwa(args.kbps, args.rtt)
+    elif args.cmd == "css":
+        bench_css(args.kbps, args.rtt)
+    elif args.cmd == "_shared-child":
+        print(json.dumps(shared_replica(args.seconds, args.page)))
+    elif args.cmd == "_render-child":
+        print(json.dumps(render_scenarios(args.repeats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Catálogo de rádios carregado de arquivo, validado e compartilhado.
+
+O Streamlit reexecuta fm.py a cada clique, mas módulos importados
+ficam em sys.modules — por isso o catálogo vive aqui: é lido e
+validado uma única vez, compartilhado (somente leitura) entre todas as
+sessões e recarregado apenas quando o mtime do arquivo muda.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+_ID_RE = re.compile(r"^[a-z0-9][a-z0-9-]*$")
+_COLOR_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_FORMATS = {"audio/mpeg", "audio/aac", "audio/ogg", "application/vnd.apple.mpegurl"}
+_REQUIRED = ("id", "name", "url", "color", "icon", "genre")
+
+
+class CatalogError(ValueError):
+    """Erro de leitura ou validação do arquivo de catálogo."""
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """Foto imutável do catálogo.
+
+    `radios` mapeia nome -> info (como o antigo get_radios()), `by_id`
+    mapeia o id estável -> nome e `version` muda a cada recarga, para
+    que caches derivados saibam quando se invalidar.
+    """
+    radios: MappingProxyType
+    by_id: MappingProxyType
+    version: int
+    errors: tuple = field(default=())
+
+
+def validate_station(entry) -> dict:
+    """Valida uma entrada do catálogo e devolve uma cópia normalizada.
+
+    Além dos campos obrigatórios, aceita `mirrors` (URLs alternativas),
+    `tags` (textos para a busca) e `variants`, versões do mesmo stream
+    em outras taxas: [{"url": ..., "bitrate": 64, "format": "audio/aac"}].
+    Levanta CatalogError descrevendo o primeiro problema encontrado.
+    """
+    if not isinstance(entry, dict):
+        raise CatalogError("entrada não é um objeto")
+    for key in _REQUIRED:
+        if not isinstance(entry.get(key), str) or not entry[key].strip():
+            raise CatalogError(f"campo '{key}' ausente ou vazio")
+    if not _ID_RE.match(entry["id"]):
+        raise CatalogError(f"id inválido: {entry['id']!r}")
+    if not entry["url"].startswith(("http://", "https://")):
+        raise CatalogError(f"url não é http(s): {entry['url']!r}")
+    if not _COLOR_RE.match(entry["color"]):
+        raise CatalogError(f"cor inválida: {entry['color']!r}")
+    fmt = entry.get("format")
+    if fmt is not None and fmt not in _FORMATS:
+        raise CatalogError(f"formato desconhecido: {fmt!r}")
+    mirrors = entry.get("mirrors", [])
+    if not isinstance(mirrors, list) or not all(
+        isinstance(m, str) and m.startswith(("http://", "https://")) for m in mirrors
+    ):
+        raise CatalogError("'mirrors' deve ser uma lista de URLs http(s)")
+    variants = entry.get("variants", [])
+    if not isinstance(variants, list):
+        raise CatalogError("'variants' deve ser uma lista")
+    for variant in variants:
+        if (not isinstance(variant, dict)
+                or not str(variant.get("url", "")).startswith(("http://", "https://"))
+                or not isinstance(variant.get("bitrate"), int) or isinstance(variant["bitrate"], bool)
+                or variant["bitrate"] <= 0):
+            raise CatalogError("cada variante precisa de 'url' http(s) e 'bitrate' (kbps) > 0")
+        if variant.get("format") is not None and variant["format"] not in _FORMATS:
+            raise CatalogError(f"formato desconhecido: {variant['format']!r}")
+    tags = entry.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise CatalogError("'tags' deve ser uma lista de textos")
+    info = dict(entry)
+    if mirrors:
+        info["mirrors"] = tuple(mirrors)
+    if tags:
+        info["tags"] = tuple(tags)
+    if variants:
+        # Da maior para a menor taxa: a escolha adaptativa desce a lista.
+        info["variants"] = tuple(
+            MappingProxyType(dict(v)) for v in sorted(variants, key=lambda v: -v["bitrate"])
+        )
+    return info
+
+
+def parse_catalog(raw: bytes, version: int = 0) -> Catalog:
+    """Converte o conteúdo do arquivo em um Catalog.
+
+    Entradas inválidas ou duplicadas são descartadas e registradas em
+    `errors` — uma estação mal digitada não derruba as demais.
+    """
+    try:
+        data = json.loads(raw)
+    except ValueError as exc:
+        raise CatalogError(f"JSON inválido: {exc}") from exc
+    stations = data.get("stations") if isinstance(data, dict) else None
+    if not isinstance(stations, list):
+        raise CatalogError("chave 'stations' ausente ou não é uma lista")
+
+    radios, by_id, errors = {}, {}, []
+    for pos, entry in enumerate(stations):
+        try:
+            info = validate_station(entry)
+            if info["id"] in by_id:
+                raise CatalogError(f"id duplicado: {info['id']!r}")
+            if info["name"] in radios:
+                raise CatalogError(f"nome duplicado: {info['name']!r}")
+        except CatalogError as exc:
+            errors.append(f"estação #{pos}: {exc}")
+            continue
+        name = info.pop("name")
+        by_id[info["id"]] = name
+        radios[name] = MappingProxyType(info)
+
+    return Catalog(
+        radios=MappingProxyType(radios),
+        by_id=MappingProxyType(by_id),
+        version=version,
+        errors=tuple(errors),
+    )
+
+
+class CatalogStore:
+    """Mantém o Catalog atual e o recarrega quando o arquivo muda.
+
+    A primeira carga é síncrona. As seguintes rodam numa thread à
+    parte: enquanto o arquivo novo é lido e validado, as sessões
+    continuam recebendo a foto anterior, sem travar o render.
+    """
+
+    def __init__(self, path, check_interval: float = 1.0):
+        self.path = os.fspath(path)
+        self.check_interval = check_interval
+        self._catalog = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._version = 0
+        self._reloading = threading.Lock()
+        self._listeners = []
+
+    def on_reload(self, callback):
+        """Registra callback(catalog) chamado após cada recarga."""
+        self._listeners.append(callback)
+
+    def get(self) -> Catalog:
+        if self._catalog is None:
+            with self._reloading:
+                if self._catalog is None:
+                    self._reload(self._file_stamp())
+            return self._catalog
+
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            stamp = self._file_stamp()
+            if stamp != self._stamp and self._reloading.acquire(blocking=False):
+                threading.Thread(
+                    target=self._reload_in_background, args=(stamp,),
+                    name="catalog-reload", daemon=True,
+                ).start()
+        return self._catalog
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload_in_background(self, stamp):
+        try:
+            self._reload(stamp)
+        finally:
+            self._reloading.release()
+
+    def _reload(self, stamp):
+        try:
+            with open(self.path, "rb") as fh:
+                catalog = parse_catalog(fh.read(), version=self._version + 1)
+        except (OSError, CatalogError) as exc:
+            # Mantém a última versão boa; só não tenta de novo até o
+            # arquivo mudar outra vez.
+            self._stamp = stamp
+            if self._catalog is None:
+                self._catalog = parse_catalog(b'{"stations": []}')
+            logger.error("Catálogo %s não carregado: %s", self.path, exc)
+            return
+
+        for err in catalog.errors:
+            logger.warning("Catálogo %s: %s", self.path, err)
+        self._version = catalog.version
+        self._catalog = catalog
+        self._stamp = stamp
+        for callback in self._listeners:
+            # Um cache derivado com defeito não impede os demais de
+            # acompanhar a recarga nem derruba o render da primeira carga.
+            try:
+                callback(catalog)
+            except Exception:
+                logger.exception("Catálogo %s: falha em %r após a recarga", self.path, callback)
+
+
+_store = CatalogStore(settings.CATALOG_PATH, settings.CATALOG_CHECK_INTERVAL)
+
+
+def get_catalog() -> Catalog:
+    """Catálogo atual compartilhado por todas as sessões do processo."""
+    return _store.get()
+
+
+def on_reload(callback):
+    """Registra callback(catalog) para caches derivados do catálogo."""
+    _store.on_reload(callback)
@@ -0,0 +1,246 @@
+"""Servidor local que imita streams Icecast/Shoutcast.
+
+Serve, em 127.0.0.1, rotas que se comportam como as rádios reais
+(ou como rádios com defeito) para exercitar sondagem, farejamento de
+codec e retransmissão sem depender da internet:
+
+    /ok/<nome>        200 e bytes de áudio sem fim
+    /slow/<nome>      200, mas o primeiro byte demora `slow_delay` s
+    /icy/<nome>       linha de status "ICY 200 OK" (Shoutcast v1)
+    /meta/<nome>      Icecast com metadados ICY a cada `metaint` bytes,
+                      trocando de título (`titles`) a cada bloco
+    /live/<kbps>/<nome>  MP3 de <kbps> em tempo real, limitado pela banda
+                      do servidor (`bandwidth_kbps`), como numa rede móvel
+    /bandwidth/<kbps> troca a banda durante o teste (0 = sem limite)
+    /status/<código>  responde só com o código HTTP pedido
+    /redirect/<rota>  302 para /<rota>
+
+Uso:
+    with FakeStreamServer() as server:
+        server.url("/ok/kiss")   # -> "http://127.0.0.1:<porta>/ok/kiss"
+
+Para testar a troca de variantes no navegador:
+    python fakestream.py --bandwidth 96 > /tmp/variantes.json
+    NEUROS_CATALOG=/tmp/variantes.json NEUROS_PLAYER=spa streamlit run fm.py
+"""
+import argparse
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Um quadro MPEG-1 Layer III, 128 kbps, 44.1 kHz: cabeçalho + enchimento.
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+_MP3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+# Cada quadro MPEG-1 Layer III carrega 1152 amostras.
+FRAME_SECONDS = 1152 / 44100
+
+
+def mp3_frame(kbps: int) -> bytes:
+    """Quadro MPEG-1 Layer III de 44.1 kHz na taxa pedida (sem enchimento)."""
+    index = _MP3_BITRATES.index(kbps) + 1
+    return bytes((0xFF, 0xFB, index << 4, 0x64)) + b"\x00" * (144000 * kbps // 44100 - 4)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/", 1)
+        kind, rest = parts[0], parts[1] if len(parts) > 1 else ""
+        server = self.server
+
+        if kind == "status":
+            self.send_response(int(rest or 500))
+            self.end_headers()
+            return
+        if kind == "redirect":
+            self.send_response(302)
+            self.send_header("Location", "/" + rest)
+            self.end_headers()
+            return
+        if kind == "bandwidth":
+            server.bandwidth_kbps = float(rest or 0)
+            self.send_response(204)
+            self.end_headers()
+            return
+        if kind == "live":
+            kbps, _, name = rest.partition("/")
+            self._live(int(kbps), name)
+            return
+        if kind not in ("ok", "slow", "icy", "meta"):
+            self.send_error(404)
+            return
+
+        if kind == "icy":
+            self.wfile.write(b"ICY 200 OK\r\n")
+        else:
+            self.send_response_only(200)
+        self.send_header("Content-Type", server.content_type)
+        self.send_header("icy-name", rest or "fake")
+        wants_meta = kind == "meta" and self.headers.get("Icy-MetaData") == "1"
+        if wants_meta:
+            self.send_header("icy-metaint", str(server.metaint))
+        self.end_headers()
+        if kind == "slow":
+            time.sleep(server.slow_delay)
+        if wants_meta:
+            self._stream_with_metadata(server.payload)
+        else:
+            self._stream(server.payload)
+
+    def _stream(self, payload):
+        server = self.server
+        try:
+            while not server.stopping.is_set():
+                self.wfile.write(payload)
+                if server.chunk_interval:
+                    time.sleep(server.chunk_interval)
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+
+    def _live(self, kbps: int, name: str):
+        """Produz quadros no ritmo do áudio e entrega no ritmo da banda.
+
+        Com banda abaixo da taxa do stream, o atraso acumula — é o que o
+        player vê como buffer secando e travadas.
+        """
+        server = self.server
+        try:
+            frame = mp3_frame(kbps)
+        except ValueError:
+            self.send_error(404)
+            return
+        self.send_response_only(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("icy-name", name or "fake")
+        self.send_header("icy-br", str(kbps))
+        self.end_headers()
+        # Como num servidor Icecast, o começo sai de uma vez (rajada) e
+        # o resto é produzido em tempo real.
+        burst = int(server.live_burst / FRAME_SECONDS)
+        start = time.monotonic() - burst * FRAME_SECONDS
+        link_free = 0.0     # quando o "enlace" termina de entregar o quadro anterior
+        n = 0
+        try:
+            while not server.stopping.is_set():
+                ready = start + FRAME_SECONDS * (n + 1)
+                if server.bandwidth_kbps:
+                    ready = max(ready, link_free + len(frame) * 8 / (server.bandwidth_kbps * 1000))
+                delay = ready - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.wfile.write(frame)
+                link_free = max(time.monotonic(), ready)
+                n += 1
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+
+    def _stream_with_metadata(self, payload):
+        server = self.server
+        audio = payload * (server.metaint // len(payload) + 1)
+        n = 0
+        try:
+            while not server.stopping.is_set():
+                title = server.titles[n % len(server.titles)]
+                self.wfile.write(audio[:server.metaint] + icy_block(f"StreamTitle='{title}';"))
+                n += 1
+                if server.chunk_interval:
+                    time.sleep(server.chunk_interval)
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+
+
+def icy_block(text: str) -> bytes:
+    """Bloco de metadados ICY: byte de tamanho (x16) + texto com zeros."""
+    data = text.encode("utf-8")
+    blocks = -(-len(data) // 16)
+    return bytes([blocks]) + data.ljust(blocks * 16, b"\x00")
+
+
+class FakeStreamServer(ThreadingHTTPServer):
+    """Servidor de streams falsos numa porta livre, em thread daemon."""
+
+    daemon_threads = True
+
+    def __init__(self, payload: bytes = MP3_FRAME * 8, content_type: str = "audio/mpeg",
+                 chunk_interval: float = 0.05, slow_delay: float = 2.0,
+                 metaint: int = 8192, titles=("Artista - Música",),
+                 bandwidth_kbps: float = 0.0, live_burst: float = 2.0,
+                 handler=_Handler):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.payload = payload
+        self.content_type = content_type
+        self.chunk_interval = chunk_interval
+        self.slow_delay = slow_delay
+        self.metaint = metaint
+        self.titles = tuple(titles)
+        self.bandwidth_kbps = bandwidth_kbps
+        self.live_burst = live_burst
+        self.stopping = threading.Event()
+        self._thread = None
+
+    def url(self, path: str) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fakestream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def variants_catalog(server, bitrates=(32, 64, 128, 192)) -> dict:
+    """Catálogo com uma rádio em várias taxas, todas servidas por /live."""
+    variants = [
+        {"url": server.url(f"/live/{kbps}/variantes"), "bitrate": kbps, "format": "audio/mpeg"}
+        for kbps in sorted(bitrates, reverse=True)
+    ]
+    return {
+        "stations": [{
+            "id": "variantes", "name": "Rádio Variantes", "url": variants[0]["url"],
+            "color": "#4ECDC4", "icon": "📶", "genre": "Teste", "format": "audio/mpeg",
+            "variants": variants,
+        }]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streams falsos com banda limitada.")
+    parser.add_argument("--bandwidth", type=float, default=0.0,
+                        help="banda por conexão em kbps (0 = sem limite)")
+    parser.add_argument("--bitrates", type=int, nargs="+", default=[32, 64, 128, 192])
+    args = parser.parse_args(argv)
+
+    server = FakeStreamServer(bandwidth_kbps=args.bandwidth)
+    print(json.dumps(variants_catalog(server, args.bitrates), ensure_ascii=False, indent=2), flush=True)
+    print(f"banda: {args.bandwidth or 'sem limite'} kbps; troque com "
+          f"{server.url('/bandwidth/<kbps>')}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
+import html
+
 import streamlit as st
 import streamlit.components.v1 as components
 from streamlit_extras.stylable_container import stylable_container
 
+import assets
+import hints
+import metrics
+import search
+import settings
+import sidecar
+import templates
+from catalog import get_catalog
+from health import monitor as health_monitor, station_urls
+from sniff import formats as format_cache
+
+# relay, timeshift, spa_player, playback e nowplaying só servem a modos opcionais e
+# são importados onde cada modo é usado: o primeiro render não paga por
+# eles. O serve.py importa e aquece o resto antes da primeira sessão.
+
 # ============================================================
 # Configuração da página
 # ============================================================
@@ -15,268 +32,30 @@ st.set_page_config(
 # ============================================================
 # CSS global — tema escuro com acentos neon e cards de vidro
 # ============================================================
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800&family=Space+Grotesk:wght@500;700&display=swap');
-
-    html, body, [class*="css"] {
-        font-family: 'Montserrat', sans-serif;
-    }
-
-    /* Fundo gradiente animado */
-    .main, .stApp {
-        background: radial-gradient(circle at 20% 20%, #2a0f4e 0%, #150a30 35%, #060314 100%) !important;
-        background-attachment: fixed !important;
-    }
-
-    /* remove o respiro padrão do topo do app */
-    .block-container {
-        padding-top: 1.5rem !important;
-        max-width: 980px !important;
-    }
-
-    h1, h2, h3, h4, h5, h6 {
-        color: #ffffff !important;
-        font-family: 'Space Grotesk', sans-serif !important;
-    }
-
-    /* Título principal com brilho neon */
-    .neuros-title h1 {
-        color: #FFD15C !important;
-        font-size: 2.6rem !important;
-        font-weight: 700 !important;
-        letter-spacing: 1px;
-        margin: 0 !important;
-        text-shadow: 0 0 10px rgba(255, 209, 92, 0.55), 0 0 24px rgba(255, 100, 200, 0.25);
-        animation: glow 2.6s ease-in-out infinite alternate;
-    }
-
-    @keyframes glow {
-        from { text-shadow: 0 0 8px rgba(255,209,92,0.5), 0 0 18px rgba(255,100,200,0.2); }
-        to   { text-shadow: 0 0 16px rgba(255,209,92,0.85), 0 0 32px rgba(255,100,200,0.45); }
-    }
-
-    .neuros-subtitle {
-        text-align: center;
-        margin: 6px 0 0 0;
-        color: rgba(255,255,255,0.78);
-        font-size: 1.02rem;
-        font-weight: 400;
-    }
-
-    /* Botões — visual "ouvir agora" em pílula com glow */
-    .stButton { display: flex !important; justify-content: center !important; }
-
-    .stButton > button {
-        width: 100% !important;
-        padding: 10px 16px !important;
-        font-size: 0.95rem !important;
-        font-weight: 700 !important;
-        letter-spacing: 0.3px;
-        color: white !important;
-        border-radius: 999px !important;
-        border: 1px solid rgba(255,255,255,0.18) !important;
-        cursor: pointer !important;
-        background: rgba(255,255,255,0.06) !important;
-        transition: all 0.2s ease !important;
-        box-shadow: 0 4px 14px rgba(0,0,0,0.25) !important;
-    }
-
-    .stButton > button:hover {
-        background: rgba(255,255,255,0.16) !important;
-        border-color: rgba(255,255,255,0.4) !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 8px 20px rgba(0,0,0,0.35) !important;
-    }
-
-    .stButton > button:active {
-        transform: translateY(0) !important;
-        filter: brightness(0.95) !important;
-    }
-
-    /* Cartão "vidro" genérico usado pelos stylable_containers */
-    .glass-block {
-        backdrop-filter: blur(14px);
-    }
-
-    /* Badge "AO VIVO" pulsante */
-    .live-badge {
-        display: inline-flex;
-        align-items: center;
-        gap: 5px;
-        background: rgba(255, 70, 70, 0.18);
-        border: 1px solid rgba(255, 90, 90, 0.55);
-        color: #ff8a8a;
-        font-size: 0.62rem;
-        font-weight: 700;
-        letter-spacing: 0.6px;
-        padding: 3px 9px;
-        border-radius: 20px;
-        white-space: nowrap;
-    }
-
-    .live-dot {
-        width: 6px;
-        height: 6px;
-        border-radius: 50%;
-        background: #ff5c5c;
-        animation: pulse 1.4s ease-in-out infinite;
-    }
-
-    @keyframes pulse {
-        0%   { box-shadow: 0 0 0 0 rgba(255,92,92,0.6); }
-        70%  { box-shadow: 0 0 0 6px rgba(255,92,92,0); }
-        100% { box-shadow: 0 0 0 0 rgba(255,92,92,0); }
-    }
-
-    /* Equalizador animado no player */
-    .equalizer {
-        display: inline-flex;
-        align-items: flex-end;
-        gap: 3px;
-        height: 18px;
-        margin-right: 8px;
-        vertical-align: middle;
-    }
-    .equalizer span {
-        width: 3px;
-        background: #FFD15C;
-        border-radius: 2px;
-        animation: eq 1s ease-in-out infinite;
-    }
-    .equalizer span:nth-child(1) { height: 40%; animation-delay: 0s; }
-    .equalizer span:nth-child(2) { height: 100%; animation-delay: 0.2s; }
-    .equalizer span:nth-child(3) { height: 60%; animation-delay: 0.4s; }
-    .equalizer span:nth-child(4) { height: 80%; animation-delay: 0.1s; }
-    @keyframes eq {
-        0%, 100% { transform: scaleY(0.4); }
-        50% { transform: scaleY(1); }
-    }
-
-    /* Player entrando com leve slide */
-    .player-container { animation: slideIn 0.45s ease-out; }
-    @keyframes slideIn {
-        from { opacity: 0; transform: translateY(16px); }
-        to   { opacity: 1; transform: translateY(0); }
-    }
-
-    .stProgress > div > div {
-        background: linear-gradient(90deg, #FFD15C, #FF8A65) !important;
-    }
-
-    audio {
-        width: 100%;
-        border-radius: 12px;
-        box-shadow: 0 6px 20px rgba(0,0,0,0.35);
-        margin-top: 4px;
-    }
-
-    .autoplay-hint {
-        font-size: 0.78rem;
-        color: rgba(255,255,255,0.6);
-        margin-top: 8px;
-    }
-
-    hr.soft { border: none; border-top: 1px solid rgba(255,255,255,0.12); margin: 18px 0; }
-
-    @media (max-width: 768px) {
-        .neuros-title h1 { font-size: 2rem !important; }
-        .stButton > button { font-size: 0.88rem !important; padding: 9px 14px !important; }
-    }
-    @media (max-width: 480px) {
-        .neuros-title h1 { font-size: 1.6rem !important; }
-    }
-    </style>
-
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=yes">
-""", unsafe_allow_html=True)
+# A folha de estilos vive em assets/neuros.css e é servida como arquivo
+# estático com hash no nome; por rerun só vai o <link> para ela.
+st.markdown(assets.head_html(), unsafe_allow_html=True)
 
 
 def get_radios():
-    """Retorna dicionário de rádios organizadas por categoria.
+    """Retorna dicionário de rádios (nome -> info) do catálogo em radios.json.
+
+    O catálogo é lido, validado e compartilhado entre as sessões pelo
+    módulo catalog, e só é relido quando o arquivo muda — o rerun não
+    reconstrói mais o dicionário a cada clique.
 
     O campo 'format' é o tipo MIME real do stream (quando conhecido),
     usado para que o navegador não precise "adivinhar" o codec antes
     de iniciar a reprodução — isso é o que evitava o autoplay em
     quase todas as rádios, exceto a que já era MP3 puro.
     """
-    return {
-        "KISS FM": {
-            "url": "https://26593.live.streamtheworld.com/RADIO_KISSFM_ADP_SC",
-            "color": "#FF6B6B",
-            "icon": "💋",
-            "genre": "Pop/Hits",
-            "format": "audio/mpeg",
-        },
-        "80s80s Rock": {
-            "url": "https://regiocast.streamabc.net/regc-80s80srock2191507-mp3-192-4255750",
-            "color": "#FF8E53",
-            "icon": "🤘",
-            "genre": "Rock",
-            "format": "audio/mpeg",
-        },
-        "The Cure Radio": {
-            "url": "https://2.mystreaming.net/er/thecure/icecast.audio",
-            "color": "#8A2BE2",
-            "icon": "🦇",
-            "genre": "Alternative",
-            "format": "audio/mpeg",
-        },
-        "I Love 80s": {
-            "url": "https://live1.livemus.com.br:27400/stream",
-            "color": "#FF69B4",
-            "icon": "❤️",
-            "genre": "80s Hits",
-            "format": "audio/mpeg",
-        },
-        "Wonder 80s": {
-            "url": "https://80.streeemer.com/listen/80s/radio.aac",
-            "color": "#9370DB",
-            "icon": "✨",
-            "genre": "80s",
-            "format": "audio/aac",
-        },
-        "80s Pop": {
-            "url": "https://oldies.streeemer.com/listen/oldies/radio.aac",
-            "color": "#FFA500",
-            "icon": "🎤",
-            "genre": "Pop",
-            "format": "audio/aac",
-        },
-        "80s Alive": {
-            "url": "https://stream.80sa.live/80s-alive.mp3",
-            "color": "#32CD32",
-            "icon": "🌟",
-            "genre": "80s Classics",
-            "format": "audio/mpeg",
-        },
-        "Rádio Anos 80": {
-            "url": "https://stream.zeno.fm/3ywickpd3rkvv",
-            "color": "#4ECDC4",
-            "icon": "🎸",
-            "genre": "BR 80s",
-            "format": "audio/mpeg",
-        },
-        "Its 80s": {
-            "url": "https://securestream.cuelightsmedia.com.au/listen/80s/low.aac",
-            "color": "#6A8EAE",
-            "icon": "📻",
-            "genre": "80s Mix",
-            "format": "audio/aac",
-        },
-        "80s90s Hits": {
-            "url": "https://live.streamthe.world/80s90s-hits",
-            "color": "#E74C3C",
-            "icon": "🎵",
-            "genre": "80s/90s",
-            "format": "audio/mpeg",
-        },
-    }
+    return get_catalog().radios
 
 
 def guess_format(url: str, fallback: str = "audio/mpeg") -> str:
-    """Fallback de detecção de formato pela extensão da URL,
-    usado caso uma rádio não tenha 'format' definido manualmente."""
+    """Último fallback de detecção de formato pela extensão da URL,
+    usado enquanto o formato real (sniff.py) ainda não foi detectado
+    e a rádio não tem 'format' definido manualmente."""
     url_lower = url.lower()
     if ".aac" in url_lower or "aac" in url_lower.split("/")[-1]:
         return "audio/aac"
@@ -287,6 +66,62 @@ def guess_format(url: str, fallback: str = "audio/mpeg") -> str:
     return fallback
 
 
+def stream_source(radio_info):
+    """URL que o navegador deve tocar e seu tipo MIME."""
+    # Failover: se a URL principal estiver fora do ar, toca o
+    # primeiro espelho saudável declarado no catálogo.
+    url = health_monitor.pick_url(radio_info) if settings.HEALTH_ENABLED else radio_info["url"]
+    # Formato detectado pelos bytes do stream (cache em disco) tem
+    # prioridade; sem ele, vale o do catálogo e só então a URL.
+    fmt = format_cache.get(url) or radio_info.get("format") or guess_format(url)
+    if settings.RELAY_ENABLED:
+        import relay
+
+        # Modo relay: o navegador ouve pelo servidor auxiliar, que
+        # mantém uma única conexão com a origem para todos (se ele
+        # não subiu, a origem direto).
+        url = relay.listen_url(radio_info["id"]) or url
+    return url, fmt
+
+
+_CODECS = {
+    "audio/mpeg": "MP3",
+    "audio/aac": "AAC",
+    "audio/ogg": "Ogg",
+    "application/vnd.apple.mpegurl": "HLS",
+}
+
+
+def stream_variants(radio_info):
+    """Versões tocáveis da rádio, da maior para a menor taxa.
+
+    Cada item tem url, format, bitrate (kbps, ou None quando o catálogo
+    não informa) e label. Sem 'variants' no catálogo — ou no modo
+    relay, que retransmite um único stream — a lista tem só a fonte
+    de stream_source().
+    """
+    url, fmt = stream_source(radio_info)
+    if settings.RELAY_ENABLED or not radio_info.get("variants"):
+        variants = [{"url": url, "format": fmt, "bitrate": None}]
+    else:
+        variants = []
+        for v in radio_info["variants"]:
+            if v["url"] == radio_info["url"]:
+                # A principal segue o failover de stream_source().
+                v_url, v_fmt = url, fmt
+            else:
+                v_url = v["url"]
+                v_fmt = format_cache.get(v_url) or v.get("format") or guess_format(v_url)
+            variants.append({"url": v_url, "format": v_fmt, "bitrate": v["bitrate"]})
+        if not any(v["url"] == radio_info["url"] for v in radio_info["variants"]):
+            variants.insert(0, {"url": url, "format": fmt, "bitrate": None})
+    for v in variants:
+        codec = _CODECS.get(v["format"], v["format"])
+        v["label"] = f"{v['bitrate']} kbps · {codec}" if v["bitrate"] else codec
+    return variants
+
+
+@metrics.timed("render_header")
 def render_header():
     """Renderiza o cabeçalho da aplicação."""
     with stylable_container(
@@ -322,116 +157,130 @@ def _select_radio(name):
     st.session_state["current_radio"] = name
 
 
-def render_radio_buttons(radios):
-    """Renderiza as rádios como cartões."""
+def _reset_grid_page():
+    st.session_state["grid_page"] = 0
+
+
+def _turn_grid_page(delta):
+    st.session_state["grid_page"] = st.session_state.get("grid_page", 0) + delta
+
+
+@metrics.timed("render_station_grid")
+def render_station_grid(radios, scripts):
+    """Busca, filtro de gênero e paginação sobre o índice do catálogo.
+
+    Só os cartões da página visível são montados, então o custo do
+    rerun não cresce com o tamanho do catálogo. Com poucas rádios (até
+    uma página) a grade aparece inteira, sem os controles. O script de
+    aquecimento dos cartões visíveis entra em `scripts`.
+    """
     st.markdown(
         "<h3 style='text-align:center; font-size:1.15rem; opacity:0.9; margin-bottom:16px;'>"
         "📻 Selecione sua rádio</h3>",
         unsafe_allow_html=True
     )
 
+    index = search.get_index()
+    names = index.names
+    page_size = settings.GRID_PAGE_SIZE
+
+    if len(names) > page_size:
+        counts = dict(index.facets)
+        col_query, col_genre = st.columns([3, 2], gap="small")
+        with col_query:
+            query = st.text_input(
+                "Buscar rádio", key="grid_query", on_change=_reset_grid_page,
+                placeholder="🔎 Buscar por nome, gênero ou tag", label_visibility="collapsed",
+            )
+        with col_genre:
+            genre = st.selectbox(
+                "Gênero", [None, *list(counts)[:50]], key="grid_genre",
+                on_change=_reset_grid_page, label_visibility="collapsed",
+                format_func=lambda g: "Todos os gêneros" if g is None else f"{g} ({counts[g]})",
+            )
+        names = index.search(query, genre)
+
+    pages = max(1, -(-len(names) // page_size))
+    page = min(st.session_state.get("grid_page", 0), pages - 1)
+    visible = {name: radios[name] for name in names[page * page_size:(page + 1) * page_size]
+               if name in radios}
+
+    if hints.session_arm(st.session_state) == "warm":
+        scripts.append(hints.warm_js(
+            {info["id"]: hints.origin(stream_source(info)[0]) for info in visible.values()}
+        ))
+    if not visible:
+        st.markdown("<p class='autoplay-hint' style='text-align:center;'>Nenhuma rádio encontrada.</p>",
+                    unsafe_allow_html=True)
+    render_radio_buttons(visible)
+
+    if pages > 1:
+        col_prev, col_info, col_next = st.columns([1, 2, 1], gap="small")
+        with col_prev:
+            st.button("◀", key="grid_prev", disabled=page == 0,
+                      on_click=_turn_grid_page, args=(-1,), use_container_width=True)
+        with col_info:
+            st.markdown(
+                f"<p class='autoplay-hint' style='text-align:center;'>Página {page + 1} de {pages}"
+                f" · {len(names)} rádios</p>",
+                unsafe_allow_html=True
+            )
+        with col_next:
+            st.button("▶", key="grid_next", disabled=page >= pages - 1,
+                      on_click=_turn_grid_page, args=(1,), use_container_width=True)
+
+
+@metrics.timed("render_radio_buttons")
+def render_radio_buttons(radios):
+    """Renderiza as rádios como cartões.
+
+    CSS e HTML de cada cartão vêm prontos do cache de templates; o
+    rerun só escolhe o template certo para o estado atual.
+    """
     cols = st.columns(2, gap="medium")
+    current = st.session_state.get("current_radio")
+    if settings.HEALTH_ENABLED:
+        health_monitor.check(radios)
+    if settings.PLAYBACK_BEACON:
+        import playback
+    if settings.QUALITY_ENABLED:
+        import quality
+
+        quality.monitor.ensure_running()
+    if settings.SNIFF_ENABLED:
+        format_cache.ensure(
+            u for info in radios.values()
+            for u in (*station_urls(info), *(v["url"] for v in info.get("variants", ())))
+        )
 
     for i, (name, info) in enumerate(radios.items()):
         with cols[i % 2]:
-            is_playing = st.session_state.get("current_radio") == name
-            border_glow = f"0 0 0 1px {info['color']}aa, 0 8px 22px rgba(0,0,0,0.35)" if is_playing else "0 6px 16px rgba(0,0,0,0.25)"
-
-            with stylable_container(
-                key=f"card_{i}",
-                css_styles=f"""
-                    {{
-                        background: linear-gradient(155deg, {info['color']}26, rgba(255,255,255,0.03));
-                        border: 1px solid {info['color']}55;
-                        border-radius: 18px;
-                        padding: 16px 16px 12px 16px;
-                        margin-bottom: 16px;
-                        box-shadow: {border_glow};
-                        transition: all 0.25s ease;
-                    }}
-                """
-            ):
-                st.markdown(f"""
-                    <div style="display:flex;align-items:center;gap:10px;margin-bottom:10px;">
-                        <div style="font-size:1.8rem;line-height:1;">{info['icon']}</div>
-                        <div style="flex:1;">
-                            <div style="font-weight:700;color:white;font-size:1rem;">{name}</div>
-                            <div style="font-size:0.78rem;color:rgba(255,255,255,0.65);">{info['genre']}</div>
-                        </div>
-                        {'<span class="live-badge"><span class="live-dot"></span>NO AR</span>' if is_playing else ''}
-                    </div>
-                """, unsafe_allow_html=True)
+            is_playing = current == name
+            health = health_monitor.state(info) if settings.HEALTH_ENABLED else "unknown"
+            if settings.PLAYBACK_BEACON:
+                # O que os ouvintes reais mediram pode rebaixar o "ok".
+                health = playback.field_health(info["id"], health)
+            label = quality.monitor.label(info["id"]) if settings.QUALITY_ENABLED else ""
+            card = templates.card(name, info, is_playing, health, label)
+
+            with stylable_container(key=card.key, css_styles=card.css):
+                st.markdown(card.markup, unsafe_allow_html=True)
 
                 if is_playing:
-                    # components.html garante execução real de JS (st.markdown
-                    # não executa <script> e nem sempre preserva onclick de
-                    # forma confiável). O botão vive num iframe, então
-                    # acessamos o documento pai via window.parent.document
-                    # para encontrar e dar play no <audio> real da página —
-                    # isso conta como gesto de clique síncrono e válido.
-                    components.html(f"""
-                        <style>
-                            html, body {{ margin:0; padding:0; background:transparent; }}
-                            .neuros-play-btn {{
-                                width:100%;
-                                box-sizing:border-box;
-                                padding:10px 16px;
-                                font-size:0.95rem;
-                                font-weight:700;
-                                letter-spacing:0.3px;
-                                color:white;
-                                border-radius:999px;
-                                border:1px solid rgba(255,255,255,0.18);
-                                cursor:pointer;
-                                background:rgba(255,255,255,0.06);
-                                box-shadow:0 4px 14px rgba(0,0,0,0.25);
-                                font-family:'Montserrat',sans-serif;
-                                transition: all 0.2s ease;
-                            }}
-                            .neuros-play-btn:hover {{
-                                background:rgba(255,255,255,0.16);
-                                border-color:rgba(255,255,255,0.4);
-                            }}
-                            .neuros-play-btn:active {{
-                                filter:brightness(0.9);
-                            }}
-                        </style>
-                        <button id="neurosPlayBtn_{i}" class="neuros-play-btn">
-                            ⏸️ Tocando agora
-                        </button>
-                        <script>
-                            (function() {{
-                                var btn = document.getElementById("neurosPlayBtn_{i}");
-                                if (btn) {{
-                                    btn.addEventListener("click", function() {{
-                                        try {{
-                                            var pdoc = window.parent.document;
-                                            var audio = pdoc.querySelector("audio");
-                                            if (audio) {{
-                                                audio.play().catch(function(err) {{
-                                                    console.log("Neuros Som: play bloqueado", err);
-                                                }});
-                                            }}
-                                        }} catch (e) {{
-                                            console.log("Neuros Som: erro ao acessar audio", e);
-                                        }}
-                                    }});
-                                }}
-                            }})();
-                        </script>
-                    """, height=52)
+                    components.html(card.play_html, height=52)
                 else:
                     st.button(
                         "▶️ Ouvir agora",
-                        key=f"btn_{i}",
+                        key=card.button_key,
                         use_container_width=True,
                         on_click=_select_radio,
                         args=(name,),
                     )
 
 
-def render_player(radio_name, radio_info):
-    """Renderiza o player de áudio."""
+@metrics.timed("render_player")
+def render_player(radio_name, radio_info, scripts):
+    """Renderiza o player de áudio; scripts da página pai vão em `scripts`."""
     with stylable_container(
         key="player",
         css_styles=f"""
@@ -446,7 +295,7 @@ def render_player(radio_name, radio_info):
             }}
         """
     ):
-        fmt = radio_info.get("format") or guess_format(radio_info["url"])
+        variants = stream_variants(radio_info)
 
         st.markdown(f"""
             <div class="player-container">
@@ -460,8 +309,26 @@ def render_player(radio_name, radio_info):
             </div>
         """, unsafe_allow_html=True)
 
-        st.audio(radio_info["url"], format=fmt, autoplay=True)
-        st.progress(100, text=f"🔊 Conectado à {radio_name}")
+        if settings.NOWPLAYING_ENABLED:
+            render_now_playing(radio_info["id"])
+
+        variant = variants[0]
+        if len(variants) > 1:
+            # O st.audio não mede a rede; quem está no 4G escolhe a taxa.
+            # A troca automática por banda é do player "spa".
+            chosen = st.segmented_control(
+                "Qualidade", [v["label"] for v in variants],
+                key=f"quality_{radio_info['id']}", default=variants[0]["label"],
+                label_visibility="collapsed",
+            )
+            variant = next((v for v in variants if v["label"] == chosen), variant)
+
+        url = variant["url"]
+        if settings.RELAY_ENABLED and settings.TIMESHIFT_MINUTES > 0:
+            url = render_timeshift(radio_info["id"], scripts) or url
+
+        st.audio(url, format=variant["format"], autoplay=True)
+        st.progress(100, text=f"🔊 Conectado à {radio_name} · 📶 {variant['label']}")
         st.markdown(
             "<p class='autoplay-hint'>Se o som não iniciar automaticamente "
             "(alguns navegadores bloqueiam autoplay), toque no cartão desta rádio "
@@ -470,6 +337,48 @@ def render_player(radio_name, radio_info):
         )
 
 
+def render_timeshift(station_id, scripts):
+    """Escolha de quanto voltar no tempo; devolve a URL do relay com o atraso.
+
+    None se o servidor auxiliar não está no ar (sem relay, sem volta).
+
+    Também instala o script que, depois de uma queda de conexão, reabre
+    o stream de onde o ouvinte parou em vez do ao vivo.
+    """
+    if sidecar.ensure_started() is None:
+        return None
+    import relay
+    import timeshift
+
+    options = timeshift.rewind_options()
+    chosen = st.segmented_control(
+        "Voltar", list(options), key=f"rewind_{station_id}", default="Ao vivo",
+        label_visibility="collapsed",
+    )
+    scripts.append(timeshift.resume_js())
+    return relay.listen_url(station_id, options.get(chosen, 0))
+
+
+@st.fragment(run_every=settings.NOWPLAYING_REFRESH)
+def render_now_playing(station_id):
+    """Título da música atual, atualizado sozinho a cada poucos segundos.
+
+    Fragmento com run_every: só esta linha é reexecutada, sem rerun do
+    player nem da página. Cada execução também avisa ao leitor de
+    metadados que ainda há alguém ouvindo esta rádio.
+    """
+    from nowplaying import now_playing
+
+    now_playing.touch(station_id)
+    title = now_playing.title(station_id)
+    if title:
+        st.markdown(
+            f"<p class='now-playing'>🎶 {html.escape(title)}</p>",
+            unsafe_allow_html=True
+        )
+
+
+@metrics.timed("render_footer")
 def render_footer():
     """Renderiza o rodapé com instruções."""
     with stylable_container(
@@ -507,12 +416,122 @@ def render_footer():
         """, unsafe_allow_html=True)
 
 
+@st.fragment
+@metrics.timed("render_stations", rerun="fragment")
+def render_stations():
+    """Grade de cartões + player como um fragmento independente.
+
+    O clique em "Ouvir agora" reexecuta só este fragmento: cabeçalho,
+    CSS global e rodapé não são reenviados ao navegador. Cartões e
+    player ficam no mesmo fragmento porque a troca de estação muda os
+    dois — um fragmento não consegue disparar o rerun de outro. O
+    catálogo é lido aqui dentro (e não recebido por argumento) para
+    que um rerun parcial já enxergue uma recarga do radios.json.
+    Também é aqui que a sessão informa às métricas a rádio atual, já
+    que a troca de rádio não passa por main().
+    """
+    radios = get_radios()
+    scripts = []
+    if settings.PWA_ENABLED:
+        # Manifesto e service worker: instalável, com a casca offline.
+        import pwa
+
+        scripts.append(pwa.bootstrap_js())
+    if settings.PLAYER_MODE == "spa":
+        render_spa_player()
+        render_scripts(scripts)
+        metrics.track_session(st.session_state.get("current_radio"))
+        return
+
+    if settings.PLAYBACK_BEACON and sidecar.ensure_started():
+        import playback
+
+        scripts.append(playback.classic_probe_js(
+            sidecar.public_url("playback"), hints.session_arm(st.session_state)
+        ))
+    render_station_grid(radios, scripts)
+    radio_atual = st.session_state.get("current_radio")
+
+    if radio_atual and radio_atual in radios:
+        render_player(radio_atual, radios[radio_atual], scripts)
+    render_scripts(scripts)
+    metrics.track_session(radio_atual)
+
+
+def render_scripts(scripts):
+    """Um só iframe de altura 0 com os scripts da página pai desta execução.
+
+    Cada script se instala uma vez por aba (o iframe é recriado quando o
+    conteúdo muda); juntos, evitam um iframe por recurso a cada rerun.
+    """
+    if scripts:
+        components.html("<script>" + "".join(scripts) + "</script>", height=0)
+
+
+@metrics.timed("render_spa_player")
+def render_spa_player():
+    """Modo "spa": cartões e player vivem num único componente.
+
+    A troca de rádio acontece no navegador; o valor devolvido só
+    sincroniza o session_state (rerun apenas deste fragmento).
+    """
+    import spa_player
+
+    # Lista e versão da mesma foto do catálogo: uma recarga no meio do
+    # rerun não deixa uma versão nova guardada com conteúdo antigo.
+    cat = get_catalog()
+
+    def build():
+        # Uma vez por versão, para o processo todo: agenda as sondagens
+        # vencidas e aplica failover e formatos já conhecidos.
+        if settings.HEALTH_ENABLED:
+            health_monitor.check(cat.radios)
+        if settings.SNIFF_ENABLED:
+            format_cache.ensure(
+                u for info in cat.radios.values()
+                for u in (*station_urls(info), *(v["url"] for v in info.get("variants", ())))
+            )
+        stations = []
+        for name, info in cat.radios.items():
+            variants = stream_variants(info)
+            stations.append({
+                "id": info["id"], "name": name, "icon": info["icon"],
+                "genre": info["genre"], "color": info["color"],
+                "url": variants[0]["url"], "format": variants[0]["format"],
+                "variants": variants,
+            })
+        return stations, hints.plan(hints.origin(v["url"]) for s in stations for v in s["variants"])
+
+    version, (stations, plan) = spa_player.payload(
+        f"{cat.version}.{health_monitor.version}.{format_cache.version}", build,
+        settings.HEALTH_TTL / 2,
+    )
+    current = cat.radios.get(st.session_state.get("current_radio"))
+    current_id = current["id"] if current else None
+    arm = hints.session_arm(st.session_state)
+    preconnect, dns_prefetch = plan if arm != "none" else ([], [])
+    chosen = spa_player.render(
+        version, stations, current_id,
+        hints={"preconnect": preconnect, "dns_prefetch": dns_prefetch, "warm": arm == "warm"},
+        arm=arm,
+        telemetry_url=sidecar.public_url("playback")
+        if settings.PLAYBACK_BEACON and sidecar.ensure_started() else "",
+    )
+    if chosen != current_id:
+        st.session_state["current_radio"] = cat.by_id.get(chosen)
+
+
+@metrics.timed("main", rerun="full")
 def main():
     if "current_radio" not in st.session_state:
         st.session_state["current_radio"] = None
 
+    if settings.PLAYER_MODE != "spa" and hints.session_arm(st.session_state) != "none":
+        # Dicas de conexão para os hosts das rádios, antes do clique
+        # (no modo "spa" o próprio componente as aplica).
+        st.markdown(hints.catalog_tags(), unsafe_allow_html=True)
+
     render_header()
-    radios = get_radios()
 
     with stylable_container(
         key="main_container",
@@ -527,14 +546,13 @@ def main():
             }
         """
     ):
-        render_radio_buttons(radios)
-        radio_atual = st.session_state.get("current_radio")
-
-        if radio_atual and radio_atual in radios:
-            render_player(radio_atual, radios[radio_atual])
+        render_stations()
 
     render_footer()
 
+    if metrics.ENABLED:
+        sidecar.ensure_started()
+
 
 if __name__ == "__main__":
     main()
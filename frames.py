@@ -0,0 +1,100 @@
+"""Leitura de cabeçalhos de quadro MP3 (MPEG áudio) e AAC (ADTS).
+
+Funções puras sobre bytes, usadas para identificar o codec de um
+stream e para achar fronteiras de quadro dentro de um buffer.
+"""
+from typing import NamedTuple, Optional
+
+MP3, ADTS = "mp3", "adts"
+
+# kbps por [versão][camada]; índice 0 = "free", 15 = inválido.
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Hz por versão MPEG (1, 2 e 2.5).
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+ADTS_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000,
+                     22050, 16000, 12000, 11025, 8000, 7350)
+
+
+class FrameHeader(NamedTuple):
+    kind: str          # MP3 ou ADTS
+    length: int        # bytes do quadro, cabeçalho incluso
+    bitrate: int       # kbps (0 quando o cabeçalho não informa, caso do ADTS)
+    sample_rate: int   # Hz
+    samples: int       # amostras PCM por quadro
+
+
+def parse_mp3(buf, pos: int = 0) -> Optional[FrameHeader]:
+    """Cabeçalho MPEG áudio em buf[pos:pos+4], ou None se não for válido."""
+    if len(buf) - pos < 4 or buf[pos] != 0xFF or (buf[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2 = buf[pos + 1], buf[pos + 2]
+    version = _VERSIONS.get((b1 >> 3) & 3)
+    layer = _LAYERS.get((b1 >> 1) & 3)
+    br_idx, sr_idx, pad = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+    if version is None or layer is None or br_idx in (0, 15) or sr_idx == 3:
+        return None
+
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][br_idx]
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    if layer == 1:
+        length, samples = (12 * bitrate * 1000 // sample_rate + pad) * 4, 384
+    elif layer == 2 or version == 1:
+        length, samples = 144 * bitrate * 1000 // sample_rate + pad, 1152
+    else:
+        length, samples = 72 * bitrate * 1000 // sample_rate + pad, 576
+    return FrameHeader(MP3, length, bitrate, sample_rate, samples)
+
+
+def parse_adts(buf, pos: int = 0) -> Optional[FrameHeader]:
+    """Cabeçalho ADTS em buf[pos:pos+7], ou None se não for válido."""
+    if len(buf) - pos < 7 or buf[pos] != 0xFF or (buf[pos + 1] & 0xF6) != 0xF0:
+        return None
+    sr_idx = (buf[pos + 2] >> 2) & 0xF
+    length = ((buf[pos + 3] & 3) << 11) | (buf[pos + 4] << 3) | (buf[pos + 5] >> 5)
+    if sr_idx >= len(ADTS_SAMPLE_RATES) or length < 7:
+        return None
+    blocks = (buf[pos + 6] & 3) + 1
+    return FrameHeader(ADTS, length, 0, ADTS_SAMPLE_RATES[sr_idx], 1024 * blocks)
+
+
+def parse_frame(buf, pos: int = 0) -> Optional[FrameHeader]:
+    return parse_adts(buf, pos) or parse_mp3(buf, pos)
+
+
+def find_sync(buf, start: int = 0, confirm: int = 2) -> Optional[int]:
+    """Primeira posição >= start com `confirm` quadros válidos em sequência.
+
+    Exigir quadros encadeados (cada um começando onde o anterior termina)
+    evita falsos positivos com bytes 0xFF soltos no meio do áudio. Se o
+    buffer acabar antes de confirmar, aceita os quadros vistos até ali.
+    `buf` deve ser bytes ou bytearray.
+    """
+    end = len(buf) - 1
+    pos = start
+    while pos < end:
+        pos = buf.find(b"\xff", pos)
+        if pos < 0:
+            return None
+        header = parse_frame(buf, pos)
+        if header is not None:
+            kind, nxt, seen = header.kind, pos + header.length, 1
+            while seen < confirm:
+                following = parse_frame(buf, nxt)
+                if following is None or following.kind != kind:
+                    break
+                nxt += following.length
+                seen += 1
+            if seen >= confirm or nxt + 7 > len(buf):
+                return pos
+        pos += 1
+    return None
@@ -0,0 +1,186 @@
+"""Sondagem de saúde dos streams com cache TTL compartilhado.
+
+Todas as URLs do catálogo (principal e espelhos) são sondadas em
+paralelo no loop de fundo: tempo de conexão, status HTTP/ICY e tempo
+até o primeiro byte de áudio. O resultado fica num cache com TTL
+comum a todas as sessões; o render só consulta o cache e, se ele
+estiver velho, agenda uma nova rodada sem esperar por ela. Com
+NEUROS_SHARED_CACHE, a rodada aproveita o que outra réplica já sondou
+e só sonda as URLs que esta réplica reservou (ver sharedcache.py).
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import background
+import catalog
+import icyhttp
+import settings
+import sharedcache
+
+logger = logging.getLogger(__name__)
+
+OK, SLOW, DOWN, UNKNOWN = "ok", "slow", "down", "unknown"
+
+# Máximo de conexões simultâneas por host durante uma rodada.
+PER_HOST_LIMIT = 2
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    url: str
+    state: str
+    status: Optional[int] = None
+    connect_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    error: str = ""
+    checked_at: float = 0.0
+
+
+async def probe(url: str, timeout: float = 5.0, slow_ms: float = 1500.0) -> ProbeResult:
+    """Abre o stream, espera o primeiro byte de áudio e fecha."""
+    start = time.perf_counter()
+    resp = None
+    try:
+        resp = await icyhttp.open_stream(url, timeout=timeout)
+        connect_ms = (time.perf_counter() - start) * 1e3
+        if resp.status != 200:
+            return ProbeResult(url, DOWN, status=resp.status, connect_ms=connect_ms,
+                               error=resp.reason, checked_at=time.time())
+        chunk = await asyncio.wait_for(resp.reader.read(1), timeout)
+        if not chunk:
+            return ProbeResult(url, DOWN, status=resp.status, connect_ms=connect_ms,
+                               error="stream vazio", checked_at=time.time())
+        ttfb_ms = (time.perf_counter() - start) * 1e3
+        state = SLOW if ttfb_ms > slow_ms else OK
+        return ProbeResult(url, state, status=resp.status, connect_ms=connect_ms,
+                           ttfb_ms=ttfb_ms, checked_at=time.time())
+    except (OSError, ValueError, asyncio.TimeoutError) as exc:
+        return ProbeResult(url, DOWN, error=str(exc) or type(exc).__name__,
+                           checked_at=time.time())
+    finally:
+        if resp is not None:
+            resp.close()
+
+
+async def probe_all(urls, timeout: float = 5.0, slow_ms: float = 1500.0,
+                    per_host: int = PER_HOST_LIMIT) -> dict:
+    """Sonda `urls` em paralelo, limitando conexões por host."""
+    results = await icyhttp.gather_per_host(
+        urls, lambda url: probe(url, timeout, slow_ms), per_host
+    )
+    return {r.url: r for r in results}
+
+
+def station_urls(info) -> list:
+    """URL principal seguida dos espelhos declarados no catálogo."""
+    return [info["url"], *info.get("mirrors", ())]
+
+
+class HealthMonitor:
+    """Cache TTL dos resultados de sondagem, compartilhado pelo processo.
+
+    A validade é por URL: cada rerun só pede a sondagem das URLs que
+    ele mostra e que estão vencidas, então catálogos grandes não
+    disparam milhares de conexões de uma vez.
+    """
+
+    def __init__(self, ttl: float, timeout: float, slow_ms: float):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.slow_ms = slow_ms
+        self._results = {}
+        self._expires = {}       # url -> monotonic em que o resultado vence
+        # Muda quando o estado de alguma URL muda (e com ele o failover).
+        self.version = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def refresh(self, urls):
+        """Agenda a sondagem das `urls` que ainda não estão em curso."""
+        with self._lock:
+            todo = [u for u in dict.fromkeys(urls) if u not in self._pending]
+            self._pending.update(todo)
+        if not todo:
+            return None
+        future = background.submit(self._round(todo))
+        future.add_done_callback(lambda f: self._store(todo, f))
+        return future
+
+    async def _round(self, urls) -> dict:
+        """{url: (ProbeResult, segundos de validade)} das URLs resolvidas."""
+        shared = sharedcache.get_cache()
+        if shared is None:
+            results = await probe_all(urls, self.timeout, self.slow_ms)
+            return {url: (r, self.ttl) for url, r in results.items()}
+
+        async def compute(todo):
+            results = await probe_all(todo, self.timeout, self.slow_ms)
+            return {url: asdict(r) for url, r in results.items()}
+
+        found = await sharedcache.resolve(shared, "health", urls, compute, self.ttl)
+        return {url: (ProbeResult(**r), ttl) for url, (r, ttl) in found.items()}
+
+    def _store(self, urls, future):
+        now = time.monotonic()
+        try:
+            found = future.result()
+            # URL fora do resultado: outra réplica está sondando.
+            retry = sharedcache.RETRY
+        except Exception:
+            logger.exception("Falha na rodada de sondagem")
+            found, retry = {}, self.ttl / 4
+        with self._lock:
+            if any(self.result(url).state != r.state for url, (r, _) in found.items()):
+                self.version += 1
+            self._results = {**self._results, **{url: r for url, (r, _) in found.items()}}
+            for url in urls:
+                self._expires[url] = now + (found[url][1] if url in found else retry)
+            self._pending.difference_update(urls)
+
+    def invalidate(self):
+        """Força nova sondagem de todas as URLs na próxima consulta."""
+        with self._lock:
+            self._expires.clear()
+
+    def result(self, url: str) -> ProbeResult:
+        return self._results.get(url) or ProbeResult(url, UNKNOWN)
+
+    def check(self, radios):
+        """Sonda as URLs vencidas das rádios em `radios`; nunca bloqueia."""
+        now = time.monotonic()
+        stale = [
+            u for info in radios.values() for u in station_urls(info)
+            if self._expires.get(u, 0.0) <= now
+        ]
+        if stale:
+            self.refresh(stale)
+
+    def state(self, info) -> str:
+        """Melhor estado entre a URL principal e os espelhos da estação."""
+        states = {self.result(u).state for u in station_urls(info)}
+        for state in (OK, SLOW, UNKNOWN):
+            if state in states:
+                return state
+        return DOWN
+
+    def pick_url(self, info) -> str:
+        """Primeira URL saudável, com failover para os espelhos.
+
+        Sem resultados ainda (ou tudo fora do ar), fica com a principal.
+        """
+        urls = station_urls(info)
+        for wanted in ((OK,), (SLOW, UNKNOWN)):
+            for url in urls:
+                if self.result(url).state in wanted:
+                    return url
+        return urls[0]
+
+
+monitor = HealthMonitor(settings.HEALTH_TTL, settings.HEALTH_TIMEOUT, settings.HEALTH_SLOW_MS)
+
+# Estação nova ou URL trocada no catálogo: sonda já na próxima consulta.
+catalog.on_reload(lambda _catalog: monitor.invalidate())
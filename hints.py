@@ -0,0 +1,118 @@
+"""Dicas de conexão (dns-prefetch/preconnect) para os hosts das rádios.
+
+Depois do clique, o navegador ainda faz DNS, TCP e TLS até o servidor
+do stream antes do primeiro byte de áudio. As dicas adiantam isso: as
+primeiras origens do catálogo (a ordem da grade) recebem `preconnect`,
+as seguintes só `dns-prefetch`, cada origem uma vez e com limite —
+conexões abertas à toa custam sockets e handshakes no celular.
+
+Com NEUROS_PREWARM=1, passar o mouse ou o foco num cartão também abre
+a conexão da rádio daquele cartão, mesmo fora do limite. O <audio>
+não usa CORS, por isso as dicas vão sem `crossorigin` (senão a
+conexão aquecida não serve para ele).
+
+NEUROS_HINTS=ab sorteia cada sessão entre "none", "hints" e "warm"
+para que /playback compare o clique-até-áudio com e sem as dicas.
+"""
+import json
+import random
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import catalog
+import settings
+
+ARMS = ("none", "hints", "warm")
+
+
+def origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def station_origins(radios) -> list:
+    """Origens dos streams na ordem do catálogo, sem repetição."""
+    seen = {}
+    for info in radios.values():
+        seen.setdefault(origin(info["url"]), None)
+        for variant in info.get("variants", ()):
+            seen.setdefault(origin(variant["url"]), None)
+    return list(seen)
+
+
+def plan(origins) -> tuple:
+    """(preconnect, dns_prefetch): as origens sem repetição, com os limites."""
+    origins = list(dict.fromkeys(origins))
+    return (origins[:settings.HINTS_PRECONNECT_MAX],
+            origins[settings.HINTS_PRECONNECT_MAX:settings.HINTS_DNS_PREFETCH_MAX])
+
+
+def link_tags(origins) -> str:
+    preconnect, dns_prefetch = plan(origins)
+    return "".join(
+        [f'<link rel="preconnect" href="{o}">' for o in preconnect]
+        + [f'<link rel="dns-prefetch" href="{o}">' for o in dns_prefetch]
+    )
+
+
+@lru_cache(maxsize=4)
+def _catalog_tags(version: int) -> str:
+    if settings.RELAY_ENABLED:
+        # No modo relay todo áudio vem do servidor auxiliar.
+        return link_tags([origin(settings.SIDECAR_PUBLIC_URL)])
+    return link_tags(station_origins(catalog.get_catalog().radios))
+
+
+def catalog_tags() -> str:
+    """Dicas do catálogo atual, calculadas uma vez por versão."""
+    return _catalog_tags(catalog.get_catalog().version)
+
+
+def session_arm(state) -> str:
+    """Variante do experimento para a sessão (`state` é o session_state)."""
+    if settings.HINTS == "ab":
+        if "hints_arm" not in state:
+            state["hints_arm"] = random.choice(ARMS)
+        return state["hints_arm"]
+    if settings.HINTS == "off":
+        return "none"
+    return "warm" if settings.PREWARM else "hints"
+
+
+def warm_js(origins_by_card: dict) -> str:
+    """Script (para a página pai) que aquece a conexão do cartão sob o mouse.
+
+    Os ouvintes são instalados uma vez por aba na página pai; a cada
+    render só o mapa cartão -> origem é trocado.
+    """
+    return f"""
+        (function() {{
+            var w = window.parent;
+            w.__neurosWarmOrigins = {json.dumps(origins_by_card)};
+            if (w.__neurosWarm) return;
+            w.__neurosWarm = {{}};
+            function warm(e) {{
+                var card = e.target.closest && e.target.closest('[class*="st-key-card_"]');
+                if (!card) return;
+                var m = card.className.match(/st-key-card_([a-z0-9-]+)/);
+                var o = m && w.__neurosWarmOrigins[m[1]];
+                // Conexão aquecida e não usada fecha em ~10 s; depois
+                // disso, passar de novo pelo cartão aquece outra vez.
+                var now = Date.now();
+                if (!o || now - (w.__neurosWarm[o] || 0) < 10000) return;
+                w.__neurosWarm[o] = now;
+                var old = w.document.head.querySelector('link[data-neuros-warm="' + o + '"]');
+                if (old) old.remove();
+                var link = w.document.createElement("link");
+                link.rel = "preconnect";
+                link.href = o;
+                link.dataset.neurosWarm = o;
+                w.document.head.appendChild(link);
+            }}
+            w.document.addEventListener("pointerover", warm, true);
+            w.document.addEventListener("focusin", warm, true);
+        }})();
+    """
+
+
+catalog.on_reload(lambda cat: _catalog_tags.cache_clear())
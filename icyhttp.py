@@ -0,0 +1,125 @@
+"""Cliente HTTP/ICY assíncrono mínimo para abrir streams de rádio.
+
+Servidores Shoutcast antigos respondem "ICY 200 OK" em vez de
+"HTTP/1.1 200 OK", o que quebra clientes HTTP comuns; aqui a linha de
+status é tratada à mão. Só o necessário para sondar, farejar e
+retransmitir streams: GET, cabeçalhos, redirecionamentos e TLS.
+"""
+import asyncio
+import ssl
+from collections import defaultdict
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = "NeurosSom/1.0"
+
+_ssl_context = None
+
+
+class StreamError(OSError):
+    """Falha ao abrir ou ler um stream."""
+
+
+@dataclass
+class StreamResponse:
+    url: str
+    status: int
+    reason: str
+    headers: dict            # nomes em minúsculas
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def close(self):
+        self.writer.close()
+
+
+def _get_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+async def _read_head(reader):
+    status_line = (await reader.readline()).decode("latin-1").strip()
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise StreamError(f"linha de status inválida: {status_line!r}")
+    status, reason = int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, reason, headers
+
+
+async def open_stream(url: str, headers=None, timeout: float = 5.0,
+                      max_redirects: int = 3) -> StreamResponse:
+    """Abre `url` com GET e devolve a resposta com o corpo ainda por ler.
+
+    Segue até `max_redirects` redirecionamentos (streamtheworld e
+    zeno.fm redirecionam para o servidor de borda). `timeout` vale para
+    conexão e cabeçalhos; quem chama é responsável por fechar a resposta.
+    """
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise StreamError(f"esquema não suportado: {url!r}")
+        tls = parts.scheme == "https"
+        port = parts.port or (443 if tls else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                parts.hostname, port,
+                ssl=_get_ssl_context() if tls else None,
+                server_hostname=parts.hostname if tls else None,
+            ),
+            timeout,
+        )
+        request = {
+            "Host": parts.netloc,
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Connection": "close",
+            **(headers or {}),
+        }
+        writer.write(
+            (f"GET {path} HTTP/1.1\r\n"
+             + "".join(f"{k}: {v}\r\n" for k, v in request.items())
+             + "\r\n").encode("latin-1")
+        )
+        try:
+            status, reason, resp_headers = await asyncio.wait_for(_read_head(reader), timeout)
+        except BaseException:
+            writer.close()
+            raise
+
+        if status in (301, 302, 303, 307, 308) and "location" in resp_headers:
+            writer.close()
+            url = urljoin(url, resp_headers["location"])
+            continue
+        return StreamResponse(url, status, reason, resp_headers, reader, writer)
+
+    raise StreamError(f"redirecionamentos demais a partir de {url!r}")
+
+
+async def gather_per_host(urls, fn, per_host: int = 2) -> list:
+    """Executa `await fn(url)` para todas as URLs em paralelo.
+
+    Limita a `per_host` conexões simultâneas por host, para não abrir
+    dezenas de sockets contra o mesmo provedor (ex.: streeemer).
+    """
+    limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+    async def limited(url):
+        async with limits[urlsplit(url).hostname]:
+            return await fn(url)
+
+    return await asyncio.gather(*(limited(u) for u in urls))
@@ -0,0 +1,420 @@
+"""Teste de carga: quantas sessões simultâneas uma instância do app aguenta.
+
+Uso:
+    python loadtest.py [--steps 50 100 200 400 800] [--duration 30]
+                       [--stations 40] [--hosts 8] [--think 15]
+                       [--p99-limit 1000] [--audio] [--out carga.json]
+                       [--compare carga-anterior.json]
+
+Sobe uma fazenda de streams falsos (fakestream.py, um servidor por
+"host", com metadados ICY) no lugar das URLs do catálogo e o app pelo
+serve.py, como em produção. Cada sessão simulada fala o protocolo do
+navegador — websocket em /_stcore/stream com BackMsg/ForwardMsg — e
+clica em cartões "Ouvir agora" da grade a intervalos exponenciais de
+média `--think` segundos; também repete os reruns automáticos que o
+servidor pede (o "tocando agora"). Com `--audio`, cada sessão ainda
+abre o stream do player, como o <audio> faria (no modo relay, isso
+carrega o servidor auxiliar).
+
+As sessões sobem em degraus (`--steps`), sem derrubar as anteriores.
+Em cada degrau: latência de rerun p50/p99 (do BackMsg ao
+script_finished), erros, CPU e RSS do processo do servidor (via /proc)
+e RSS por sessão. O ponto de ruptura é o primeiro degrau com p99 acima
+de `--p99-limit` ms ou mais de 1% de erros; dali para cima não se
+mede. O resultado sai em JSON (stdout ou `--out`) e `--compare`
+mostra a diferença para um resultado anterior.
+
+Variáveis NEUROS_* do ambiente passam para o servidor, então dá para
+medir os modos opcionais (ex.: NEUROS_RELAY=1 python loadtest.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+import bench
+import fakestream
+import icyhttp
+
+ROOT = Path(__file__).resolve().parent
+
+# Um rerun que não termina neste tempo (s) conta como erro.
+RERUN_TIMEOUT = 30.0
+
+# Sessões novas por segundo ao subir um degrau (como visitantes chegando).
+RAMP_PER_SECOND = 50
+
+# Fração máxima de reruns com erro antes de declarar a ruptura.
+MAX_ERROR_RATE = 0.01
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples, q: float):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 1)
+
+
+class Farm:
+    """Streams falsos em `hosts` servidores, um por origem do catálogo."""
+
+    def __init__(self, hosts: int):
+        self.servers = [
+            fakestream.FakeStreamServer(titles=(f"Artista {i} - Música A", f"Artista {i} - Música B"))
+            for i in range(hosts)
+        ]
+
+    def catalog(self, stations: int) -> dict:
+        data = bench.make_catalog(stations)
+        for i, station in enumerate(data["stations"]):
+            station["url"] = self.servers[i % len(self.servers)].url(f"/meta/{station['id']}")
+        return data
+
+    def __enter__(self):
+        for server in self.servers:
+            server.start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in self.servers:
+            server.stop()
+
+
+class ServerProcess:
+    """O app rodando pelo serve.py num subprocesso, com CPU e RSS lidos do /proc."""
+
+    def __init__(self, catalog_path: str, cache_dir: str):
+        self.port = _free_port()
+        sidecar_port = _free_port()
+        env = {
+            **os.environ,
+            "NEUROS_CATALOG": catalog_path,
+            "NEUROS_CACHE_DIR": cache_dir,
+            "NEUROS_SIDECAR_PORT": str(sidecar_port),
+            "NEUROS_SIDECAR_PUBLIC_URL": f"http://127.0.0.1:{sidecar_port}",
+        }
+        self.proc = subprocess.Popen(
+            [sys.executable, str(ROOT / "serve.py"), "--server.headless", "true",
+             "--server.port", str(self.port), "--browser.gatherUsageStats", "false"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self._cpu_mark = (time.monotonic(), self._cpu_seconds())
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"servidor saiu com código {self.proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("servidor não respondeu a tempo")
+
+    def _cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.proc.pid}/stat") as fh:
+                fields = fh.read().rpartition(")")[2].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def rss_bytes(self):
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def cpu_percent(self):
+        """CPU (% de um núcleo) desde a chamada anterior; None fora do Linux."""
+        now, cpu = time.monotonic(), self._cpu_seconds()
+        (then, before), self._cpu_mark = self._cpu_mark, (now, cpu)
+        if cpu is None or before is None:
+            return None
+        return round((cpu - before) / (now - then) * 100, 1)
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class Session:
+    """Uma aba do navegador: websocket, reruns e cliques em cartões."""
+
+    def __init__(self, url: str, think: float, rng: random.Random, audio: bool):
+        self.url = url
+        self.think = think
+        self.rng = rng
+        self.audio = audio
+        self.page_hash = ""
+        self.buttons = {}          # id do widget -> fragmento
+        self.audio_url = None
+        self.latencies = []        # (tipo, ms)
+        self.errors = 0
+        self._pending = None
+        self._busy = asyncio.Lock()
+        self._tasks = []
+        self._auto = {}            # fragmento -> task do rerun automático
+        self._listener = None
+
+    async def start(self):
+        self.ws = await connect(self.url, subprotocols=["streamlit"], max_size=None,
+                                compression=None, ping_interval=None, open_timeout=RERUN_TIMEOUT)
+        self._tasks.append(asyncio.ensure_future(self._read()))
+        await self._rerun(self._state(), "load")
+        self._tasks.append(asyncio.ensure_future(self._click_loop()))
+
+    def _state(self, fragment_id: str = "", **fields):
+        return ClientState(page_script_hash=self.page_hash, fragment_id=fragment_id, **fields)
+
+    async def _rerun(self, state, kind: str):
+        async with self._busy:
+            done = asyncio.get_running_loop().create_future()
+            self._pending = done
+            start = time.perf_counter()
+            try:
+                await self.ws.send(BackMsg(rerun_script=state).SerializeToString())
+                await asyncio.wait_for(done, RERUN_TIMEOUT)
+                self.latencies.append((kind, (time.perf_counter() - start) * 1e3))
+            except (asyncio.TimeoutError, OSError, ConnectionClosed):
+                self.errors += 1
+            finally:
+                self._pending = None
+
+    async def _read(self):
+        early = ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN
+        try:
+            async for raw in self.ws:
+                msg = ForwardMsg()
+                msg.ParseFromString(raw)
+                kind = msg.WhichOneof("type")
+                if kind == "new_session":
+                    self.page_hash = msg.new_session.page_script_hash
+                elif kind == "delta" and msg.delta.HasField("new_element"):
+                    element = msg.delta.new_element
+                    which = element.WhichOneof("type")
+                    if which == "button" and "-btn_" in element.button.id:
+                        self.buttons[element.button.id] = msg.delta.fragment_id
+                    elif which == "audio" and element.audio.url != self.audio_url:
+                        self.audio_url = element.audio.url
+                        if self.audio:
+                            self._listen(self.audio_url)
+                elif kind == "auto_rerun" and msg.auto_rerun.fragment_id not in self._auto:
+                    self._auto[msg.auto_rerun.fragment_id] = asyncio.ensure_future(
+                        self._auto_loop(msg.auto_rerun.fragment_id, msg.auto_rerun.interval)
+                    )
+                elif kind == "script_finished" and msg.script_finished != early:
+                    if self._pending is not None and not self._pending.done():
+                        self._pending.set_result(None)
+        except (OSError, ConnectionClosed):
+            self.errors += 1
+
+    async def _click_loop(self):
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think))
+            if not self.buttons:
+                continue
+            button, fragment = self.rng.choice(list(self.buttons.items()))
+            state = self._state(fragment)
+            state.widget_states.widgets.add(id=button, trigger_value=True)
+            await self._rerun(state, "click")
+
+    async def _auto_loop(self, fragment: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if not self._busy.locked():
+                await self._rerun(self._state(fragment, is_auto_rerun=True), "auto")
+
+    def _listen(self, url: str):
+        async def drain():
+            try:
+                resp = await icyhttp.open_stream(url, timeout=RERUN_TIMEOUT)
+                try:
+                    while await resp.reader.read(64 * 1024):
+                        pass
+                finally:
+                    resp.close()
+            except (OSError, ValueError, asyncio.TimeoutError):
+                pass
+
+        if self._listener is not None:
+            self._listener.cancel()
+        self._listener = asyncio.ensure_future(drain())
+
+    def take(self):
+        """Latências e erros desde a chamada anterior."""
+        latencies, errors = self.latencies, self.errors
+        self.latencies, self.errors = [], 0
+        return latencies, errors
+
+    async def close(self):
+        for task in [*self._tasks, *self._auto.values(), self._listener]:
+            if task is not None:
+                task.cancel()
+        await self.ws.close()
+
+
+async def run_steps(server, steps, duration: float, think: float, p99_limit: float,
+                    audio: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    sessions, results, breaking_point = [], [], None
+    baseline_rss = server.rss_bytes()
+    try:
+        for target in steps:
+            failed_connects = 0
+            while len(sessions) < target:
+                batch = [Session(server.ws_url, think, random.Random(rng.random()), audio)
+                         for _ in range(min(RAMP_PER_SECOND, target - len(sessions)))]
+                started = await asyncio.gather(*(s.start() for s in batch), return_exceptions=True)
+                for session, outcome in zip(batch, started):
+                    if isinstance(outcome, Exception):
+                        failed_connects += 1
+                    else:
+                        sessions.append(session)
+                if failed_connects > target * MAX_ERROR_RATE:
+                    break
+                await asyncio.sleep(1.0)
+
+            for session in sessions:
+                session.take()
+            server.cpu_percent()
+            harness_cpu = time.process_time()
+            await asyncio.sleep(duration)
+
+            latencies, errors = [], failed_connects
+            for session in sessions:
+                lat, err = session.take()
+                latencies += lat
+                errors += err
+            clicks = [ms for kind, ms in latencies if kind == "click"]
+            rss = server.rss_bytes()
+            step = {
+                "sessions": len(sessions),
+                "target": target,
+                "reruns": len(latencies),
+                "reruns_per_s": round(len(latencies) / duration, 1),
+                "errors": errors,
+                "p50_ms": _percentile([ms for _, ms in latencies], 0.5),
+                "p99_ms": _percentile([ms for _, ms in latencies], 0.99),
+                "click_p50_ms": _percentile(clicks, 0.5),
+                "click_p99_ms": _percentile(clicks, 0.99),
+                "server_cpu_pct": server.cpu_percent(),
+                "server_rss_mb": round(rss / 2**20, 1) if rss else None,
+                "rss_per_session_kb": (round((rss - baseline_rss) / len(sessions) / 1024, 1)
+                                       if rss and baseline_rss and sessions else None),
+                # Perto de 100%, o gargalo pode ser o próprio teste.
+                "harness_cpu_pct": round((time.process_time() - harness_cpu) / duration * 100, 1),
+            }
+            results.append(step)
+            print(json.dumps(step), file=sys.stderr, flush=True)
+
+            total = step["reruns"] + errors
+            if ((step["p99_ms"] or 0) > p99_limit or (total and errors / total > MAX_ERROR_RATE)
+                    or len(sessions) < target):
+                breaking_point = target
+                break
+    finally:
+        await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+    return {"steps": results, "breaking_point": breaking_point,
+            "baseline_rss_mb": round(baseline_rss / 2**20, 1) if baseline_rss else None}
+
+
+def _describe() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    from importlib.metadata import version
+
+    return {
+        "commit": commit,
+        "streamlit": version("streamlit"),
+        "python": sys.version.split()[0],
+        "env": {k: v for k, v in os.environ.items() if k.startswith("NEUROS_")},
+        "when": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(current: dict, previous: dict):
+    """Diferença de p99 e RSS por sessão, degrau a degrau, para um resultado anterior."""
+    before = {s["target"]: s for s in previous["steps"]}
+    print(f"{'sessões':>8} {'p99 antes':>10} {'p99 agora':>10} {'KB/sessão antes':>16} {'agora':>8}")
+    for step in current["steps"]:
+        old = before.get(step["target"], {})
+        print(f"{step['target']:>8} {old.get('p99_ms') or '-':>10} {step['p99_ms'] or '-':>10} "
+              f"{old.get('rss_per_session_kb') or '-':>16} {step['rss_per_session_kb'] or '-':>8}")
+    print(f"ruptura: antes {previous.get('breaking_point') or 'não atingida'}, "
+          f"agora {current.get('breaking_point') or 'não atingida'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[50, 100, 200, 400, 800])
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos medidos por degrau")
+    parser.add_argument("--stations", type=int, default=40)
+    parser.add_argument("--hosts", type=int, default=8)
+    parser.add_argument("--think", type=float, default=15.0, help="média (s) entre cliques de uma sessão")
+    parser.add_argument("--p99-limit", type=float, default=1000.0)
+    parser.add_argument("--audio", action="store_true", help="cada sessão também ouve o stream")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp, Farm(args.hosts) as farm:
+        catalog_path = os.path.join(tmp, "radios.json")
+        with open(catalog_path, "w", encoding="utf-8") as fh:
+            json.dump(farm.catalog(args.stations), fh, ensure_ascii=False)
+        server = ServerProcess(catalog_path, tmp)
+        try:
+            server.wait_ready()
+            result = asyncio.run(run_steps(server, sorted(args.steps), args.duration, args.think,
+                                           args.p99_limit, args.audio, args.seed))
+        finally:
+            server.stop()
+
+    result = {**_describe(), "config": vars(args), **result}
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.compare:
+        compare(result, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
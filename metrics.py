@@ -0,0 +1,195 @@
+"""Instrumentação opcional do render, em Prometheus e logs JSON.
+
+Com NEUROS_METRICS=1, as etapas decoradas com `timed` alimentam
+histogramas de duração; `main` conta os reruns completos e o
+fragmento da grade os reruns parciais, e cada sessão registra a rádio
+que está ouvindo. Os números saem em formato de texto Prometheus em
+/metrics no servidor auxiliar (durações em segundos, como pede a
+convenção) e, por etapa, como uma linha JSON no logger
+"neuros.metrics", escrita no stderr.
+
+Desligado, `timed` devolve a própria função e `track_session` não faz
+nada: o custo em produção é uma checagem de booleano.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+import settings
+import sidecar
+
+logger = logging.getLogger("neuros.metrics")
+
+# Limites superiores (ms) dos baldes dos histogramas.
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Sessão sem rerun por este tempo (s) deixa de contar como ativa.
+SESSION_TTL = 300.0
+
+ENABLED = settings.METRICS_ENABLED
+
+if ENABLED:
+    # Ninguém configura o logging da raiz (que fica em WARNING); as
+    # linhas JSON vão direto para o stderr.
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += ms
+        self.n += 1
+
+
+_lock = threading.Lock()
+_histograms = {}
+_reruns = Counter()    # "full" / "fragment" -> reruns
+_sessions = {}      # session_id -> (monotonic do último rerun, rádio atual)
+
+
+def _run_context():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    return get_script_run_ctx()
+
+
+def _session_id():
+    ctx = _run_context()
+    return ctx.session_id if ctx is not None else None
+
+
+def timed(stage: str, rerun: str = ""):
+    """Decorador que mede cada chamada da etapa `stage` (no-op se desligado).
+
+    `rerun="full"` marca o ponto de entrada do script e
+    `rerun="fragment"` o de um fragmento: a chamada conta um rerun
+    daquele tipo (o fragmento só quando roda sozinho, sem o script).
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                kind = rerun
+                if kind == "fragment":
+                    ctx = _run_context()
+                    kind = kind if ctx is not None and ctx.fragment_ids_this_run else ""
+                observe(stage, (time.perf_counter() - start) * 1e3, kind)
+        return wrapper
+    return decorate
+
+
+def observe(stage: str, ms: float, rerun: str = ""):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(ms)
+        if rerun:
+            _reruns[rerun] += 1
+    logger.info(json.dumps(
+        {"event": "render", "stage": stage, "ms": round(ms, 3), "session": _session_id()}
+    ))
+
+
+def track_session(station):
+    """Registra a sessão atual e a rádio que ela está ouvindo."""
+    if not ENABLED:
+        return
+    sid = _session_id()
+    if sid is not None:
+        with _lock:
+            _sessions[sid] = (time.monotonic(), station)
+
+
+def _active_sessions() -> dict:
+    cutoff = time.monotonic() - SESSION_TTL
+    with _lock:
+        for sid in [s for s, (seen, _) in _sessions.items() if seen < cutoff]:
+            del _sessions[sid]
+        return dict(_sessions)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def exposition() -> str:
+    """Métricas no formato de texto do Prometheus."""
+    sessions = _active_sessions()
+    with _lock:
+        hists = {stage: (list(h.counts), h.total, h.n) for stage, h in _histograms.items()}
+        reruns = dict(_reruns)
+
+    lines = [
+        "# HELP neuros_render_duration_seconds Duração de cada etapa do render.",
+        "# TYPE neuros_render_duration_seconds histogram",
+    ]
+    for stage, (counts, total, n) in sorted(hists.items()):
+        cumulative = 0
+        for bound, count in zip((*(f"{b / 1000:g}" for b in BUCKETS_MS), "+Inf"), counts):
+            cumulative += count
+            lines.append(f'neuros_render_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'neuros_render_duration_seconds_sum{{stage="{stage}"}} {total / 1000:.6f}')
+        lines.append(f'neuros_render_duration_seconds_count{{stage="{stage}"}} {n}')
+
+    lines += [
+        "# HELP neuros_reruns_total Reruns do script (full) e só do fragmento da grade (fragment).",
+        "# TYPE neuros_reruns_total counter",
+        *(f'neuros_reruns_total{{kind="{kind}"}} {reruns.get(kind, 0)}' for kind in ("full", "fragment")),
+        "# HELP neuros_active_sessions Sessões com rerun nos últimos minutos.",
+        "# TYPE neuros_active_sessions gauge",
+        f"neuros_active_sessions {len(sessions)}",
+        "# HELP neuros_session_station Sessões ativas por rádio selecionada.",
+        "# TYPE neuros_session_station gauge",
+    ]
+    for station, count in sorted(Counter(st or "" for _, st in sessions.values()).items()):
+        lines.append(f'neuros_session_station{{station="{_label(station)}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """Mesmo conteúdo de /metrics, em JSON (sessões com a rádio de cada uma)."""
+    sessions = _active_sessions()
+    with _lock:
+        stages = {
+            stage: {"count": h.n, "sum_ms": round(h.total, 3)}
+            for stage, h in _histograms.items()
+        }
+        reruns = dict(_reruns)
+    return {
+        "reruns": reruns,
+        "stages": stages,
+        "sessions": {sid: station for sid, (_, station) in sessions.items()},
+    }
+
+
+@sidecar.route("metrics")
+def serve(handler, rest, query):
+    if rest == "json":
+        handler.send_json(json.dumps(snapshot()).encode())
+        return
+    body = exposition().encode()
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
@@ -0,0 +1,231 @@
+"""Metadados ICY ("tocando agora") compartilhados entre as sessões.
+
+Para cada rádio que alguém está ouvindo, um único leitor no loop de
+fundo pede `Icy-MetaData: 1`, lê os blocos de metadados intercalados
+no áudio a cada `icy-metaint` bytes e publica o título atual. As
+sessões só consultam o título publicado e renovam o interesse pela
+rádio (`touch`); sem renovação por NOWPLAYING_IDLE segundos, o leitor
+encerra a conexão.
+
+Com NEUROS_SHARED_CACHE, o leitor de cada rádio é um só entre todas as
+réplicas: quem tem a reserva da rádio lê o stream e publica o título
+no cache; as demais só leem o título de lá e assumem a leitura se a
+reserva ficar livre (a réplica dona saiu ou ficou sem ouvintes).
+"""
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+import background
+import catalog
+import health
+import icyhttp
+import settings
+import sharedcache
+
+logger = logging.getLogger(__name__)
+
+_FIELD_RE = re.compile(rb"(\w+)='(.*?)';", re.S)
+
+# Bloco de metadados tem no máximo 255 * 16 bytes; mais que isso é lixo.
+MAX_METAINT = 1 << 20
+
+# Segundos até tentar de novo uma rádio que respondeu sem metadados ICY.
+NO_METADATA_RETRY = 600.0
+
+# Espera (s) antes de reabrir uma rádio cuja conexão caiu: dobra a cada
+# falha seguida até RETRY_MAX e volta ao início quando chega um título.
+RETRY_MIN = 5.0
+RETRY_MAX = 300.0
+
+
+class NoMetadata(icyhttp.StreamError):
+    """O stream respondeu, mas sem `icy-metaint`."""
+
+
+def parse_metadata(block: bytes) -> dict:
+    """Campos de um bloco ICY, ex.: {"StreamTitle": "Artista - Música"}."""
+    block = block.rstrip(b"\x00")
+    fields = {}
+    for key, value in _FIELD_RE.findall(block):
+        try:
+            text = value.decode("utf-8")
+        except UnicodeDecodeError:
+            text = value.decode("latin-1")
+        fields[key.decode("ascii")] = text.strip()
+    return fields
+
+
+async def read_titles(resp, publish):
+    """Lê o stream já aberto e chama publish(título) a cada bloco novo."""
+    if resp.status != 200:
+        raise icyhttp.StreamError(f"HTTP {resp.status} {resp.reason}")
+    try:
+        metaint = int(resp.headers.get("icy-metaint", "0"))
+    except ValueError:
+        metaint = 0
+    if not 0 < metaint <= MAX_METAINT:
+        raise NoMetadata("stream sem metadados ICY")
+    while True:
+        await resp.reader.readexactly(metaint)
+        length = (await resp.reader.readexactly(1))[0] * 16
+        if length:
+            title = parse_metadata(await resp.reader.readexactly(length)).get("StreamTitle")
+            if title is not None:
+                publish(title)
+
+
+def retry_delay(failures: int) -> float:
+    """Espera após `failures` quedas seguidas, com jitter (metade a inteira).
+
+    O jitter espalha as reconexões de muitas rádios (ou réplicas) que
+    caíram juntas.
+    """
+    return min(RETRY_MAX, RETRY_MIN * 2 ** failures) * random.uniform(0.5, 1.0)
+
+
+class NowPlaying:
+    """Títulos atuais por rádio e os leitores que os mantêm."""
+
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self._titles = {}
+        self._seen = {}          # station_id -> monotonic do último touch
+        self._readers = {}       # station_id -> Future do leitor
+        self._no_metadata = {}   # station_id -> monotonic até tentar de novo
+        self._lock = threading.Lock()
+
+    def title(self, station_id: str):
+        """Título publicado para a rádio, ou None se ainda não há.
+
+        Só lê a memória local: com cache compartilhado, o leitor de fundo
+        traz para cá o título que a réplica dona da rádio publicou.
+        """
+        return self._titles.get(station_id)
+
+    def touch(self, station_id: str):
+        """Sinaliza que há alguém ouvindo; inicia o leitor se preciso.
+
+        Rádio que respondeu sem metadados só ganha outro leitor depois
+        de NO_METADATA_RETRY segundos.
+        """
+        now = time.monotonic()
+        self._seen[station_id] = now
+        if self._no_metadata.get(station_id, 0.0) > now:
+            return
+        with self._lock:
+            reader = self._readers.get(station_id)
+            if reader is None or reader.done():
+                self._readers[station_id] = background.submit(self._run(station_id))
+
+    def _listening(self, station_id: str) -> bool:
+        return time.monotonic() - self._seen.get(station_id, 0.0) < self.idle_timeout
+
+    async def _share(self, shared, station_id: str) -> bool:
+        """Renova a reserva da rádio e republica o título; False se a perdeu."""
+        key = f"title:{station_id}"
+        if not await asyncio.to_thread(
+            shared.acquire_many, [key], sharedcache.OWNER, settings.SHARED_CACHE_LEASE
+        ):
+            return False
+        title = self._titles.get(station_id)
+        if title is not None:
+            await asyncio.to_thread(shared.set_many, {key: title}, settings.SHARED_CACHE_LEASE)
+        return True
+
+    async def _fetch(self, shared, station_id: str):
+        """Copia para a memória local o título publicado por outra réplica."""
+        key = f"title:{station_id}"
+        try:
+            found = await asyncio.to_thread(shared.get_many, [key])
+        except Exception as exc:
+            # Cache fora do ar: mantém o último título lido.
+            logger.warning("Título de %s não lido do cache compartilhado: %s", station_id, exc)
+            return
+        if key in found:
+            self._titles[station_id] = found[key][0]
+        else:
+            self._titles.pop(station_id, None)
+
+    async def _run(self, station_id: str):
+        shared = sharedcache.get_cache()
+        try:
+            await self._read(station_id, shared)
+        finally:
+            self._titles.pop(station_id, None)
+            if shared is not None:
+                await asyncio.to_thread(
+                    shared.release_many, [f"title:{station_id}"], sharedcache.OWNER
+                )
+
+    async def _read(self, station_id: str, shared):
+        failures = 0
+
+        def publish(title):
+            nonlocal failures
+            failures = 0
+            self._titles[station_id] = title
+
+        while self._listening(station_id):
+            if shared is not None and not await self._share(shared, station_id):
+                # Outra réplica já lê esta rádio; o título vem pelo cache.
+                await self._fetch(shared, station_id)
+                await asyncio.sleep(sharedcache.RETRY)
+                continue
+            cat = catalog.get_catalog()
+            name = cat.by_id.get(station_id)
+            if name is None:
+                break
+            info = cat.radios[name]
+            url = health.monitor.pick_url(info) if settings.HEALTH_ENABLED else info["url"]
+            task = None
+            try:
+                resp = await icyhttp.open_stream(
+                    url, headers={"Icy-MetaData": "1"}, timeout=settings.HEALTH_TIMEOUT
+                )
+                try:
+                    task = asyncio.ensure_future(
+                        read_titles(resp, publish)
+                    )
+                    shared_at, shared_title = time.monotonic(), None
+                    while self._listening(station_id) and not task.done():
+                        await asyncio.wait({task}, timeout=1.0)
+                        if shared is None:
+                            continue
+                        title = self._titles.get(station_id)
+                        if title != shared_title or time.monotonic() - shared_at >= sharedcache.RETRY:
+                            shared_at, shared_title = time.monotonic(), title
+                            if not await self._share(shared, station_id):
+                                break
+                    if task.done():
+                        task.result()
+                finally:
+                    if task is not None:
+                        task.cancel()
+                    resp.close()
+            except NoMetadata as exc:
+                # Rádio sem metadados não volta a tê-los por insistência.
+                logger.info("Tocando agora indisponível para %s: %s", station_id, exc)
+                self._no_metadata[station_id] = time.monotonic() + NO_METADATA_RETRY
+                break
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+                logger.info("Leitor de metadados de %s caiu: %s", station_id, exc)
+                await asyncio.sleep(retry_delay(failures))
+                failures += 1
+
+    def active(self) -> list:
+        """Rádios com leitor em execução."""
+        with self._lock:
+            return [sid for sid, f in self._readers.items() if not f.done()]
+
+    def forget_missing(self):
+        """Catálogo recarregado: URLs podem ter mudado, tenta de novo."""
+        self._no_metadata.clear()
+
+
+now_playing = NowPlaying(settings.NOWPLAYING_IDLE)
+
+catalog.on_reload(lambda _catalog: now_playing.forget_missing())
@@ -0,0 +1,408 @@
+"""Telemetria de reprodução medida nos navegadores.
+
+Os navegadores registram, no próprio <audio>, o clique-até-`playing`,
+as travadas (`waiting` até voltar a tocar, com duração), o autoplay
+bloqueado e erros de mídia. Os eventos são juntados em lotes e
+enviados por sendBeacon ao servidor auxiliar (POST /playback): o player
+clássico (st.audio) por um script de altura zero, o de página única
+pelo próprio componente.
+
+A ingestão só valida o lote e o põe numa fila; uma thread grava, a
+cada PLAYBACK_FLUSH segundos, os histogramas por rádio e por modo de
+player (ex.: "spa/hints") numa única transação SQLite. Quem lê —
+render, /playback, ranking e o indicador de saúde dos cartões — usa a
+foto em memória refeita após cada gravação, nunca o banco.
+"""
+import json
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+import settings
+import sidecar
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) dos baldes de latência e de duração de travada.
+BUCKETS_MS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000)
+
+EVENTS = ("play", "stall", "blocked", "error")
+
+# Travadas por reprodução acima das quais a rádio aparece como lenta.
+STALLS_PER_PLAY_SLOW = 0.5
+
+# Eventos aceitos por lote e fila máxima até a próxima gravação; o que
+# passar disso é descartado (e contado), nunca segura quem envia.
+MAX_BATCH = 200
+MAX_QUEUE = 50_000
+MAX_BODY = 64 * 1024
+
+# Fila -> escritor; contadores da própria ingestão.
+_queue = queue.SimpleQueue()
+_queued = 0
+_dropped = 0
+_writer = None
+_lock = threading.Lock()
+
+# Foto dos agregados: {("station"|"mode", chave): {...}}; a gravada no
+# banco é lida na primeira consulta (ou quando o escritor sobe).
+_snapshot = {}
+_loaded = False
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playback (
+    scope  TEXT NOT NULL,      -- "station" ou "mode"
+    key    TEXT NOT NULL,      -- id da rádio ou modo do player
+    metric TEXT NOT NULL,      -- "play_ms", "stall_ms" ou um evento contado
+    bucket INTEGER NOT NULL,   -- índice em BUCKETS_MS (0 para contadores)
+    count  INTEGER NOT NULL,
+    total  REAL NOT NULL,      -- soma dos ms (0 para contadores)
+    PRIMARY KEY (scope, key, metric, bucket)
+)
+"""
+
+
+def _event(raw):
+    """Normaliza um evento recebido; None se for inválido."""
+    if not isinstance(raw, dict) or raw.get("t") not in EVENTS:
+        return None
+    ms = 0.0
+    if raw["t"] in ("play", "stall"):
+        # Contadores (blocked, error) não têm duração: "ms" é ignorado.
+        ms = raw.get("ms")
+        if (isinstance(ms, bool) or not isinstance(ms, (int, float))
+                or not math.isfinite(ms) or not 0 <= ms <= 600_000):
+            return None
+    return (raw["t"], str(raw.get("station") or "")[:64], str(raw.get("mode") or "")[:32],
+            float(ms))
+
+
+def enqueue(events) -> int:
+    """Põe eventos válidos na fila do escritor; devolve quantos entraram."""
+    global _queued, _dropped
+    accepted = [e for e in map(_event, events[:MAX_BATCH]) if e is not None]
+    with _lock:
+        room = max(0, MAX_QUEUE - _queued)
+        _dropped += len(accepted) - min(room, len(accepted))
+        accepted = accepted[:room]
+        _queued += len(accepted)
+    for event in accepted:
+        _queue.put(event)
+    _ensure_writer()
+    return len(accepted)
+
+
+def record(mode: str, click_to_audio_ms: float, station: str = ""):
+    """Registra um clique-até-áudio medido fora do lote do navegador."""
+    enqueue([{"t": "play", "ms": click_to_audio_ms, "mode": mode, "station": station}])
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="playback-writer", daemon=True)
+                _writer.start()
+
+
+def _connect():
+    settings.PLAYBACK_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(settings.PLAYBACK_DB, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _aggregate(events) -> dict:
+    """(scope, key, metric, bucket) -> [count, total] de um lote de eventos."""
+    rows = {}
+    for kind, station, mode, ms in events:
+        if kind in ("play", "stall"):
+            metric, bucket = f"{kind}_ms", bisect_left(BUCKETS_MS, ms)
+        else:
+            metric, bucket, ms = kind, 0, 0.0
+        for scope, key in (("station", station), ("mode", mode)):
+            if key:
+                row = rows.setdefault((scope, key, metric, bucket), [0, 0.0])
+                row[0] += 1
+                row[1] += ms
+    return rows
+
+
+def _write_loop():
+    global _queued
+    try:
+        conn = _connect()
+        _reload(conn)
+    except sqlite3.Error:
+        logger.exception("Telemetria de reprodução sem banco em %s", settings.PLAYBACK_DB)
+        return
+    while True:
+        events = [_queue.get()]
+        time.sleep(settings.PLAYBACK_FLUSH)
+        while True:
+            try:
+                events.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        with _lock:
+            _queued -= len(events)
+        rows = _aggregate(events)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO playback (scope, key, metric, bucket, count, total) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (scope, key, metric, bucket) "
+                    "DO UPDATE SET count = count + excluded.count, total = total + excluded.total",
+                    [(*k, c, t) for k, (c, t) in rows.items()],
+                )
+            _reload(conn)
+        except sqlite3.Error:
+            logger.exception("Lote de %d eventos de reprodução não gravado", len(events))
+
+
+def _percentile(counts, q) -> float:
+    n = sum(counts)
+    target, seen = q * n, 0
+    for bound, count in zip((*BUCKETS_MS, BUCKETS_MS[-1] * 2), counts):
+        seen += count
+        if seen >= target:
+            return float(bound)
+    return float(BUCKETS_MS[-1] * 2)
+
+
+def _ensure_loaded():
+    """Carrega a foto gravada na primeira leitura, antes de chegar um beacon.
+
+    Depois de reiniciar, ranking e cartões já usam os agregados do
+    banco; o escritor só sobe com o primeiro evento.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        try:
+            conn = _connect()
+            try:
+                _reload(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as exc:
+            logger.warning("Telemetria de reprodução não lida de %s: %s", settings.PLAYBACK_DB, exc)
+
+
+def _reload(conn):
+    """Refaz a foto em memória a partir do banco (todas as réplicas)."""
+    global _snapshot, _loaded
+    raw = {}
+    for scope, key, metric, bucket, count, total in conn.execute(
+        "SELECT scope, key, metric, bucket, count, total FROM playback"
+    ):
+        entry = raw.setdefault((scope, key), {})
+        hist = entry.setdefault(metric, [[0] * (len(BUCKETS_MS) + 1), 0.0])
+        hist[0][bucket] += count
+        hist[1] += total
+
+    snapshot = {}
+    for ident, metrics in raw.items():
+        plays = metrics.get("play_ms", [[0], 0.0])[0]
+        stalls = metrics.get("stall_ms", [[0], 0.0])
+        n_plays = sum(plays)
+        n_stalls = sum(stalls[0])
+        counted = {e: sum(metrics.get(e, [[0], 0.0])[0]) for e in ("blocked", "error")}
+        attempts = n_plays + counted["blocked"]
+        snapshot[ident] = {
+            "plays": n_plays,
+            "p50_ms": _percentile(plays, 0.5) if n_plays else None,
+            "p90_ms": _percentile(plays, 0.9) if n_plays else None,
+            "stalls": n_stalls,
+            "stall_ms_total": round(stalls[1], 1),
+            "stalls_per_play": round(n_stalls / n_plays, 3) if n_plays else None,
+            "blocked": counted["blocked"],
+            "blocked_rate": round(counted["blocked"] / attempts, 3) if attempts else None,
+            "errors": counted["error"],
+        }
+    _snapshot = snapshot
+    _loaded = True
+
+
+def station_stats(station_id: str):
+    """Agregados da rádio (ou None sem eventos); leitura em memória."""
+    _ensure_loaded()
+    return _snapshot.get(("station", station_id))
+
+
+def field_health(station_id: str, state: str) -> str:
+    """Rebaixa "ok" para "slow" quando os ouvintes reais esperam demais.
+
+    Só com PLAYBACK_MIN_SAMPLES cliques medidos; a sondagem do servidor
+    vê o primeiro byte, a telemetria vê o som começar no celular.
+    """
+    stats = station_stats(station_id)
+    if (state == "ok" and stats and stats["plays"] >= max(1, settings.PLAYBACK_MIN_SAMPLES)
+            and (stats["p50_ms"] > settings.HEALTH_SLOW_MS or stats["stalls_per_play"] > STALLS_PER_PLAY_SLOW)):
+        return "slow"
+    return state
+
+
+def _last_if_none(value):
+    return (value is None, value or 0)
+
+
+def ranking() -> list:
+    """Rádios com amostras suficientes, da melhor para a pior experiência.
+
+    Visão de operação (em /playback); a grade segue a ordem do catálogo.
+    """
+    _ensure_loaded()
+    rows = [
+        (key, stats) for (scope, key), stats in _snapshot.items()
+        if scope == "station" and stats["plays"] >= settings.PLAYBACK_MIN_SAMPLES
+    ]
+    # Sem cliques medidos (só travadas ou bloqueios) não há mediana:
+    # essas rádios vão para o fim, sem comparar None com número.
+    rows.sort(key=lambda r: (_last_if_none(r[1]["stalls_per_play"]), _last_if_none(r[1]["p50_ms"]),
+                             _last_if_none(r[1]["blocked_rate"])))
+    return [key for key, _ in rows]
+
+
+def summary() -> dict:
+    """Agregados por modo de player e por rádio, mais o estado da fila."""
+    _ensure_loaded()
+    snapshot = _snapshot
+    with _lock:
+        ingest = {"queued": _queued, "dropped": _dropped}
+    return {
+        "modes": {k: v for (scope, k), v in snapshot.items() if scope == "mode"},
+        "stations": {k: v for (scope, k), v in snapshot.items() if scope == "station"},
+        "ranking": ranking(),
+        "ingest": ingest,
+    }
+
+
+# Fila e envio em lote, comuns aos dois players (o componente "spa"
+# tem uma cópia em frontend/player/index.html).
+_QUEUE_JS = """
+    function neurosTelemetry(w, url, flushMs) {
+        var queue = [];
+        function flush() {
+            if (!queue.length) return;
+            var batch = queue.splice(0, %(max_batch)d);
+            w.navigator.sendBeacon(url, JSON.stringify({events: batch}));
+            if (queue.length) flush();
+        }
+        w.setInterval(flush, flushMs);
+        w.addEventListener("pagehide", flush);
+        w.document.addEventListener("visibilitychange", function() {
+            if (w.document.visibilityState === "hidden") flush();
+        });
+        return {push: function(ev) { queue.push(ev); }, flush: flush};
+    }
+""" % {"max_batch": MAX_BATCH}
+
+
+def classic_probe_js(beacon_url: str, arm: str = "") -> str:
+    """Script (para a página pai) com a telemetria do player clássico.
+
+    Instala, uma vez por aba, ouvintes na página pai. O clique num botão
+    "Ouvir agora" marca o início e a rádio; o primeiro `playing` do
+    <audio> criado pelo rerun fecha o clique-até-áudio. Depois disso,
+    `waiting` até o próximo `playing` é uma travada. Se o áudio segue
+    pausado alguns segundos após o clique, o autoplay foi bloqueado.
+    `window.parent.__neurosTelemetry` também recebe o "play bloqueado"
+    do botão "Tocando agora" (templates.py). `arm` (variante das dicas
+    de conexão, ver hints.py) entra no nome do modo.
+    """
+    mode = f"classic/{arm}" if arm else "classic"
+    return f"""
+        (function() {{
+            var w = window.parent;
+            if (w.__neurosTelemetry) return;
+            {_QUEUE_JS}
+            var tele = neurosTelemetry(w, "{beacon_url}", {int(settings.PLAYBACK_CLIENT_FLUSH * 1000)});
+            var station = null, t0 = null, stalledAt = null;
+            function push(ev) {{
+                ev.station = station;
+                ev.mode = "{mode}";
+                tele.push(ev);
+            }}
+            w.__neurosTelemetry = {{push: push}};
+            w.document.addEventListener("click", function(e) {{
+                var btn = e.target.closest && e.target.closest('[class*="st-key-btn_"]');
+                if (!btn) return;
+                var m = btn.className.match(/st-key-btn_([a-z0-9-]+)/);
+                station = m ? m[1] : null;
+                t0 = w.performance.now();
+                stalledAt = null;
+                var clicked = t0;
+                w.setTimeout(function() {{
+                    var audio = w.document.querySelector("audio");
+                    if (t0 === clicked && audio && audio.paused) {{
+                        push({{t: "blocked"}});
+                        t0 = null;
+                    }}
+                }}, 4000);
+            }}, true);
+            w.document.addEventListener("playing", function() {{
+                var now = w.performance.now();
+                if (t0 !== null) {{
+                    push({{t: "play", ms: now - t0}});
+                    t0 = null;
+                }} else if (stalledAt !== null) {{
+                    push({{t: "stall", ms: now - stalledAt}});
+                }}
+                stalledAt = null;
+            }}, true);
+            w.document.addEventListener("waiting", function(e) {{
+                if (t0 === null && !e.target.paused && stalledAt === null) {{
+                    stalledAt = w.performance.now();
+                }}
+            }}, true);
+            w.document.addEventListener("error", function(e) {{
+                if (e.target.tagName === "AUDIO") push({{t: "error"}});
+            }}, true);
+        }})();
+    """
+
+
+@sidecar.route("playback", method="POST")
+def ingest(handler, rest, query):
+    """Lote de eventos do navegador; só valida e enfileira."""
+    try:
+        length = int(handler.headers.get("Content-Length") or 0)
+    except ValueError:
+        handler.send_error(400)
+        return
+    if not 0 <= length <= MAX_BODY:
+        # Sem ler o corpo: send_error responde com "Connection: close",
+        # e o que sobrou não é lido como a próxima requisição.
+        handler.send_error(413)
+        return
+    try:
+        events = json.loads(handler.rfile.read(length))["events"]
+        if not isinstance(events, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        handler.send_error(400)
+        return
+    try:
+        enqueue(events)
+    except (ValueError, TypeError):
+        handler.send_error(400)
+        return
+    handler.send_response(204)
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    handler.end_headers()
+
+
+@sidecar.route("playback")
+def stats(handler, rest, query):
+    handler.send_json(json.dumps(summary()).encode())
@@ -0,0 +1,156 @@
+"""App instalável (PWA): manifesto, service worker e uma casca offline.
+
+O rodapé manda "adicionar à tela inicial", mas cada abertura baixava
+o frontend inteiro do Streamlit antes de aparecer qualquer rádio.
+Um service worker só controla páginas abaixo do diretório de onde é
+servido, e o Streamlit só serve arquivos próprios em /app/static/ —
+a página "/" do Streamlit fica fora do alcance. Por isso o app
+instalado abre em static/shell.html: uma página estática, guardada
+pelo service worker (static/sw.js), que desenha a grade a partir do
+último catálogo conhecido (catalog.json) sem esperar o servidor e toca
+a rádio direto no <audio>. O app completo fica a um toque ("Abrir app
+completo"). O catalog.json não é um arquivo: é gerado em memória a
+cada recarga do catálogo e servido em /app/static pelo middleware que
+o serve.py instala (assets.GeneratedStatic). Sem o serve.py, a casca
+só não tem catálogo e o service worker o deixa fora do cache inicial.
+
+Última rádio e favoritas ficam no localStorage ("neuros.last",
+"neuros.favorites"), comum à casca e ao app por serem da mesma origem:
+o app grava a última rádio clicada; na casca, "Continuar" toca a
+última com um toque e a estrela marca favoritas.
+
+Ícones: `python pwa.py icons` desenha static/icons/icon-<tamanho>.png
+(exige Pillow, só na máquina que gera os arquivos).
+"""
+import argparse
+import hashlib
+import json
+import sys
+
+import assets
+import catalog
+import settings
+
+STATIC_DIR = assets.STATIC_DIR
+ICONS_DIR = STATIC_DIR / "icons"
+ICON_SIZES = (192, 512)
+
+# Campos do catálogo que a casca usa.
+FIELDS = ("id", "color", "icon", "genre", "format")
+
+_published = None
+
+
+def catalog_snapshot(cat) -> dict:
+    """Catálogo enxuto para a casca: URL tocável, espelhos e aparência."""
+    stations = []
+    for name, info in cat.radios.items():
+        station = {"name": name, **{k: info[k] for k in FIELDS if k in info}}
+        relayed = None
+        if settings.RELAY_ENABLED:
+            import relay
+
+            relayed = relay.listen_url(info["id"])
+        if relayed:
+            station["url"], station["mirrors"] = relayed, []
+        else:
+            station["url"], station["mirrors"] = info["url"], list(info.get("mirrors", ()))
+        stations.append(station)
+    return {"stations": stations}
+
+
+def publish_catalog(cat=None) -> str:
+    """Publica o catalog.json da casca se o conteúdo mudou; devolve o hash."""
+    global _published
+    data = json.dumps(catalog_snapshot(cat or catalog.get_catalog()),
+                      ensure_ascii=False, separators=(",", ":")).encode()
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    if digest != _published:
+        # Nome fixo, sempre revalidado: a casca sempre pede "catalog.json".
+        assets.publish("catalog.json", data, "application/json", "no-cache")
+        _published = digest
+    return digest
+
+
+def bootstrap_js() -> str:
+    """Script (para a página pai) que torna a página instalável.
+
+    Uma vez por aba, na página pai: <link rel="manifest">, cor do tema,
+    registro do service worker (que já guarda a casca para a primeira
+    abertura pelo ícone) e a gravação da última rádio clicada.
+    """
+    if _published is None:
+        publish_catalog()
+    base = assets.static_base()
+    return f"""
+        (function() {{
+            var w = window.parent, d = w.document;
+            if (w.__neurosPwa) return;
+            w.__neurosPwa = true;
+            function add(tag, attrs) {{
+                var el = d.createElement(tag);
+                for (var k in attrs) el.setAttribute(k, attrs[k]);
+                d.head.appendChild(el);
+            }}
+            add("link", {{rel: "manifest", href: "{base}/manifest.json"}});
+            add("meta", {{name: "theme-color", content: "#150a30"}});
+            add("link", {{rel: "apple-touch-icon", href: "{base}/icons/icon-192.png"}});
+            if ("serviceWorker" in w.navigator) {{
+                w.navigator.serviceWorker.register("{base}/sw.js").catch(function(err) {{
+                    w.console.warn("Neuros Som: service worker não registrado", err);
+                }});
+            }}
+            d.addEventListener("click", function(e) {{
+                var btn = e.target.closest && e.target.closest('[class*="st-key-btn_"]');
+                var m = btn && btn.className.match(/st-key-btn_([a-z0-9-]+)/);
+                if (!m) return;
+                try {{ w.localStorage.setItem("neuros.last", m[1]); }} catch (err) {{}}
+            }}, true);
+        }})();
+    """
+
+
+def make_icons():
+    """Ícone do app (ondas de som amarelas sobre o fundo roxo do tema)."""
+    from PIL import Image, ImageDraw
+
+    ICONS_DIR.mkdir(parents=True, exist_ok=True)
+    for size in ICON_SIZES:
+        scale = 4     # desenha maior e reduz, para bordas suaves
+        big = size * scale
+        img = Image.new("RGB", (big, big), "#060314")
+        draw = ImageDraw.Draw(img)
+        for i in range(40, 0, -1):
+            r = big * 0.75 * i / 40
+            shade = tuple(int(a + (b - a) * i / 40) for a, b in zip((0x2a, 0x0f, 0x4e), (0x06, 0x03, 0x14)))
+            draw.ellipse((big * 0.3 - r, big * 0.3 - r, big * 0.3 + r, big * 0.3 + r), fill=shade)
+        # Conteúdo dentro dos 80% centrais: serve também como "maskable".
+        c, unit, width = big / 2, big / 10, int(big / 28)
+        draw.rounded_rectangle((c - 2.6 * unit, c - 0.9 * unit, c - 1.4 * unit, c + 0.9 * unit),
+                               radius=unit * 0.2, fill="#FFD15C")
+        draw.polygon([(c - 1.6 * unit, c - 0.9 * unit), (c - 0.2 * unit, c - 2.2 * unit),
+                      (c - 0.2 * unit, c + 2.2 * unit), (c - 1.6 * unit, c + 0.9 * unit)], fill="#FFD15C")
+        for k in (1, 2, 3):
+            r = unit * (0.6 + 0.9 * k)
+            draw.arc((c - 0.2 * unit - r, c - r, c - 0.2 * unit + r, c + r), -45, 45,
+                     fill="#FFD15C" if k < 3 else "#ff64c8", width=width)
+        path = ICONS_DIR / f"icon-{size}.png"
+        img.resize((size, size), Image.LANCZOS).save(path, optimize=True)
+        print(f"static/icons/{path.name} ({path.stat().st_size} bytes)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arquivos do app instalável.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("icons", help="desenha static/icons/icon-<tamanho>.png")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "icons":
+        make_icons()
+
+
+catalog.on_reload(publish_catalog)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
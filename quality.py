@@ -0,0 +1,307 @@
+"""Monitor de qualidade dos streams a partir dos cabeçalhos de quadro.
+
+De tempos em tempos, cada rádio do catálogo é ouvida por alguns
+segundos; os bytes recebidos passam por `scan`, que acha os
+cabeçalhos MP3/ADTS de um buffer inteiro com NumPy (sem laço Python
+por byte) e mede a taxa real, a taxa de amostragem e quanto do stream
+ficou fora de sincronia. Os intervalos entre as chegadas de bytes
+mostram travadas da origem. Cada rádio guarda uma janela das últimas
+amostras; cartões e /quality (no servidor auxiliar) leem o resumo.
+
+Ligado com NEUROS_QUALITY=1 (custa um pouco de banda por rádio).
+`python bench.py quality` mede o scanner em amostras gravadas.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import background
+import catalog
+import frames
+import health
+import icyhttp
+import settings
+import sidecar
+
+logger = logging.getLogger(__name__)
+
+_NONE, _MP3, _ADTS = 0, 1, 2
+_KINDS = {_MP3: frames.MP3, _ADTS: frames.ADTS}
+
+# Abaixo desta fração da taxa anunciada, acima desta perda de
+# sincronia ou chegando mais devagar que o tempo real, o cartão mostra
+# o alerta.
+BITRATE_ALERT = 0.9
+SYNC_LOSS_ALERT = 0.01
+REALTIME_ALERT = 0.9
+
+# Tabelas MP3 indexadas por (byte1 << 8 | byte2): tamanho, kbps, Hz e
+# amostras do quadro. Montadas com frames.parse_mp3 para valer
+# exatamente a mesma regra do resto do app.
+_mp3_tables = None
+_adts_rates = np.array(frames.ADTS_SAMPLE_RATES + (0,) * 3, dtype=np.int64)
+
+
+def _mp3_lookup():
+    global _mp3_tables
+    if _mp3_tables is None:
+        tables = np.zeros((4, 1 << 16), dtype=np.int64)
+        for b1 in range(0xE0, 0x100):
+            for b2 in range(0x100):
+                header = frames.parse_mp3(bytes((0xFF, b1, b2, 0)))
+                if header is not None:
+                    tables[:, b1 << 8 | b2] = (header.length, header.bitrate,
+                                               header.sample_rate, header.samples)
+        _mp3_tables = tables
+    return _mp3_tables
+
+
+class FrameStats(NamedTuple):
+    kind: Optional[str]   # frames.MP3, frames.ADTS ou None (nada reconhecido)
+    frames: int           # quadros em sincronia
+    bytes: int            # tamanho do buffer analisado
+    audio_seconds: float  # duração do áudio nos quadros em sincronia
+    bitrate_kbps: float   # taxa real: bytes dos quadros / duração
+    sample_rate: int      # Hz mais frequente
+    sync_loss: float      # fração dos bytes fora de quadros encadeados
+    resyncs: int          # vezes em que a cadeia de quadros quebrou
+
+
+def scan(buf) -> FrameStats:
+    """Analisa os quadros MP3/ADTS de `buf` (bytes) de uma vez.
+
+    Um quadro conta como "em sincronia" quando o anterior termina
+    exatamente onde ele começa, ou quando abre uma cadeia de ao menos
+    dois quadros encadeados — a mesma ideia do frames.find_sync,
+    aplicada a todas as posições do buffer em paralelo.
+    """
+    a = np.frombuffer(buf, dtype=np.uint8)
+    n = len(a)
+    if n < 8:
+        return FrameStats(None, 0, n, 0.0, 0.0, 0, 1.0 if n else 0.0, 0)
+
+    pos = np.flatnonzero((a[:-1] == 0xFF) & ((a[1:] & 0xE0) == 0xE0))
+    pos = pos[pos + 7 <= n]
+    b1 = a[pos + 1].astype(np.int64)
+    b2 = a[pos + 2].astype(np.int64)
+
+    # ADTS tem prioridade, como em frames.parse_frame.
+    adts = (b1 & 0xF6) == 0xF0
+    adts_len = ((a[pos + 3].astype(np.int64) & 3) << 11) | (a[pos + 4].astype(np.int64) << 3) \
+        | (a[pos + 5].astype(np.int64) >> 5)
+    adts_rate = _adts_rates[(b2 >> 2) & 0xF]
+    adts &= (adts_len >= 7) & (adts_rate > 0)
+
+    mp3 = _mp3_lookup()[:, b1 << 8 | b2]
+    kind = np.where(adts, _ADTS, np.where(mp3[0] > 0, _MP3, _NONE))
+    length = np.where(adts, adts_len, mp3[0])
+    rate = np.where(adts, adts_rate, mp3[2])
+    samples = np.where(adts, 1024 * ((a[pos + 6].astype(np.int64) & 3) + 1), mp3[3])
+
+    keep = kind != _NONE
+    pos, kind, length, rate, samples = pos[keep], kind[keep], length[keep], rate[keep], samples[keep]
+    if not len(pos):
+        return FrameStats(None, 0, n, 0.0, 0.0, 0, 1.0, 0)
+
+    kind_at = np.zeros(n + 1, dtype=np.int8)
+    kind_at[pos] = kind
+    nxt = pos + length
+    # Quadro que passa do fim do buffer não tem como ser confirmado;
+    # aceita, como o find_sync.
+    ahead = nxt + 4 > n
+    forward = ahead | (kind_at[np.minimum(nxt, n)] == kind)
+    pointed = np.zeros(n + 1, dtype=bool)
+    pointed[nxt[forward & ~ahead]] = True
+    forward_at = np.zeros(n + 1, dtype=bool)
+    forward_at[pos] = forward
+    starts = forward & ~pointed[pos]
+    # Uma cadeia começa em cada quadro encadeado que ninguém aponta; só
+    # vale se o quadro seguinte também encadear (ou o buffer acabar).
+    # O último quadro antes de um trecho corrompido não encadeia, mas
+    # foi confirmado pelo anterior: também conta.
+    chained = pointed[pos] | (starts & (ahead | forward_at[np.minimum(nxt, n)]))
+    # Um falso cabeçalho no meio de um quadro real abre uma "cadeia"
+    # sobreposta ao quadro anterior: descarta esses inícios.
+    idx = np.flatnonzero(chained)
+    overlap = np.zeros(len(idx), dtype=bool)
+    overlap[1:] = pos[idx[1:]] < nxt[idx[:-1]]
+    chained[idx[overlap & starts[idx]]] = False
+
+    if not chained.any():
+        return FrameStats(None, 0, n, 0.0, 0.0, 0, 1.0, 0)
+    in_bytes = int(np.minimum(nxt[chained], n).sum() - pos[chained].sum())
+    seconds = float((samples[chained] / rate[chained]).sum())
+    values, counts = np.unique(rate[chained], return_counts=True)
+    kinds, kind_counts = np.unique(kind[chained], return_counts=True)
+    return FrameStats(
+        kind=_KINDS[int(kinds[kind_counts.argmax()])],
+        frames=int(chained.sum()),
+        bytes=n,
+        audio_seconds=seconds,
+        bitrate_kbps=in_bytes * 8 / seconds / 1000 if seconds else 0.0,
+        sample_rate=int(values[counts.argmax()]),
+        sync_loss=1.0 - in_bytes / n,
+        resyncs=max(0, int((chained & starts).sum()) - 1),
+    )
+
+
+class Sample(NamedTuple):
+    at: float             # time.time() do fim da amostra
+    stats: FrameStats
+    claimed_kbps: int     # icy-br da origem (0 se não informa)
+    max_gap_ms: float     # maior intervalo entre chegadas de bytes
+    realtime: float       # segundos de áudio recebidos / segundos de relógio
+
+
+def _claimed(headers) -> int:
+    try:
+        return int(headers.get("icy-br", "0").split(",")[0])
+    except ValueError:
+        return 0
+
+
+async def sample_stream(url: str, seconds: float, timeout: float, limit: int) -> Sample:
+    """Ouve `url` por `seconds` (ou até `limit` bytes) e analisa os bytes."""
+    resp = await icyhttp.open_stream(url, timeout=timeout)
+    chunks, arrivals = [], []
+    try:
+        if resp.status != 200:
+            raise icyhttp.StreamError(f"HTTP {resp.status}")
+        start = time.monotonic()
+        size = 0
+        while size < limit:
+            left = start + seconds - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(resp.reader.read(16384), min(left, timeout))
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+            arrivals.append(time.monotonic())
+            size += len(chunk)
+        wall = time.monotonic() - start
+    finally:
+        resp.close()
+
+    stats = scan(b"".join(chunks))
+    gaps = np.diff(np.array([start, *arrivals])) if arrivals else np.array([wall])
+    return Sample(
+        at=time.time(),
+        stats=stats,
+        claimed_kbps=_claimed(resp.headers),
+        max_gap_ms=round(float(gaps.max()) * 1e3, 1),
+        realtime=stats.audio_seconds / wall if wall else 0.0,
+    )
+
+
+class QualityMonitor:
+    """Janela de amostras por rádio e a rodada que as coleta."""
+
+    def __init__(self, interval: float, seconds: float, window: int):
+        self.interval = interval
+        self.seconds = seconds
+        self.window = window
+        self._samples = {}      # station_id -> deque[Sample]
+        self._runner = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """Inicia a rodada periódica no loop de fundo, uma vez por processo."""
+        with self._lock:
+            if self._runner is None or self._runner.done():
+                self._runner = background.submit(self._run())
+
+    async def _run(self):
+        while True:
+            await self.sample_all()
+            await asyncio.sleep(self.interval)
+
+    async def sample_all(self):
+        cat = catalog.get_catalog()
+        by_url = {}
+        for info in cat.radios.values():
+            url = health.monitor.pick_url(info) if settings.HEALTH_ENABLED else info["url"]
+            by_url[url] = info["id"]
+        limit = int(self.seconds * 512 * 1000 / 8)     # folga até 512 kbps
+
+        async def one(url):
+            try:
+                return url, await sample_stream(url, self.seconds, settings.HEALTH_TIMEOUT, limit)
+            except (OSError, ValueError, asyncio.TimeoutError) as exc:
+                logger.info("Amostra de %s falhou: %s", url, exc)
+                return url, None
+
+        for url, sample in await icyhttp.gather_per_host(list(by_url), one):
+            if sample is not None:
+                self.add(by_url[url], sample)
+
+    def add(self, station_id: str, sample: Sample):
+        with self._lock:
+            window = self._samples.get(station_id)
+            if window is None:
+                window = self._samples[station_id] = deque(maxlen=self.window)
+            window.append(sample)
+
+    def stats(self, station_id: str) -> Optional[dict]:
+        """Resumo da janela da rádio, ou None sem amostras ainda."""
+        with self._lock:
+            window = list(self._samples.get(station_id, ()))
+        if not window:
+            return None
+        good = [s for s in window if s.stats.frames]
+        rates = [s.stats.bitrate_kbps for s in good]
+        return {
+            "samples": len(window),
+            "codec": good[-1].stats.kind if good else None,
+            "bitrate_kbps": round(float(np.median(rates)), 1) if rates else 0.0,
+            "claimed_kbps": window[-1].claimed_kbps,
+            "sample_rate": good[-1].stats.sample_rate if good else 0,
+            "sync_loss": round(float(np.mean([s.stats.sync_loss for s in window])), 4),
+            "resyncs": sum(s.stats.resyncs for s in window),
+            "max_gap_ms": max(s.max_gap_ms for s in window),
+            "realtime": round(float(np.median([s.realtime for s in window])), 2),
+            "last": window[-1].at,
+        }
+
+    def label(self, station_id: str) -> str:
+        """Texto curto para o cartão: "128 kbps", com ⚠ se algo destoa."""
+        stats = self.stats(station_id)
+        if not stats or not stats["bitrate_kbps"]:
+            return ""
+        text = f"{round(stats['bitrate_kbps'])} kbps"
+        claimed = stats["claimed_kbps"]
+        if claimed and stats["bitrate_kbps"] < claimed * BITRATE_ALERT:
+            return f"⚠ {text} de {claimed}"
+        if stats["sync_loss"] > SYNC_LOSS_ALERT:
+            return f"⚠ {text}, {stats['sync_loss']:.0%} corrompido"
+        if stats["realtime"] < REALTIME_ALERT:
+            return f"⚠ {text}, travando"
+        return text
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ids = list(self._samples)
+        return {sid: self.stats(sid) for sid in ids}
+
+
+monitor = QualityMonitor(settings.QUALITY_INTERVAL, settings.QUALITY_SAMPLE_SECONDS,
+                         settings.QUALITY_WINDOW)
+
+
+@sidecar.route("quality")
+def serve(handler, rest, query):
+    """Visão de operação: resumo de todas as rádios amostradas."""
+    data = monitor.stats(rest) if rest else monitor.snapshot()
+    if data is None:
+        handler.send_error(404)
+        return
+    handler.send_json(json.dumps(data).encode())
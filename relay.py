@@ -0,0 +1,386 @@
+"""Relay de streams: uma conexão com a origem, muitos ouvintes.
+
+Com o modo relay ligado, o player aponta para o servidor auxiliar em
+vez da URL da rádio. Para cada rádio com ouvintes o app mantém uma
+única conexão com a origem, que escreve num buffer circular; cada
+ouvinte lê desse mesmo buffer com seu próprio cursor, enviando fatias
+(memoryview) sem copiar os bytes por ouvinte. Quem chega entra na
+fronteira de quadro mais recente, para o decodificador sincronizar de
+imediato. Sem ouvintes por RELAY_IDLE_TIMEOUT, a conexão é encerrada.
+
+O buffer também guarda marcas (segundos de áudio -> fronteira de
+quadro), então um ouvinte pode começar atrás do ao vivo
+(`?delay=<s>`). Com o time-shift ligado, o buffer mora num arquivo
+mapeado e cobre minutos em vez de segundos (ver timeshift.py).
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Optional
+
+import background
+import catalog
+import frames
+import health
+import icyhttp
+import settings
+import sidecar
+import sniff
+import timeshift
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 16 * 1024
+
+# Segundos de áudio entre duas marcas do buffer.
+MARK_INTERVAL = 1.0
+
+
+class RingBuffer:
+    """Buffer circular com posições absolutas e marcas de quadro.
+
+    Posições crescem sem parar (`end` é o total escrito); o byte da
+    posição p mora em data[p % capacity]. Um leitor com cursor anterior
+    a `oldest()` está numa região prestes a ser sobrescrita e precisa
+    pular. `data` pode ser um mmap (time-shift); `reach` é o quanto um
+    leitor pode ficar atrás do fim e `keep_seconds` limita as marcas.
+    """
+
+    def __init__(self, capacity: int, data=None, reach=None, keep_seconds=None):
+        self.capacity = capacity
+        self.data = bytearray(capacity) if data is None else data
+        self.reach = capacity // 2 if reach is None else reach
+        self.keep_seconds = keep_seconds
+        self.end = 0
+        self.last_frame = None       # posição absoluta do quadro mais recente
+        self.marks = deque()         # (segundos de áudio, posição de quadro)
+        self.cond = threading.Condition()
+
+    def write(self, chunk: bytes, frame_at=None, frame_time=None):
+        """Acrescenta `chunk`; `frame_at` é a última fronteira de quadro vista.
+
+        `frame_time` é o instante (em segundos de áudio desde o início
+        do relay) em que esse quadro começa; vira marca a cada
+        MARK_INTERVAL.
+        """
+        view = memoryview(chunk)
+        while view:
+            start = self.end % self.capacity
+            n = min(len(view), self.capacity - start)
+            self.data[start:start + n] = view[:n]
+            self.end += n
+            view = view[n:]
+        with self.cond:
+            if frame_at is not None:
+                self.last_frame = frame_at
+                if frame_time is not None and (
+                        not self.marks or frame_time - self.marks[-1][0] >= MARK_INTERVAL):
+                    self.marks.append((frame_time, frame_at))
+            oldest = self.oldest()
+            while self.marks and (self.marks[0][1] < oldest or (
+                    self.keep_seconds is not None
+                    and self.marks[-1][0] - self.marks[0][0] > self.keep_seconds)):
+                self.marks.popleft()
+            self.cond.notify_all()
+
+    def oldest(self) -> int:
+        """Posição mais antiga que ainda é seguro ler."""
+        return max(0, self.end - self.reach)
+
+    def window(self) -> float:
+        """Segundos de áudio que dá para voltar a partir do ao vivo."""
+        with self.cond:
+            return self.marks[-1][0] - self.marks[0][0] if self.marks else 0.0
+
+    def seek(self, delay: float) -> tuple:
+        """(posição, atraso real) da marca `delay` segundos antes do ao vivo.
+
+        Sem marcas (codec sem quadros reconhecíveis) ou sem atraso,
+        começa como um ouvinte novo.
+        """
+        with self.cond:
+            if delay <= 0 or not self.marks:
+                return self.join_position(), 0.0
+            live = self.marks[-1][0]
+            times = [t for t, _ in self.marks]
+            t, pos = self.marks[min(bisect_left(times, live - delay), len(times) - 1)]
+            return pos, live - t
+
+    def join_position(self) -> int:
+        """Onde um novo ouvinte começa: o último quadro, ou o fim."""
+        if self.last_frame is not None and self.last_frame > self.end - self.capacity // 2:
+            return self.last_frame
+        return self.end
+
+    def view(self, pos: int, limit: int):
+        """Fatia contígua (sem cópia) a partir de `pos`, até `limit` bytes."""
+        start = pos % self.capacity
+        n = min(self.end - pos, limit, self.capacity - start)
+        return memoryview(self.data)[start:start + n]
+
+    def wait(self, pos: int, timeout: float) -> bool:
+        """Espera até haver dados depois de `pos`."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.end > pos, timeout)
+
+
+class _FrameTracker:
+    """Acompanha quadros MP3/ADTS ao longo dos pedaços vindos da origem."""
+
+    def __init__(self):
+        self.pending = bytearray()
+        self.base = 0          # posição absoluta de pending[0]
+        self.synced = False
+        self.seconds = 0.0     # áudio (s) dos quadros já completos
+        self.last_time = None  # instante do último quadro completo
+
+    def feed(self, chunk: bytes):
+        """Processa `chunk` e devolve a posição absoluta do último quadro."""
+        self.pending += chunk
+        buf, pos, last = self.pending, 0, None
+        while True:
+            if not self.synced:
+                found = frames.find_sync(bytes(buf), pos)
+                if found is None:
+                    pos = max(pos, len(buf) - 6)
+                    break
+                pos, self.synced = found, True
+            header = frames.parse_frame(buf, pos)
+            if header is None:
+                if len(buf) - pos < 7:
+                    break
+                self.synced = False
+                pos += 1
+                continue
+            if pos + header.length > len(buf):
+                break
+            last = self.base + pos
+            self.last_time = self.seconds
+            self.seconds += header.samples / header.sample_rate
+            pos += header.length
+        del self.pending[:pos]
+        self.base += pos
+        return last
+
+
+class StationRelay:
+    """Conexão com a origem de uma rádio e seu buffer compartilhado."""
+
+    def __init__(self, station_id: str, capacity: int):
+        self.station_id = station_id
+        self.ring_file = None
+        if timeshift.enabled():
+            try:
+                self.ring_file = timeshift.RingFile(station_id, timeshift.capacity())
+            except OSError as exc:
+                logger.warning("Relay %s: time-shift indisponível (%s)", station_id, exc)
+        if self.ring_file is not None:
+            size = self.ring_file.size
+            self.ring = RingBuffer(size, data=self.ring_file.data,
+                                   reach=size - timeshift.GUARD_BYTES,
+                                   keep_seconds=timeshift.max_delay())
+        else:
+            self.ring = RingBuffer(capacity)
+        self.listeners = 0
+        # Tipo enviado ao primeiro ouvinte, que chega antes da origem
+        # responder; a conexão com a origem o confirma depois.
+        info = _station_info(station_id)
+        self.content_type = _content_type(info, info["url"]) if info else "audio/mpeg"
+        self.upstream_url = None
+        self.connected = False
+        self.idle_since = time.monotonic()
+        self._lock = threading.Lock()
+        self.future = None
+
+    def attach(self) -> bool:
+        """Mais um ouvinte; False se o relay já largou o arquivo do time-shift."""
+        with self._lock:
+            if self.ring_file is not None and not self.ring_file.acquire():
+                return False
+            self.listeners += 1
+            return True
+
+    def detach(self):
+        with self._lock:
+            self.listeners -= 1
+            if self.listeners == 0:
+                self.idle_since = time.monotonic()
+        if self.ring_file is not None:
+            self.ring_file.release()
+
+    async def run(self, idle_timeout: float):
+        """Lê da origem enquanto houver ouvintes, reconectando se cair."""
+        try:
+            await self._relay(idle_timeout)
+        finally:
+            if self.ring_file is not None:
+                self.ring_file.release()
+
+    async def _relay(self, idle_timeout: float):
+        backoff = 1.0
+        # Um só relógio de áudio para toda a vida do relay: reconectar
+        # não pode fazer as marcas voltarem no tempo.
+        seconds = 0.0
+        while self.listeners or time.monotonic() - self.idle_since < idle_timeout:
+            info = _station_info(self.station_id)
+            if info is None:
+                break
+            url = health.monitor.pick_url(info) if settings.HEALTH_ENABLED else info["url"]
+            try:
+                resp = await icyhttp.open_stream(url, timeout=settings.HEALTH_TIMEOUT)
+            except (OSError, ValueError, asyncio.TimeoutError) as exc:
+                logger.warning("Relay %s: origem indisponível (%s)", self.station_id, exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            self.upstream_url = url
+            self.content_type = _content_type(info, url, resp.headers.get("content-type"))
+            self.connected = True
+            backoff = 1.0
+            tracker = _FrameTracker()
+            tracker.seconds = seconds
+            try:
+                while self.listeners or time.monotonic() - self.idle_since < idle_timeout:
+                    chunk = await asyncio.wait_for(resp.reader.read(READ_SIZE), settings.HEALTH_TIMEOUT)
+                    if not chunk:
+                        break
+                    self.ring.write(chunk, tracker.feed(chunk), tracker.last_time)
+            except (OSError, asyncio.TimeoutError) as exc:
+                logger.warning("Relay %s: origem caiu (%s)", self.station_id, exc)
+            finally:
+                seconds = tracker.seconds
+                self.connected = False
+                resp.close()
+        logger.info("Relay %s encerrado", self.station_id)
+
+    def stats(self) -> dict:
+        mapped = self.ring_file is not None
+        # Cada marca: tupla com float e int (~120 bytes no CPython).
+        index_bytes = len(self.ring.marks) * 120
+        return {
+            "listeners": self.listeners,
+            "buffer_bytes": self.ring.capacity,
+            "bytes_relayed": self.ring.end,
+            "connected": self.connected,
+            "upstream": self.upstream_url,
+            "timeshift_s": round(self.ring.window(), 1),
+            "memory": {
+                "ram_bytes": (0 if mapped else self.ring.capacity) + index_bytes,
+                "file_bytes": self.ring.capacity if mapped else 0,
+                "marks": len(self.ring.marks),
+            },
+        }
+
+
+class RelayHub:
+    """Relays ativos do processo, criados sob demanda por rádio."""
+
+    def __init__(self, capacity: int, idle_timeout: float):
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self._relays = {}
+        self._lock = threading.Lock()
+
+    def join(self, station_id: str) -> StationRelay:
+        """Registra um ouvinte, abrindo a conexão com a origem se preciso."""
+        with self._lock:
+            relay = self._relays.get(station_id)
+            # Um relay encerrando pode já ter largado o time-shift: recusa
+            # o ouvinte, que vai para um relay novo.
+            if relay is None or relay.future is None or relay.future.done() or not relay.attach():
+                relay = StationRelay(station_id, self.capacity)
+                relay.future = background.submit(relay.run(self.idle_timeout))
+                self._relays[station_id] = relay
+                relay.attach()
+        return relay
+
+    def stats(self) -> dict:
+        """Ouvintes e memória por rádio ativa."""
+        with self._lock:
+            for sid in [s for s, r in self._relays.items() if r.future.done()]:
+                del self._relays[sid]
+            return {sid: relay.stats() for sid, relay in self._relays.items()}
+
+
+if timeshift.enabled():
+    timeshift.remove_stale()
+
+hub = RelayHub(
+    settings.RELAY_BUFFER_BYTES,
+    max(settings.RELAY_IDLE_TIMEOUT, settings.TIMESHIFT_HOLD) if timeshift.enabled()
+    else settings.RELAY_IDLE_TIMEOUT,
+)
+
+
+def _station_info(station_id: str):
+    cat = catalog.get_catalog()
+    name = cat.by_id.get(station_id)
+    return cat.radios[name] if name is not None else None
+
+
+def _content_type(info, url: str, declared=None) -> str:
+    """Tipo do stream: farejado, informado no catálogo, da origem ou MP3."""
+    return sniff.formats.get(url) or info.get("format") or declared or "audio/mpeg"
+
+
+def listen_url(station_id: str, delay: float = 0) -> Optional[str]:
+    """URL do stream retransmitido, para usar no st.audio.
+
+    Com `delay`, o áudio começa esse tanto de segundos atrás do ao vivo
+    (até onde o buffer alcança). None se o servidor auxiliar não subiu:
+    quem chama toca a origem direto.
+    """
+    if sidecar.ensure_started() is None:
+        return None
+    query = f"?delay={delay:g}" if delay > 0 else ""
+    return sidecar.public_url(f"relay/{station_id}{query}")
+
+
+@sidecar.route("relay")
+def serve(handler, rest, query):
+    if rest == "stats":
+        handler.send_json(json.dumps(hub.stats()).encode())
+        return
+    if _station_info(rest) is None:
+        handler.send_error(404)
+        return
+
+    try:
+        delay = max(0.0, float(query.get("delay", 0)))
+    except ValueError:
+        delay = 0.0
+    relay = hub.join(rest)
+    try:
+        handler.send_response(200)
+        handler.send_header("Content-Type", relay.content_type)
+        handler.send_header("Cache-Control", "no-cache, no-store")
+        handler.send_header("Access-Control-Allow-Origin", "*")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+
+        ring = relay.ring
+        pos = ring.seek(delay)[0]
+        while True:
+            if not ring.wait(pos, settings.HEALTH_TIMEOUT * 2):
+                if relay.future.done():
+                    return
+                continue
+            if pos < ring.oldest():
+                # Ouvinte lento demais: em vez de ler uma região que está
+                # sendo sobrescrita, pula para o quadro mais recente (ao
+                # vivo) ou para a marca mais antiga (quem está atrasado
+                # perde o mínimo).
+                pos = ring.seek(ring.window() if delay else 0)[0]
+                continue
+            # Solta a fatia logo após o envio: o mapa do time-shift só
+            # fecha sem fatias exportadas.
+            with ring.view(pos, READ_SIZE) as chunk:
+                handler.wfile.write(chunk)
+                pos += len(chunk)
+    finally:
+        relay.detach()
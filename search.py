@@ -0,0 +1,138 @@
+"""Índice de busca do catálogo: prefixo, trigramas e facetas de gênero.
+
+Montado uma vez por versão do catálogo (na recarga, fora do render),
+para que a grade consiga filtrar dezenas de milhares de rádios sem
+percorrer o catálogo a cada rerun. Resultados são listas de nomes na
+ordem do catálogo, prontas para paginar.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+
+import catalog
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Fração mínima dos trigramas da consulta que a rádio precisa ter.
+TRIGRAM_MIN_SCORE = 0.6
+
+# Consultas guardadas por versão do índice (as menos recentes saem primeiro).
+SEARCH_CACHE_SIZE = 256
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos ("Rádio" -> "radio")."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StationIndex:
+    """Índice imutável de uma versão do catálogo."""
+
+    def __init__(self, cat):
+        self.version = cat.version
+        self.names = tuple(cat.radios)
+        by_genre = defaultdict(list)
+        words = []                       # (palavra, posição da rádio)
+        self._trigrams = defaultdict(set)
+        self._cache = OrderedDict()     # (termos, gênero) -> nomes
+        self._cache_lock = threading.Lock()
+
+        for pos, (name, info) in enumerate(cat.radios.items()):
+            by_genre[info["genre"]].append(name)
+            text = " ".join((name, info["genre"], *info.get("tags", ())))
+            for word in set(_WORD_RE.findall(normalize(text))):
+                words.append((word, pos))
+                for gram in _trigrams(word):
+                    self._trigrams[gram].add(pos)
+
+        words.sort()
+        self._words = [w for w, _ in words]
+        self._word_pos = [p for _, p in words]
+        self.genres = {g: tuple(n) for g, n in by_genre.items()}   # gênero -> nomes
+        self.facets = Counter({g: len(n) for g, n in self.genres.items()}).most_common()
+
+    def _prefix(self, term: str) -> set:
+        start = bisect_left(self._words, term)
+        end = bisect_left(self._words, term + "\uffff")
+        return set(self._word_pos[start:end])
+
+    def _fuzzy(self, term: str) -> set:
+        grams = _trigrams(term)
+        hits = Counter()
+        for gram in grams:
+            hits.update(self._trigrams.get(gram, ()))
+        need = TRIGRAM_MIN_SCORE * len(grams)
+        return {pos for pos, count in hits.items() if count >= need}
+
+    def search(self, query: str = "", genre=None) -> tuple:
+        """Nomes que casam com todas as palavras de `query` (e com o gênero).
+
+        Cada palavra casa por prefixo; se nenhuma rádio tiver o prefixo
+        (erro de digitação), tenta por semelhança de trigramas. As
+        consultas recentes ficam em cache (LRU, pela consulta já
+        normalizada): paginar não refaz a busca, e "Rádio" e "radio"
+        são a mesma entrada.
+        """
+        key = (tuple(_WORD_RE.findall(normalize(query))), genre)
+        with self._cache_lock:
+            found = self._cache.get(key)
+            if found is not None:
+                self._cache.move_to_end(key)
+                return found
+        found = self._search(*key)
+        with self._cache_lock:
+            self._cache[key] = found
+            if len(self._cache) > SEARCH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return found
+
+    def _search(self, terms: tuple, genre) -> tuple:
+        if not terms:
+            return self.genres.get(genre, ()) if genre else self.names
+
+        matches = None
+        for term in terms:
+            found = self._prefix(term)
+            if not found and len(term) >= 3:
+                found = self._fuzzy(term)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return ()
+        names = [self.names[pos] for pos in sorted(matches)]
+        if genre:
+            allowed = set(self.genres.get(genre, ()))
+            names = [n for n in names if n in allowed]
+        return tuple(names)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _build(cat):
+    global _index
+    index = StationIndex(cat)
+    with _lock:
+        if _index is None or _index.version < index.version:
+            _index = index
+
+
+def get_index() -> StationIndex:
+    """Índice da versão atual do catálogo (montado na recarga)."""
+    cat = catalog.get_catalog()
+    index = _index
+    if index is None or index.version != cat.version:
+        _build(cat)
+        index = _index
+    return index
+
+
+catalog.on_reload(_build)
@@ -0,0 +1,208 @@
+"""Inicialização aquecida do Neuros Som.
+
+Uso:
+    python serve.py [opções do streamlit run, ex.: --server.port 8501]
+
+No lugar de `streamlit run fm.py`: antes de o servidor aceitar a
+primeira sessão, importa os módulos do app e aquece o estado
+compartilhado — catálogo, índice de busca, CSS publicado, saúde e
+formato das rádios da primeira página e templates dos cartões. O
+Streamlit roda o fm.py no mesmo processo, então tudo isso já está em
+sys.modules quando o primeiro visitante chega.
+
+O relatório (tempo de import de cada módulo, de cada etapa do
+aquecimento e até o servidor responder) sai no stderr, como uma linha
+JSON no logger "neuros.startup" e em /startup no servidor auxiliar.
+"""
+import concurrent.futures
+import importlib
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.request
+
+_T0 = time.perf_counter()
+
+import settings  # noqa: E402
+import sidecar  # noqa: E402
+
+logger = logging.getLogger("neuros.startup")
+
+# Na ordem em que o fm.py os usa; cada tempo é só o que ainda faltava
+# importar (dependências já carregadas por um módulo anterior não
+# contam de novo). Os módulos de modos opcionais só entram com o modo
+# ligado, como no fm.py.
+MODULES = (
+    "streamlit",
+    "streamlit.components.v1",
+    "streamlit_extras.stylable_container",
+    "catalog",
+    "search",
+    "templates",
+    "assets",
+    "metrics",
+    "health",
+    "sniff",
+) + tuple(name for name, enabled in (
+    ("nowplaying", settings.NOWPLAYING_ENABLED),
+    ("relay", settings.RELAY_ENABLED),
+    ("playback", settings.PLAYBACK_BEACON),
+    ("spa_player", settings.PLAYER_MODE == "spa"),
+    ("pwa", settings.PWA_ENABLED),
+    ("quality", settings.QUALITY_ENABLED),
+) if enabled)
+
+report = {"imports_ms": {}, "warmup_ms": {}, "ready": False}
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1e3, 2)
+
+
+def import_modules():
+    for name in MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        report["imports_ms"][name] = _ms(start)
+
+
+def warm_up(timeout: float):
+    """Aquece o que o primeiro render usa, etapa por etapa."""
+    import assets
+    import catalog
+    import health
+    import search
+    import sniff
+    import templates
+
+    stages = report["warmup_ms"]
+
+    start = time.perf_counter()
+    cat = catalog.get_catalog()
+    stages["catalog"] = _ms(start)
+
+    start = time.perf_counter()
+    index = search.get_index()
+    stages["search_index"] = _ms(start)
+
+    start = time.perf_counter()
+    assets.publish_stylesheet()
+    stages["stylesheet"] = _ms(start)
+
+    if settings.PWA_ENABLED:
+        import pwa
+
+        start = time.perf_counter()
+        pwa.publish_catalog(cat)
+        stages["pwa_catalog"] = _ms(start)
+
+    # Só a primeira página da grade: é o que o primeiro render mostra.
+    first_page = [cat.radios[n] for n in index.names[:settings.GRID_PAGE_SIZE]]
+    start = time.perf_counter()
+    futures = []
+    if settings.HEALTH_ENABLED:
+        futures.append(health.monitor.refresh(u for info in first_page for u in health.station_urls(info)))
+    if settings.SNIFF_ENABLED:
+        futures.append(sniff.formats.ensure(
+            u for info in first_page
+            for u in (*health.station_urls(info), *(v["url"] for v in info.get("variants", ())))
+        ))
+    futures = [f for f in futures if f is not None]
+    done, pending = concurrent.futures.wait(futures, timeout=timeout)
+    stages["probes"] = _ms(start)
+    report["probes_pending"] = len(pending)
+
+    start = time.perf_counter()
+    for name in index.names[:settings.GRID_PAGE_SIZE]:
+        info = cat.radios[name]
+        state = health.monitor.state(info) if settings.HEALTH_ENABLED else "unknown"
+        templates.card(name, info, False, state)
+    stages["templates"] = _ms(start)
+    report["stations"] = len(cat.radios)
+
+    if settings.QUALITY_ENABLED:
+        import quality
+
+        quality.monitor.ensure_running()
+
+
+def install_cache_headers() -> bool:
+    """Põe os middlewares de assets na frente do servidor Starlette do Streamlit.
+
+    Servem os arquivos gerados em memória (CSS, catálogo da casca) e o
+    cache longo dos nomes com hash.
+    """
+    try:
+        from streamlit.web.server.starlette import starlette_app
+    except ImportError:
+        # Streamlit com Tornado: o CSS vai inline na página.
+        return False
+    import assets
+
+    streamlit_middleware = starlette_app.create_streamlit_middleware
+    ours = assets.middleware()
+    starlette_app.create_streamlit_middleware = lambda: [*ours, *streamlit_middleware()]
+    return True
+
+
+def _wait_until_ready(timeout: float):
+    """Marca o momento em que o Streamlit passa a responder."""
+    from streamlit import config
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            port = config.get_option("server.port")
+            base = (config.get_option("server.baseUrlPath") or "").strip("/")
+            path = f"/{base}/_stcore/health" if base else "/_stcore/health"
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1):
+                break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        logger.warning(json.dumps({"event": "startup", "error": "sem resposta em /_stcore/health",
+                                   "timeout_s": timeout, **report}))
+        return
+    report["time_to_ready_ms"] = _ms(_T0)
+    report["ready"] = True
+    logger.info(json.dumps({"event": "startup", **report}))
+    print(_format(), file=sys.stderr, flush=True)
+
+
+def _format() -> str:
+    lines = ["Neuros Som — inicialização"]
+    for section in ("imports_ms", "warmup_ms"):
+        for name, ms in report[section].items():
+            lines.append(f"  {section[:-3]:<8} {name:<38} {ms:>9.2f} ms")
+    lines.append(f"  {'pronto em':<47} {report['time_to_ready_ms']:>9.2f} ms")
+    if report.get("probes_pending"):
+        lines.append(f"  ({report['probes_pending']} rodada(s) de sondagem ainda em segundo plano)")
+    return "\n".join(lines)
+
+
+@sidecar.route("startup")
+def serve(handler, rest, query):
+    handler.send_json(json.dumps(report).encode())
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    import_modules()
+    warm_up(settings.WARMUP_TIMEOUT)
+    report["warm_ms"] = _ms(_T0)
+    sidecar.ensure_started()
+    report["immutable_static"] = install_cache_headers()
+
+    threading.Thread(target=_wait_until_ready, args=(settings.READY_TIMEOUT,),
+                     name="startup-ready", daemon=True).start()
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(settings.BASE_DIR / "fm.py"), *argv]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
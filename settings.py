@@ -0,0 +1,212 @@
+"""Configurações do Neuros Som lidas de variáveis de ambiente.
+
+Centraliza os ajustes operacionais para que fm.py e os módulos de
+apoio não espalhem leituras de os.environ pelo código.
+"""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def _float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# ============================================================
+# Catálogo de rádios
+# ============================================================
+# Arquivo JSON com as estações; pode ser editado com o servidor no ar.
+CATALOG_PATH = Path(os.environ.get("NEUROS_CATALOG", BASE_DIR / "radios.json"))
+
+# Intervalo mínimo (s) entre duas checagens de mtime do catálogo.
+CATALOG_CHECK_INTERVAL = _float("NEUROS_CATALOG_CHECK_INTERVAL", 1.0)
+
+# ============================================================
+# Saúde dos streams
+# ============================================================
+# Sondagem em segundo plano das URLs do catálogo (0 desliga).
+HEALTH_ENABLED = os.environ.get("NEUROS_HEALTH", "1") != "0"
+
+# Validade (s) de uma rodada de sondagem, comum a todas as sessões.
+HEALTH_TTL = _float("NEUROS_HEALTH_TTL", 60.0)
+
+# Tempo máximo (s) para conectar e receber o primeiro byte.
+HEALTH_TIMEOUT = _float("NEUROS_HEALTH_TIMEOUT", 5.0)
+
+# Acima deste tempo até o primeiro byte (ms) a rádio é marcada "lenta".
+HEALTH_SLOW_MS = _float("NEUROS_HEALTH_SLOW_MS", 1500.0)
+
+# ============================================================
+# Cache em disco
+# ============================================================
+# Diretório para caches persistentes (ex.: formato detectado de cada stream).
+CACHE_DIR = Path(os.environ.get("NEUROS_CACHE_DIR", BASE_DIR / ".cache"))
+
+# Detecção do codec pelos primeiros bytes de cada stream (0 desliga).
+SNIFF_ENABLED = os.environ.get("NEUROS_SNIFF", "1") != "0"
+
+# Bytes lidos do início do stream para identificar o codec.
+SNIFF_BYTES = int(_float("NEUROS_SNIFF_BYTES", 8192))
+
+# ============================================================
+# Servidor auxiliar (relay, métricas)
+# ============================================================
+# O Streamlit não aceita rotas próprias; streams retransmitidos e
+# endpoints auxiliares ficam num servidor HTTP à parte, neste endereço.
+SIDECAR_HOST = os.environ.get("NEUROS_SIDECAR_HOST", "127.0.0.1")
+SIDECAR_PORT = int(_float("NEUROS_SIDECAR_PORT", 8502))
+
+# URL pela qual o navegador alcança o servidor auxiliar (atrás de um
+# proxy reverso, algo como "https://radio.exemplo.com/sidecar").
+SIDECAR_PUBLIC_URL = os.environ.get(
+    "NEUROS_SIDECAR_PUBLIC_URL", f"http://localhost:{SIDECAR_PORT}"
+).rstrip("/")
+
+# ============================================================
+# Relay de streams
+# ============================================================
+# Com o relay ligado, o app mantém uma conexão por rádio ativa e o
+# player do navegador ouve pelo servidor auxiliar (1 liga).
+RELAY_ENABLED = os.environ.get("NEUROS_RELAY", "0") == "1"
+
+# Tamanho do buffer circular de cada rádio (bytes).
+RELAY_BUFFER_BYTES = int(_float("NEUROS_RELAY_BUFFER_BYTES", 512 * 1024))
+
+# Segundos sem ouvintes até a conexão com a origem ser encerrada.
+RELAY_IDLE_TIMEOUT = _float("NEUROS_RELAY_IDLE_TIMEOUT", 15.0)
+
+# Time-shift: minutos de cada rádio ouvida guardados em disco pelo
+# relay, para voltar no tempo ou retomar depois de uma queda (0 desliga).
+TIMESHIFT_MINUTES = _float("NEUROS_TIMESHIFT_MINUTES", 0.0)
+
+# Teto (MB) do arquivo de cada rádio, qualquer que seja a taxa; se for
+# menor que a janela pede, a janela encolhe para o que cabe nele.
+TIMESHIFT_MAX_MB = _float("NEUROS_TIMESHIFT_MAX_MB", 32.0)
+
+# Segundos que o relay segue gravando depois que o último ouvinte sai,
+# para quem caiu num túnel retomar de onde parou.
+TIMESHIFT_HOLD = _float("NEUROS_TIMESHIFT_HOLD", 120.0)
+
+# Onde ficam os arquivos mapeados (um por rádio ativa).
+TIMESHIFT_DIR = Path(os.environ.get("NEUROS_TIMESHIFT_DIR", CACHE_DIR / "timeshift"))
+
+# ============================================================
+# Tocando agora (metadados ICY)
+# ============================================================
+# Leitura do título atual das rádios ouvidas (0 desliga).
+NOWPLAYING_ENABLED = os.environ.get("NEUROS_NOWPLAYING", "1") != "0"
+
+# Intervalo (s) com que o player atualiza o título, sem rerun da página.
+NOWPLAYING_REFRESH = _float("NEUROS_NOWPLAYING_REFRESH", 10.0)
+
+# Segundos sem nenhuma sessão no player até o leitor da rádio parar.
+NOWPLAYING_IDLE = _float("NEUROS_NOWPLAYING_IDLE", 45.0)
+
+# ============================================================
+# Player
+# ============================================================
+# "classic": cartões do Streamlit + st.audio (cada troca passa pelo
+# servidor); "spa": componente único que troca de rádio no navegador.
+PLAYER_MODE = os.environ.get("NEUROS_PLAYER", "classic")
+
+# Cartões por página na grade; com mais rádios que isso no catálogo,
+# aparecem busca, filtro de gênero e paginação.
+GRID_PAGE_SIZE = int(_float("NEUROS_GRID_PAGE_SIZE", 20))
+
+# Telemetria de reprodução dos navegadores (clique-até-áudio,
+# travadas, autoplay bloqueado), enviada em lotes ao servidor auxiliar
+# e agregada por rádio (1 liga).
+PLAYBACK_BEACON = os.environ.get("NEUROS_PLAYBACK_BEACON", "0") == "1"
+
+# Intervalo (s) entre lotes enviados pelo navegador e entre gravações
+# dos agregados no SQLite.
+PLAYBACK_CLIENT_FLUSH = _float("NEUROS_PLAYBACK_CLIENT_FLUSH", 15.0)
+PLAYBACK_FLUSH = _float("NEUROS_PLAYBACK_FLUSH", 2.0)
+
+# Agregados persistentes (histogramas por rádio e por modo de player).
+PLAYBACK_DB = Path(os.environ.get("NEUROS_PLAYBACK_DB", CACHE_DIR / "playback.sqlite3"))
+
+# Amostras mínimas de uma rádio antes de a telemetria mexer no
+# indicador de saúde ou no ranking.
+PLAYBACK_MIN_SAMPLES = int(_float("NEUROS_PLAYBACK_MIN_SAMPLES", 20))
+
+# ============================================================
+# Métricas
+# ============================================================
+# Histogramas por etapa do render, sessões e reruns em /metrics no
+# servidor auxiliar e em logs JSON (1 liga; desligado custa ~zero).
+METRICS_ENABLED = os.environ.get("NEUROS_METRICS", "0") == "1"
+
+# ============================================================
+# Arquivos estáticos
+# ============================================================
+# Base das URLs do CSS e das fontes. Vazio: /app/static na mesma origem,
+# servido pelo serve.py (com o server.baseUrlPath); ou
+# f"{SIDECAR_PUBLIC_URL}/assets", ou um CDN com o build de
+# `python assets.py css`.
+ASSETS_BASE_URL = os.environ.get("NEUROS_ASSETS_BASE_URL", "").rstrip("/")
+
+# App instalável: manifesto, service worker e a casca offline em
+# static/shell.html, que abre a grade do último catálogo sem esperar o
+# servidor (0 desliga).
+PWA_ENABLED = os.environ.get("NEUROS_PWA", "1") != "0"
+
+# ============================================================
+# Inicialização (serve.py)
+# ============================================================
+# Tempo máximo (s) que o aquecimento espera pelas sondagens de saúde e
+# de formato antes de liberar o servidor; o que não terminar segue em
+# segundo plano.
+WARMUP_TIMEOUT = _float("NEUROS_WARMUP_TIMEOUT", 6.0)
+
+# Tempo máximo (s) que o relatório espera o servidor responder em
+# /_stcore/health; depois disso desiste e registra o aviso.
+READY_TIMEOUT = _float("NEUROS_READY_TIMEOUT", 60.0)
+
+# ============================================================
+# Qualidade dos streams
+# ============================================================
+# Amostra periodicamente cada rádio e mede taxa real, taxa de
+# amostragem, perda de sincronia e travadas (1 liga; exige numpy).
+QUALITY_ENABLED = os.environ.get("NEUROS_QUALITY", "0") == "1"
+
+# Intervalo (s) entre rodadas e duração (s) de cada amostra.
+QUALITY_INTERVAL = _float("NEUROS_QUALITY_INTERVAL", 300.0)
+QUALITY_SAMPLE_SECONDS = _float("NEUROS_QUALITY_SAMPLE_SECONDS", 5.0)
+
+# Amostras guardadas por rádio para as estatísticas móveis.
+QUALITY_WINDOW = int(_float("NEUROS_QUALITY_WINDOW", 12))
+
+# ============================================================
+# Dicas de conexão
+# ============================================================
+# "on": preconnect/dns-prefetch para os hosts do catálogo; "off":
+# nenhuma; "ab": sorteia por sessão (sem dicas / dicas / dicas +
+# aquecimento no hover) para comparar o clique-até-áudio em /playback.
+HINTS = os.environ.get("NEUROS_HINTS", "on")
+
+# Origens com preconnect (as primeiras do catálogo) e total de origens
+# com alguma dica (as demais recebem só dns-prefetch).
+HINTS_PRECONNECT_MAX = int(_float("NEUROS_HINTS_PRECONNECT_MAX", 6))
+HINTS_DNS_PREFETCH_MAX = int(_float("NEUROS_HINTS_DNS_PREFETCH_MAX", 30))
+
+# Abre a conexão da rádio do cartão sob o mouse/foco (1 liga).
+PREWARM = os.environ.get("NEUROS_PREWARM", "0") == "1"
+
+# ============================================================
+# Cache compartilhado entre réplicas
+# ============================================================
+# Com várias instâncias do app atrás de um balanceador, saúde, formato
+# e "tocando agora" das rádios ficam num cache comum e só uma réplica
+# consulta a origem por rádio. Vazio: cada processo com o seu; caminho
+# de arquivo (ou "sqlite:///caminho"): SQLite, réplicas na mesma
+# máquina; "redis://host:6379/0": Redis (exige o pacote redis).
+SHARED_CACHE = os.environ.get("NEUROS_SHARED_CACHE", "")
+
+# Prazo (s) da reserva de uma chave pela réplica que a está atualizando;
+# se ela cair no meio, outra assume quando o prazo vence.
+SHARED_CACHE_LEASE = _float("NEUROS_SHARED_CACHE_LEASE", 30.0)
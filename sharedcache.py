@@ -0,0 +1,251 @@
+"""Cache compartilhado entre réplicas do app.
+
+Com vários processos do Streamlit atrás de um balanceador, cada um
+teria sua própria saúde, formato e "tocando agora" das rádios — e
+cada um sondaria a origem por conta própria. Com NEUROS_SHARED_CACHE,
+esses resultados vão para um cache comum, com validade por chave, e a
+origem só é consultada pela réplica que reservou a chave (uma reserva
+com prazo: se a réplica cair, outra assume quando o prazo vence).
+
+Backends:
+    caminho ou sqlite:///caminho   SQLite em WAL, réplicas na mesma máquina
+    redis://host:6379/0            Redis ou compatível (exige o pacote redis)
+
+Os valores precisam ser serializáveis em JSON. O render nunca consulta
+o cache diretamente: as rodadas de sondagem, que já rodam no loop de
+fundo, leem e gravam em lote.
+"""
+import asyncio
+import json
+import logging
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Identifica esta réplica nas reservas.
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+
+# Segundos até tentar de novo uma chave que outra réplica está atualizando.
+RETRY = 5.0
+
+# Chaves por comando SQL (o SQLite limita os parâmetros por comando).
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL,     -- JSON
+    expires REAL NOT NULL      -- time.time() em que a entrada vence
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS lease (
+    key   TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+def _chunks(keys):
+    keys = list(keys)
+    for i in range(0, len(keys), _CHUNK):
+        yield keys[i:i + _CHUNK]
+
+
+class SQLiteCache:
+    """Cache num arquivo SQLite em WAL: leitores não esperam pelo escritor.
+
+    Uma conexão por thread; cada escrita é uma transação BEGIN
+    IMMEDIATE, então lotes e reservas são atômicos entre processos.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def get_many(self, keys) -> dict:
+        """{chave: (valor, vencimento)} das chaves presentes e válidas."""
+        conn, now, found = self._conn(), time.time(), {}
+        for chunk in _chunks(keys):
+            rows = conn.execute(
+                f"SELECT key, value, expires FROM cache WHERE expires > ? "
+                f"AND key IN ({','.join('?' * len(chunk))})", (now, *chunk),
+            )
+            found.update((k, (json.loads(v), e)) for k, v, e in rows)
+        return found
+
+    def set_many(self, items: dict, ttl: float):
+        """Grava todas as entradas numa transação, com a mesma validade."""
+        now = time.time()
+
+        def write(conn):
+            conn.executemany(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+                [(k, json.dumps(v), now + ttl) for k, v in items.items()],
+            )
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        self._write(write)
+
+    def acquire_many(self, keys, owner: str, ttl: float) -> list:
+        """Reserva as chaves livres (ou já de `owner`, renovando); devolve as obtidas."""
+        now = time.time()
+
+        def write(conn):
+            return [
+                key for key in keys
+                if conn.execute(
+                    "INSERT INTO lease (key, owner, until) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, until = excluded.until "
+                    "WHERE lease.until <= ? OR lease.owner = excluded.owner",
+                    (key, owner, now + ttl, now),
+                ).rowcount
+            ]
+        return self._write(write)
+
+    def release_many(self, keys, owner: str):
+        def write(conn):
+            for chunk in _chunks(keys):
+                conn.execute(
+                    f"DELETE FROM lease WHERE owner = ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})", (owner, *chunk),
+                )
+        self._write(write)
+
+
+# Reserva atômica: cria se livre, renova se já é de quem pede.
+_ACQUIRE_LUA = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then return 1 end
+if redis.call('get', KEYS[1]) == ARGV[1] then redis.call('pexpire', KEYS[1], ARGV[2]) return 1 end
+return 0
+"""
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
+
+class RedisCache:
+    """Mesma interface do SQLiteCache sobre Redis (ou compatível)."""
+
+    def __init__(self, url: str, prefix: str = "neuros:"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._acquire = self._redis.register_script(_ACQUIRE_LUA)
+        self._release = self._redis.register_script(_RELEASE_LUA)
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._redis.mget([self._prefix + k for k in keys])
+        found = {}
+        for key, raw in zip(keys, values):
+            if raw is not None:
+                value, expires = json.loads(raw)
+                found[key] = (value, expires)
+        return found
+
+    def set_many(self, items: dict, ttl: float):
+        expires = time.time() + ttl
+        pipe = self._redis.pipeline(transaction=True)
+        for key, value in items.items():
+            pipe.set(self._prefix + key, json.dumps([value, expires]), px=int(ttl * 1000))
+        pipe.execute()
+
+    def acquire_many(self, keys, owner: str, ttl: float) -> list:
+        ms = int(ttl * 1000)
+        return [k for k in keys if self._acquire(keys=[f"{self._prefix}lease:{k}"], args=[owner, ms])]
+
+    def release_many(self, keys, owner: str):
+        for key in keys:
+            self._release(keys=[f"{self._prefix}lease:{key}"], args=[owner])
+
+
+def open_cache(spec: str):
+    """Backend para a especificação de NEUROS_SHARED_CACHE."""
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(spec)
+    return SQLiteCache(spec.removeprefix("sqlite://"))
+
+
+_cache = None
+_opened = False
+_lock = threading.Lock()
+
+
+def get_cache():
+    """Backend configurado, ou None se cada processo mantém seu cache."""
+    global _cache, _opened
+    if not _opened:
+        with _lock:
+            if not _opened:
+                if settings.SHARED_CACHE:
+                    try:
+                        _cache = open_cache(settings.SHARED_CACHE)
+                    except (ImportError, OSError, sqlite3.Error) as exc:
+                        logger.error("Cache compartilhado %s indisponível, seguindo sem ele: %s",
+                                     settings.SHARED_CACHE, exc)
+                _opened = True
+    return _cache
+
+
+async def resolve(cache, namespace: str, keys, compute, ttl: float) -> dict:
+    """Valores de `keys` vindos do cache ou, para as que esta réplica reservou, de `compute`.
+
+    `compute(chaves)` é uma corrotina que devolve {chave: valor}; só os
+    valores diferentes de None são gravados. Devolve {chave: (valor,
+    segundos de validade restantes)}; chaves que outra réplica está
+    atualizando ficam de fora, e quem chamou tenta de novo após RETRY.
+    """
+    names = {f"{namespace}:{k}": k for k in dict.fromkeys(keys)}
+    found = await asyncio.to_thread(cache.get_many, names)
+    missing = [n for n in names if n not in found]
+    mine = await asyncio.to_thread(
+        cache.acquire_many, missing, OWNER, settings.SHARED_CACHE_LEASE
+    ) if missing else []
+    if mine:
+        try:
+            # Outra réplica pode ter gravado entre a leitura e a reserva.
+            found.update(await asyncio.to_thread(cache.get_many, mine))
+            todo = [names[n] for n in mine if n not in found]
+            values = await compute(todo) if todo else {}
+            fresh = {f"{namespace}:{k}": v for k, v in values.items() if v is not None}
+            if fresh:
+                await asyncio.to_thread(cache.set_many, fresh, ttl)
+            found.update((f"{namespace}:{k}", (v, time.time() + ttl)) for k, v in values.items())
+        finally:
+            await asyncio.to_thread(cache.release_many, mine, OWNER)
+    now = time.time()
+    return {names[n]: (value, expires - now) for n, (value, expires) in found.items()}
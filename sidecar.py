@@ -0,0 +1,102 @@
+"""Servidor HTTP auxiliar para rotas que o Streamlit não oferece.
+
+Roda numa thread daemon dentro do mesmo processo do app e é iniciado
+sob demanda pelo primeiro recurso que precisa dele. Cada módulo
+registra seu prefixo:
+
+    @sidecar.route("relay")
+    def serve_relay(handler, rest, query):
+        ...
+
+`rest` é o caminho após o prefixo e `query` o dict da query string.
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+_routes = {}
+_server = None
+_failed = False
+_lock = threading.Lock()
+
+
+def route(prefix: str, method: str = "GET"):
+    """Decorador que associa `/<prefix>/...` a um handler."""
+    def register(fn):
+        _routes[(method, prefix)] = fn
+        return fn
+    return register
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        prefix, _, rest = parts.path.strip("/").partition("/")
+        fn = _routes.get((method, prefix))
+        if fn is None:
+            self.send_error(404)
+            return
+        try:
+            fn(self, rest, dict(parse_qsl(parts.query)))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def send_json(self, body: bytes, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def ensure_started():
+    """Inicia o servidor na primeira chamada; as seguintes não fazem nada.
+
+    Se a porta não abrir, devolve None — nesta e nas chamadas seguintes,
+    sem tentar de novo a cada rerun.
+    """
+    global _server, _failed
+    if _server is not None or _failed:
+        return _server
+    with _lock:
+        if _server is None and not _failed:
+            try:
+                server = _Server((settings.SIDECAR_HOST, settings.SIDECAR_PORT), _Handler)
+            except OSError as exc:
+                # Outra réplica no mesmo host já ocupa a porta; o app
+                # segue, só os recursos do servidor auxiliar ficam fora.
+                logger.error("Servidor auxiliar não iniciado em %s:%s: %s",
+                             settings.SIDECAR_HOST, settings.SIDECAR_PORT, exc)
+                _failed = True
+                return None
+            threading.Thread(target=server.serve_forever, name="sidecar", daemon=True).start()
+            logger.info("Servidor auxiliar em http://%s:%s", *server.server_address[:2])
+            _server = server
+    return _server
+
+
+def public_url(path: str) -> str:
+    """URL, vista pelo navegador, de um caminho do servidor auxiliar."""
+    return f"{settings.SIDECAR_PUBLIC_URL}/{path.lstrip('/')}"
@@ -0,0 +1,179 @@
+"""Detecção do codec de um stream pelos primeiros bytes.
+
+Lê só os primeiros KB do stream e reconhece playlist HLS, Ogg (Opus ou
+Vorbis), AAC em ADTS e MP3 pelo sincronismo de quadro — sem depender
+do nome da URL. O resultado vai para um cache em disco por URL, então
+o render nunca espera pela detecção depois da primeira sondagem. Com
+NEUROS_SHARED_CACHE, o formato detectado por uma réplica vale para
+todas.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import background
+import frames
+import icyhttp
+import settings
+import sharedcache
+
+logger = logging.getLogger(__name__)
+
+HLS = "application/vnd.apple.mpegurl"
+MIME_BY_FRAME = {frames.MP3: "audio/mpeg", frames.ADTS: "audio/aac"}
+
+# Após uma falha, a URL só é farejada de novo depois deste intervalo (s).
+RETRY_AFTER = 300.0
+
+# Validade (s) de um formato no cache compartilhado: o codec de uma URL
+# praticamente não muda.
+SHARED_TTL = 7 * 86400.0
+
+
+def _skip_id3(buf: bytes) -> int:
+    """Tamanho de uma tag ID3v2 no início do buffer (0 se não houver)."""
+    if len(buf) >= 10 and buf[:3] == b"ID3":
+        size = (buf[6] << 21) | (buf[7] << 14) | (buf[8] << 7) | buf[9]
+        return 10 + size
+    return 0
+
+
+def sniff_bytes(buf: bytes) -> Optional[str]:
+    """Tipo MIME identificado pelo conteúdo, ou None se inconclusivo."""
+    head = buf.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"#EXTM3U"):
+        return HLS
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    start = _skip_id3(buf)
+    pos = frames.find_sync(buf, start)
+    if pos is None:
+        return None
+    return MIME_BY_FRAME[frames.parse_frame(buf, pos).kind]
+
+
+async def sniff_url(url: str, timeout: float = 5.0, limit: int = 8192) -> Optional[str]:
+    """Abre o stream, lê até `limit` bytes e identifica o codec."""
+    resp = await icyhttp.open_stream(url, timeout=timeout)
+    try:
+        if resp.status != 200:
+            raise icyhttp.StreamError(f"HTTP {resp.status} {resp.reason}")
+        buf = bytearray()
+        while len(buf) < limit:
+            chunk = await asyncio.wait_for(resp.reader.read(limit - len(buf)), timeout)
+            if not chunk:
+                break
+            buf += chunk
+            found = sniff_bytes(bytes(buf))
+            # Playlists e Ogg se resolvem nos primeiros bytes; quadros
+            # precisam de alguns KB para ter dois cabeçalhos encadeados.
+            if found in (HLS, "audio/ogg") or (found and len(buf) >= 2048):
+                return found
+        return sniff_bytes(bytes(buf))
+    finally:
+        resp.close()
+
+
+class FormatCache:
+    """Cache persistente URL -> tipo MIME detectado, compartilhado pelo processo."""
+
+    def __init__(self, path, timeout: float = 5.0, limit: int = 8192):
+        self.path = os.fspath(path)
+        self.timeout = timeout
+        self.limit = limit
+        self._formats = self._load()
+        self._failed = {}       # url -> monotonic de quando pode tentar de novo
+        self.version = 0        # muda a cada formato novo detectado
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._formats, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def get(self, url: str) -> Optional[str]:
+        """Formato já detectado para `url`; nunca faz rede."""
+        return self._formats.get(url)
+
+    def ensure(self, urls):
+        """Agenda, em lote, a detecção das URLs ainda sem formato conhecido.
+
+        Devolve o Future da rodada (None se não havia nada a detectar).
+        """
+        now = time.monotonic()
+        with self._lock:
+            todo = [
+                u for u in dict.fromkeys(urls)
+                if u not in self._formats and u not in self._pending
+                and self._failed.get(u, 0.0) <= now
+            ]
+            self._pending.update(todo)
+        if not todo:
+            return None
+        return background.submit(self.sniff_all(todo))
+
+    async def _sniff(self, urls) -> dict:
+        async def one(url):
+            try:
+                return url, await sniff_url(url, self.timeout, self.limit)
+            except (OSError, ValueError, asyncio.TimeoutError) as exc:
+                logger.info("Formato de %s não detectado: %s", url, exc)
+                return url, None
+
+        return dict(await icyhttp.gather_per_host(urls, one))
+
+    async def sniff_all(self, urls) -> dict:
+        """Detecta o formato de todas as `urls` em paralelo e grava o cache."""
+        results = {}
+        try:
+            shared = sharedcache.get_cache()
+            if shared is None:
+                results = await self._sniff(urls)
+            else:
+                found = await sharedcache.resolve(shared, "format", urls, self._sniff, SHARED_TTL)
+                results = {url: fmt for url, (fmt, _) in found.items()}
+        except Exception:
+            # Cache compartilhado travado ou fora do ar: as URLs saem de
+            # _pending abaixo e voltam a ser farejadas após RETRY.
+            logger.exception("Falha na rodada de detecção de formatos")
+        now = time.monotonic()
+        with self._lock:
+            try:
+                for url in urls:
+                    fmt = results.get(url)
+                    if fmt:
+                        self._formats[url] = fmt
+                    else:
+                        # Falhou aqui, ou outra réplica ainda está farejando.
+                        self._failed[url] = now + (RETRY_AFTER if url in results else sharedcache.RETRY)
+            finally:
+                self._pending.difference_update(urls)
+            if any(results.values()):
+                self.version += 1
+                try:
+                    self._save()
+                except OSError as exc:
+                    logger.warning("Cache de formatos não gravado: %s", exc)
+        return results
+
+
+formats = FormatCache(
+    settings.CACHE_DIR / "formats.json", settings.HEALTH_TIMEOUT, settings.SNIFF_BYTES
+)
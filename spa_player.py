@@ -0,0 +1,92 @@
+"""Player de página única: cartões e <audio> num só componente estático.
+
+O componente (frontend/player/index.html) recebe o catálogo e troca
+audio.src no navegador; o servidor só fica sabendo da escolha depois,
+quando o valor do componente volta para o session_state.
+
+A lista de rádios (com o failover da saúde e os formatos farejados já
+aplicados) é montada uma vez por versão para o processo todo e só vai
+ao navegador quando a versão muda: um rerun comum não reenvia o
+catálogo.
+"""
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+import playback
+import settings
+
+FRONTEND_DIR = Path(__file__).resolve().parent / "frontend" / "player"
+
+
+_payload = None          # (versão, montada em monotonic, dados)
+_payload_lock = threading.Lock()
+
+
+def payload(version: str, build, max_age: float):
+    """(versão, dados) da lista do player, remontada por `build()` quando preciso.
+
+    `version` junta as versões do catálogo, da saúde e dos formatos;
+    além de quando ela muda, a lista é remontada a cada `max_age`
+    segundos, que é quando `build` agenda novas sondagens.
+    """
+    global _payload
+    with _payload_lock:
+        cached = _payload
+        if cached is None or cached[0] != version or time.monotonic() - cached[1] > max_age:
+            cached = _payload = (version, time.monotonic(), build())
+    return cached[0], cached[2]
+
+
+def _component():
+    # Declarado a cada uso: o registro só vale com ScriptRunContext, que
+    # não existe se este módulo for importado fora de um rerun.
+    return components.declare_component("neuros_player", path=str(FRONTEND_DIR))
+
+
+def render(version: str, stations, current_id, key: str = "spa_player",
+           hints=None, arm: str = "", telemetry_url: str = ""):
+    """Desenha o player e devolve o id da rádio escolhida no navegador.
+
+    `stations` é a lista de dicts (id, name, icon, genre, color, url,
+    format, variants) já com a URL que o navegador deve tocar, na
+    versão `version`; só é enviada se esta sessão ainda não a recebeu
+    (ou se o componente foi recriado e pediu de novo). `hints` traz as
+    origens para preconnect/dns-prefetch e se o hover aquece a
+    conexão; `arm` separa as medidas por variante das dicas. Com
+    `telemetry_url`, o componente manda clique-até-áudio, travadas e
+    autoplay bloqueado em lotes para lá (playback.py) em vez de
+    devolvê-los no valor, o que evita um rerun por medida.
+    """
+    mode = f"spa/{arm}" if arm else "spa"
+    sent_key, asked_key = f"{key}_sent", f"{key}_asked"
+    asked = (st.session_state.get(key) or {}).get("need_stations")
+    if asked and asked != st.session_state.get(asked_key):
+        # Componente recriado sem a lista (o servidor achava que ele a tinha).
+        st.session_state[asked_key] = asked
+        st.session_state.pop(sent_key, None)
+    send = st.session_state.get(sent_key) != version
+    st.session_state[sent_key] = version
+    value = _component()(
+        stations=stations if send else None,
+        payload_version=version,
+        current=current_id,
+        hints=(hints or {}) if send else None,
+        telemetry={"url": telemetry_url, "mode": mode,
+                   "flush_ms": int(settings.PLAYBACK_CLIENT_FLUSH * 1000)} if telemetry_url else None,
+        key=key,
+        default=None,
+    )
+    if not value:
+        return current_id
+    if "click_to_audio_ms" in value:
+        # Cada medida chega uma vez; o valor fica no componente até a
+        # próxima troca, então só registra quando muda.
+        seen_key = f"{key}_measured"
+        if st.session_state.get(seen_key) != value:
+            st.session_state[seen_key] = value
+            playback.record(mode, value["click_to_audio_ms"], value.get("station") or "")
+    return value.get("station") or current_id
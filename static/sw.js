@@ -0,0 +1,85 @@
+// Service worker do app instalável (ver pwa.py).
+//
+// Servido de /app/static/, só controla páginas abaixo daí: a casca
+// (shell.html) e o que ela busca. A página do Streamlit e os streams
+// passam direto pela rede.
+//
+// - casca, manifesto, ícones e catálogo: do cache na hora, revalidados
+//   em segundo plano (stale-while-revalidate);
+// - arquivos com hash no nome (neuros.<hash>.css, fontes): só cache;
+// - o resto do escopo: rede, com o cache como reserva offline.
+var VERSION = "neuros-v1";
+var PRECACHE = [
+  "shell.html",
+  "manifest.json",
+  "icons/icon-192.png",
+  "icons/icon-512.png",
+];
+// Gerado em memória pelo servidor (só com o serve.py): se não é servido,
+// não pode derrubar a instalação inteira do addAll acima. A casca busca
+// e guarda o catálogo na primeira abertura com rede.
+var OPTIONAL = ["catalog.json"];
+var REVALIDATE = /\/(shell\.html|manifest\.json|catalog\.json|icons\/[^/]+)$/;
+var IMMUTABLE = /\/(neuros\.[0-9a-f]{10}\.css|fonts\/[^/]+)$/;
+
+self.addEventListener("install", function (event) {
+  event.waitUntil(
+    caches.open(VERSION).then(function (cache) {
+      return cache.addAll(PRECACHE).then(function () {
+        return Promise.all(OPTIONAL.map(function (path) {
+          return cache.add(path).catch(function (err) {
+            console.warn("Neuros Som: " + path + " fora do cache inicial", err);
+          });
+        }));
+      });
+    }).then(function () {
+      return self.skipWaiting();
+    })
+  );
+});
+
+self.addEventListener("activate", function (event) {
+  event.waitUntil(
+    caches.keys().then(function (names) {
+      return Promise.all(names.filter(function (name) {
+        return name.indexOf("neuros-") === 0 && name !== VERSION;
+      }).map(function (name) {
+        return caches.delete(name);
+      }));
+    }).then(function () {
+      return self.clients.claim();
+    })
+  );
+});
+
+function fetchAndStore(cache, request) {
+  return fetch(request).then(function (response) {
+    if (response.ok) cache.put(request, response.clone());
+    return response;
+  });
+}
+
+self.addEventListener("fetch", function (event) {
+  var request = event.request;
+  var url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== self.location.origin ||
+      request.headers.has("range")) {
+    return;
+  }
+  // A casca com ou sem parâmetros na URL é a mesma entrada no cache.
+  var key = url.pathname.endsWith("/shell.html") ? url.origin + url.pathname : request;
+  event.respondWith(caches.open(VERSION).then(function (cache) {
+    return cache.match(key).then(function (cached) {
+      if (cached && IMMUTABLE.test(url.pathname)) return cached;
+      var network = fetchAndStore(cache, key);
+      if (cached && REVALIDATE.test(url.pathname)) {
+        event.waitUntil(network.catch(function () {}));
+        return cached;
+      }
+      return network.catch(function (err) {
+        if (cached) return cached;
+        throw err;
+      });
+    });
+  }));
+});
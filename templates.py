@@ -0,0 +1,161 @@
+"""Templates pré-renderizados dos cartões de rádio.
+
+O CSS do stylable_container, o HTML do cartão e o documento do iframe
+do botão "Tocando agora" só dependem da estação, de ela estar (ou
+não) tocando, do seu estado de saúde e do texto de qualidade. Por
+isso são formatados uma vez por combinação e reaproveitados
+por todas as sessões; o cache é limitado e esvaziado quando o catálogo
+é recarregado.
+"""
+import html
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+import catalog
+
+# Alguns estados por estação; folga para catálogos de alguns milhares.
+CACHE_SIZE = 4096
+
+# Só cores "#rrggbb" entram no CSS; o resto vira a cor neutra.
+_HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_FALLBACK_COLOR = "#9e9e9e"
+
+
+class CardTemplate(NamedTuple):
+    key: str          # chave estável do stylable_container
+    button_key: str   # chave estável do st.button
+    css: str
+    markup: str
+    play_html: str    # documento do iframe (vazio se não está tocando)
+
+
+# Indicador de saúde exibido no cartão: (cor do ponto, dica ao passar o mouse).
+_HEALTH_DOTS = {
+    "ok": ("#3ddc84", "Stream respondendo"),
+    "slow": ("#FFD15C", "Stream lento para iniciar"),
+    "down": ("#ff5c5c", "Stream fora do ar"),
+}
+
+
+def card(name: str, info, is_playing: bool, health: str = "unknown",
+         quality: str = "") -> CardTemplate:
+    """Template do cartão da estação `name` (`info` é sua entrada no catálogo).
+
+    `quality` é o texto curto do monitor de qualidade ("128 kbps");
+    tem poucos valores por estação, então também entra na chave. Os
+    campos exibidos entram na chave junto com o id: uma recarga do
+    catálogo no meio do render não mistura conteúdo de duas versões.
+    """
+    return _card(info["id"], name, info["icon"], info["genre"], info["color"],
+                 is_playing, health, quality)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _card(station_id: str, name: str, icon: str, genre: str, color: str,
+          is_playing: bool, health: str, quality: str) -> CardTemplate:
+    # O catálogo pode vir de fontes externas: texto escapado, cor validada.
+    name, icon, genre, quality = (html.escape(v) for v in (name, icon, genre, quality))
+    color = color if _HEX_COLOR.match(color) else _FALLBACK_COLOR
+    border_glow = f"0 0 0 1px {color}aa, 0 8px 22px rgba(0,0,0,0.35)" if is_playing else "0 6px 16px rgba(0,0,0,0.25)"
+
+    css = f"""
+        {{
+            background: linear-gradient(155deg, {color}26, rgba(255,255,255,0.03));
+            border: 1px solid {color}55;
+            border-radius: 18px;
+            padding: 16px 16px 12px 16px;
+            margin-bottom: 16px;
+            box-shadow: {border_glow};
+            transition: all 0.25s ease;
+        }}
+    """
+    dot = ""
+    if health in _HEALTH_DOTS:
+        dot_color, dot_title = _HEALTH_DOTS[health]
+        dot = (f'<span class="health-dot" title="{dot_title}" '
+               f'style="background:{dot_color};"></span>')
+
+    markup = f"""
+        <div style="display:flex;align-items:center;gap:10px;margin-bottom:10px;">
+            <div style="font-size:1.8rem;line-height:1;">{icon}</div>
+            <div style="flex:1;">
+                <div style="font-weight:700;color:white;font-size:1rem;">{name}{dot}</div>
+                <div style="font-size:0.78rem;color:rgba(255,255,255,0.65);">{genre}{f" · {quality}" if quality else ""}</div>
+            </div>
+            {'<span class="live-badge"><span class="live-dot"></span>NO AR</span>' if is_playing else ''}
+        </div>
+    """
+    return CardTemplate(
+        key=f"card_{station_id}",
+        button_key=f"btn_{station_id}",
+        css=css,
+        markup=markup,
+        play_html=_play_html(station_id) if is_playing else "",
+    )
+
+
+def _play_html(station_id: str) -> str:
+    # components.html garante execução real de JS (st.markdown
+    # não executa <script> e nem sempre preserva onclick de
+    # forma confiável). O botão vive num iframe, então
+    # acessamos o documento pai via window.parent.document
+    # para encontrar e dar play no <audio> real da página —
+    # isso conta como gesto de clique síncrono e válido.
+    return f"""
+        <style>
+            html, body {{ margin:0; padding:0; background:transparent; }}
+            .neuros-play-btn {{
+                width:100%;
+                box-sizing:border-box;
+                padding:10px 16px;
+                font-size:0.95rem;
+                font-weight:700;
+                letter-spacing:0.3px;
+                color:white;
+                border-radius:999px;
+                border:1px solid rgba(255,255,255,0.18);
+                cursor:pointer;
+                background:rgba(255,255,255,0.06);
+                box-shadow:0 4px 14px rgba(0,0,0,0.25);
+                font-family:'Montserrat',sans-serif;
+                transition: all 0.2s ease;
+            }}
+            .neuros-play-btn:hover {{
+                background:rgba(255,255,255,0.16);
+                border-color:rgba(255,255,255,0.4);
+            }}
+            .neuros-play-btn:active {{
+                filter:brightness(0.9);
+            }}
+        </style>
+        <button id="neurosPlayBtn_{station_id}" class="neuros-play-btn">
+            ⏸️ Tocando agora
+        </button>
+        <script>
+            (function() {{
+                var btn = document.getElementById("neurosPlayBtn_{station_id}");
+                if (btn) {{
+                    btn.addEventListener("click", function() {{
+                        try {{
+                            var pdoc = window.parent.document;
+                            var audio = pdoc.querySelector("audio");
+                            if (audio) {{
+                                audio.play().catch(function(err) {{
+                                    console.log("Neuros Som: play bloqueado", err);
+                                    // Conta na telemetria (playback.py), se ligada.
+                                    var tele = window.parent.__neurosTelemetry;
+                                    if (tele) tele.push({{t: "blocked"}});
+                                }});
+                            }}
+                        }} catch (e) {{
+                            console.log("Neuros Som: erro ao acessar audio", e);
+                        }}
+                    }});
+                }}
+            }})();
+        </script>
+    """
+
+
+catalog.on_reload(lambda _catalog: _card.cache_clear())
@@ -0,0 +1,25 @@
+"""Configuração comum dos testes: módulos do app no path e streams falsos.
+
+Os módulos do app ficam na raiz do repositório; as configurações são
+lidas do ambiente no import, então o cache em disco aponta para um
+diretório temporário antes de qualquer import do app.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("NEUROS_CACHE_DIR", tempfile.mkdtemp(prefix="neuros-tests-"))
+os.environ.setdefault("NEUROS_SHARED_CACHE", "")
+
+from fakestream import FakeStreamServer  # noqa: E402
+
+
+@pytest.fixture
+def stream_server():
+    with FakeStreamServer(chunk_interval=0.01, slow_delay=1.0) as server:
+        yield server
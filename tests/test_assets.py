@@ -0,0 +1,74 @@
+import asyncio
+
+import assets
+
+
+def test_remote_fonts_until_woff2_exist(monkeypatch, tmp_path):
+    monkeypatch.setattr(assets, "FONTS_INDEX", tmp_path / "fonts.json")
+    assert assets._font_rules().startswith(f"@import url('{assets.REMOTE_FONTS}')")
+
+    (tmp_path / "fonts.json").write_text('{"Montserrat": "montserrat.0123456789.woff2"}')
+    rules = assets._font_rules()
+    assert "@import" not in rules
+    assert "url('fonts/montserrat.0123456789.woff2')" in rules
+
+
+def _headers(path, status=200):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"etag", b'"x"'), (b"cache-control", b"no-cache")]})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": path}
+    asyncio.run(assets.ImmutableStatic(app)(scope, None, send))
+    return dict(sent[0]["headers"])
+
+
+def test_immutable_only_for_hashed_files():
+    immutable = assets.IMMUTABLE.encode()
+    assert _headers("/app/static/neuros.4a71f48258.css")[b"cache-control"] == immutable
+    assert _headers("/base/app/static/fonts/montserrat.0123456789.woff2")[b"cache-control"] == immutable
+    assert _headers("/app/static/shell.html")[b"cache-control"] == b"no-cache"
+    assert _headers("/app/static/neuros.4a71f48258.css", 404)[b"cache-control"] == b"no-cache"
+
+
+def _get(path, headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": list(headers)}
+    asyncio.run(assets.GeneratedStatic(app)(scope, None, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+
+def test_generated_files_served_from_memory(monkeypatch):
+    monkeypatch.setattr(assets, "_generated", {})
+    assets.publish("neuros.0123456789.css", b"body{}", "text/css")
+
+    status, headers, body = _get("/app/static/neuros.0123456789.css")
+    assert (status, body) == (200, b"body{}")
+    assert headers[b"cache-control"] == assets.IMMUTABLE.encode()
+
+    assert _get("/app/static/neuros.0123456789.css", [(b"if-none-match", headers[b"etag"])])[0] == 304
+    assert _get("/app/static/shell.html")[0] == 404
+
+
+def test_head_inlines_css_without_middleware(monkeypatch):
+    monkeypatch.setattr(assets.settings, "ASSETS_BASE_URL", "")
+    monkeypatch.setattr(assets, "_mounted", False)
+    assert assets.head_html().startswith("<style>")
+
+    monkeypatch.setattr(assets, "_mounted", True)
+    name = assets.publish_stylesheet()
+    assert assets.head_html().startswith(f'<link rel="stylesheet" href="/app/static/{name}">')
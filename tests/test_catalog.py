@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+import pytest
+
+import catalog
+
+
+def _station(**overrides):
+    station = {"id": "rock-fm", "name": "Rock FM", "url": "https://example.com/rock",
+               "color": "#FF8E53", "icon": "🤘", "genre": "Rock"}
+    station.update(overrides)
+    return station
+
+
+def test_valid_station_is_normalized():
+    info = catalog.validate_station(_station(
+        mirrors=["https://mirror.example.com/rock"],
+        variants=[{"url": "https://example.com/64", "bitrate": 64},
+                  {"url": "https://example.com/128", "bitrate": 128}],
+    ))
+
+    assert info["mirrors"] == ("https://mirror.example.com/rock",)
+    assert [v["bitrate"] for v in info["variants"]] == [128, 64]
+
+
+@pytest.mark.parametrize("overrides", [
+    {"id": "Rock FM"},
+    {"url": "ftp://example.com/rock"},
+    {"color": "red"},
+    {"format": "audio/flac"},
+    {"name": "  "},
+    {"mirrors": "https://example.com"},
+    {"variants": [{"url": "https://example.com/64", "bitrate": True}]},
+    {"variants": [{"url": "https://example.com/64", "bitrate": 0}]},
+])
+def test_invalid_station_rejected(overrides):
+    with pytest.raises(catalog.CatalogError):
+        catalog.validate_station(_station(**overrides))
+
+
+def test_bad_entries_are_skipped_not_fatal():
+    raw = json.dumps({"stations": [_station(), _station(name="Outra"), _station(id="x", color="?")]})
+
+    cat = catalog.parse_catalog(raw.encode())
+
+    assert list(cat.radios) == ["Rock FM"]
+    assert len(cat.errors) == 2
+
+
+def _write(path, stations, bump):
+    path.write_text(json.dumps({"stations": stations}), encoding="utf-8")
+    os.utime(path, ns=(bump, bump))
+
+
+def _wait_version(store, version, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if store.get().version == version:
+            return store.get()
+        time.sleep(0.01)
+    raise AssertionError(f"catálogo não chegou à versão {version}")
+
+
+def test_reload_on_mtime_change_and_listener_isolation(tmp_path, caplog):
+    path = tmp_path / "radios.json"
+    _write(path, [_station()], 1_000_000_000)
+    store = catalog.CatalogStore(path, check_interval=0)
+    seen = []
+
+    def broken(cat):
+        raise OSError("static/ somente leitura")
+
+    store.on_reload(broken)
+    store.on_reload(seen.append)
+
+    first = store.get()
+    assert first.version == 1 and list(first.radios) == ["Rock FM"]
+    assert seen == [first]
+    assert "somente leitura" in caplog.text
+
+    # Mesmo arquivo: nenhuma recarga.
+    assert store.get() is first
+
+    _write(path, [_station(), _station(id="jazz", name="Jazz")], 2_000_000_000)
+    second = _wait_version(store, 2)
+
+    assert list(second.radios) == ["Rock FM", "Jazz"]
+    assert seen == [first, second]
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import health
+
+
+def _station(url, *mirrors):
+    return {"id": "teste", "url": url, "mirrors": list(mirrors)}
+
+
+def _probe(monitor, info):
+    """Sonda as URLs da estação e espera o resultado ir para o cache."""
+    monitor.refresh(health.station_urls(info)).result(timeout=10)
+    # _store roda no callback do Future, na thread do loop de fundo.
+    deadline = time.monotonic() + 5
+    while monitor._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_probe_states(stream_server):
+    ok = asyncio.run(health.probe(stream_server.url("/ok/a"), timeout=2))
+    assert ok.state == health.OK and ok.status == 200 and ok.ttfb_ms is not None
+
+    down = asyncio.run(health.probe(stream_server.url("/status/503"), timeout=2))
+    assert down.state == health.DOWN and down.status == 503
+
+    slow = asyncio.run(health.probe(stream_server.url("/slow/a"), timeout=3, slow_ms=300))
+    assert slow.state == health.SLOW
+
+
+def test_icy_status_line_is_ok(stream_server):
+    result = asyncio.run(health.probe(stream_server.url("/icy/a"), timeout=2))
+    assert result.state == health.OK
+
+
+def test_failover_to_mirror(stream_server):
+    monitor = health.HealthMonitor(ttl=60, timeout=2, slow_ms=1500)
+    info = _station(stream_server.url("/status/500"), stream_server.url("/status/404"),
+                    stream_server.url("/ok/espelho"))
+    # Antes de qualquer sondagem, fica com a principal.
+    assert monitor.pick_url(info) == info["url"]
+
+    _probe(monitor, info)
+
+    assert monitor.pick_url(info) == info["mirrors"][1]
+    assert monitor.state(info) == health.OK
+
+
+def test_all_down_keeps_primary(stream_server):
+    monitor = health.HealthMonitor(ttl=60, timeout=2, slow_ms=1500)
+    info = _station(stream_server.url("/status/500"), stream_server.url("/status/502"))
+    _probe(monitor, info)
+
+    assert monitor.state(info) == health.DOWN
+    assert monitor.pick_url(info) == info["url"]
+
+
+def test_check_only_probes_expired_urls(stream_server):
+    monitor = health.HealthMonitor(ttl=60, timeout=2, slow_ms=1500)
+    radios = {"A": _station(stream_server.url("/ok/a"))}
+    _probe(monitor, radios["A"])
+
+    submitted = []
+    monitor.refresh = submitted.append
+    monitor.check(radios)
+    assert submitted == []
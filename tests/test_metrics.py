@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+import metrics
+from conftest import ROOT
+
+
+def test_exposition_in_seconds_with_rerun_kinds(monkeypatch):
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_reruns", metrics.Counter())
+    metrics.observe("main", 12.0, "full")
+    metrics.observe("render_stations", 3.0, "fragment")
+    metrics.observe("render_stations", 4.0)
+
+    text = metrics.exposition()
+
+    assert 'neuros_render_duration_seconds_bucket{stage="main",le="0.025"} 1' in text
+    assert 'neuros_render_duration_seconds_sum{stage="render_stations"} 0.007000' in text
+    assert 'neuros_reruns_total{kind="full"} 1' in text
+    assert 'neuros_reruns_total{kind="fragment"} 1' in text
+    assert "_ms" not in text
+
+
+def test_json_lines_reach_stderr_when_enabled():
+    code = "import metrics; metrics.observe('main', 1.5, 'full')"
+    env = {**os.environ, "NEUROS_METRICS": "1", "PYTHONPATH": str(ROOT)}
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True,
+                          text=True, timeout=30, cwd=ROOT)
+    line = json.loads(proc.stderr.strip().splitlines()[-1])
+    assert line["event"] == "render" and line["stage"] == "main" and line["ms"] == 1.5
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import catalog
+import fakestream
+import icyhttp
+import nowplaying
+import settings
+from fakestream import FakeStreamServer
+
+
+class _Counting(fakestream._Handler):
+    def do_GET(self):
+        with self.server.hits_lock:
+            self.server.hits += 1
+        super().do_GET()
+
+
+@pytest.fixture
+def counting_server():
+    server = FakeStreamServer(handler=_Counting, chunk_interval=0.01, metaint=1024,
+                              titles=("Artista A - Música 1", "Artista B - Música 2"))
+    server.hits, server.hits_lock = 0, threading.Lock()
+    with server:
+        yield server
+
+
+@pytest.fixture
+def station(monkeypatch, counting_server):
+    """Catálogo com uma rádio; devolve uma função que troca a rota dela."""
+    monkeypatch.setattr(settings, "HEALTH_ENABLED", False)
+
+    def use(path: str) -> str:
+        raw = json.dumps({"stations": [{
+            "id": "teste", "name": "Teste", "url": counting_server.url(path),
+            "color": "#FF6B6B", "icon": "📻", "genre": "Teste",
+        }]}).encode()
+        cat = catalog.parse_catalog(raw)
+        monkeypatch.setattr(nowplaying.catalog, "get_catalog", lambda: cat)
+        return "teste"
+    return use
+
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_parse_metadata():
+    block = fakestream.icy_block("StreamTitle='Daft Punk - One More Time';StreamUrl='';")
+    assert nowplaying.parse_metadata(block[1:]) == {
+        "StreamTitle": "Daft Punk - One More Time", "StreamUrl": "",
+    }
+    assert nowplaying.parse_metadata("StreamTitle='Canção';".encode("latin-1")) == {
+        "StreamTitle": "Canção",
+    }
+
+
+def test_read_titles_follows_metaint(counting_server):
+    titles = []
+
+    async def read():
+        resp = await icyhttp.open_stream(counting_server.url("/meta/a"),
+                                         headers={"Icy-MetaData": "1"}, timeout=2)
+        try:
+            assert resp.headers["icy-metaint"] == "1024"
+            task = asyncio.ensure_future(nowplaying.read_titles(resp, titles.append))
+            while len(titles) < 3:
+                await asyncio.sleep(0.01)
+            task.cancel()
+        finally:
+            resp.close()
+
+    asyncio.run(asyncio.wait_for(read(), 5))
+    assert titles[:3] == ["Artista A - Música 1", "Artista B - Música 2", "Artista A - Música 1"]
+
+
+def test_read_titles_without_metaint(counting_server):
+    async def read():
+        resp = await icyhttp.open_stream(counting_server.url("/ok/a"),
+                                         headers={"Icy-MetaData": "1"}, timeout=2)
+        try:
+            await nowplaying.read_titles(resp, lambda title: None)
+        finally:
+            resp.close()
+
+    with pytest.raises(nowplaying.NoMetadata):
+        asyncio.run(read())
+
+
+def test_publishes_title_and_stops_when_idle(station):
+    station_id = station("/meta/a")
+    playing = nowplaying.NowPlaying(idle_timeout=0.5)
+
+    playing.touch(station_id)
+    assert _wait(lambda: playing.title(station_id) is not None)
+    assert playing.title(station_id).startswith("Artista")
+    assert playing.active() == [station_id]
+
+    # Sem novos touch: o leitor encerra e o título sai.
+    assert _wait(lambda: not playing.active(), timeout=5)
+    assert playing.title(station_id) is None
+
+
+def test_station_without_metadata_is_not_reopened(station, counting_server):
+    station_id = station("/ok/sem-metadados")
+    playing = nowplaying.NowPlaying(idle_timeout=30)
+
+    playing.touch(station_id)
+    assert _wait(lambda: not playing.active())
+    for _ in range(5):
+        playing.touch(station_id)
+        time.sleep(0.05)
+
+    assert counting_server.hits == 1
+    assert playing.title(station_id) is None
+
+    # Catálogo recarregado: tenta de novo.
+    playing.forget_missing()
+    playing.touch(station_id)
+    assert _wait(lambda: counting_server.hits == 2)
+
+
+def test_title_from_replica_holding_the_lease(monkeypatch, tmp_path):
+    shared = nowplaying.sharedcache.SQLiteCache(tmp_path / "shared.sqlite3")
+    shared.acquire_many(["title:teste"], "outra-replica", 30)
+    shared.set_many({"title:teste": "Artista C - Música 3"}, 30)
+    monkeypatch.setattr(nowplaying.sharedcache, "get_cache", lambda: shared)
+    monkeypatch.setattr(nowplaying.sharedcache, "RETRY", 0.05)
+    playing = nowplaying.NowPlaying(idle_timeout=30)
+
+    # Antes do leitor de fundo, o render não vai ao cache.
+    assert playing.title("teste") is None
+    playing.touch("teste")
+    assert _wait(lambda: playing.title("teste") == "Artista C - Música 3")
+
+
+def test_shared_cache_error_keeps_last_title():
+    class Broken:
+        def get_many(self, keys):
+            raise ConnectionError("cache fora do ar")
+
+    playing = nowplaying.NowPlaying(idle_timeout=30)
+    playing._titles["teste"] = "Artista A - Música 1"
+
+    asyncio.run(playing._fetch(Broken(), "teste"))
+
+    assert playing.title("teste") == "Artista A - Música 1"
+
+
+def test_retry_delay_grows_with_jitter_and_cap():
+    for failures, full in ((0, 5.0), (1, 10.0), (3, 40.0), (10, 300.0), (40, 300.0)):
+        for _ in range(20):
+            assert full / 2 <= nowplaying.retry_delay(failures) <= full
+
+
+def test_dead_station_reopened_with_backoff(monkeypatch, station, counting_server):
+    monkeypatch.setattr(nowplaying, "RETRY_MIN", 0.1)
+    station_id = station("/status/503")
+    playing = nowplaying.NowPlaying(idle_timeout=30)
+
+    playing.touch(station_id)
+    time.sleep(1.6)
+
+    # Espera fixa de 0,1 s daria ~15 conexões; dobrando, no máximo 6.
+    assert 2 <= counting_server.hits <= 6
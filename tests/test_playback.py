@@ -0,0 +1,120 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import playback
+import sidecar
+
+
+@pytest.fixture
+def beacon(monkeypatch):
+    received = []
+    monkeypatch.setattr(playback, "enqueue", received.extend)
+    server = sidecar._Server(("127.0.0.1", 0), sidecar._Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    yield conn, received
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def _post(conn, body: bytes):
+    conn.request("POST", "/playback", body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response
+
+
+def test_batch_accepted(beacon):
+    conn, received = beacon
+    events = [{"t": "play", "mode": "classic", "ms": 420}]
+
+    assert _post(conn, json.dumps({"events": events}).encode()).status == 204
+    assert received == events
+
+
+def test_single_measure_format_rejected(beacon):
+    conn, received = beacon
+    body = json.dumps({"mode": "classic", "click_to_audio_ms": 420}).encode()
+
+    assert _post(conn, body).status == 400
+    assert received == []
+
+
+def test_oversized_body_closes_connection(beacon):
+    conn, received = beacon
+    body = json.dumps({"events": [{"t": "play", "ms": 1, "pad": "x" * playback.MAX_BODY}]}).encode()
+
+    response = _post(conn, body)
+
+    assert response.status == 413
+    assert response.getheader("Connection") == "close"
+    assert received == []
+
+
+@pytest.mark.parametrize("ms", ["x", [1], {"a": 1}, float("nan")])
+def test_counter_event_ignores_bad_ms(ms):
+    assert playback._event({"t": "blocked", "station": "r", "ms": ms}) == ("blocked", "r", "", 0.0)
+
+
+@pytest.mark.parametrize("ms", ["x", [1], True, float("inf"), -1, None])
+def test_timed_event_needs_finite_ms(ms):
+    assert playback._event({"t": "play", "station": "r", "ms": ms}) is None
+
+
+def test_malformed_counter_event_is_accepted_not_crashing(monkeypatch):
+    server = sidecar._Server(("127.0.0.1", 0), sidecar._Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    queued = []
+    monkeypatch.setattr(playback, "_queue", type("Fila", (), {"put": staticmethod(queued.append)}))
+    monkeypatch.setattr(playback, "_ensure_writer", lambda: None)
+    monkeypatch.setattr(playback, "_queued", 0)
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        events = [{"t": "error", "station": "r", "ms": "x"}, {"t": "blocked", "ms": [1, 2]}]
+        assert _post(conn, json.dumps({"events": events}).encode()).status == 204
+        # A conexão segue utilizável: a resposta saiu inteira.
+        assert _post(conn, b'{"events": "nada"}').status == 400
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+    assert [e[0] for e in queued] == ["error", "blocked"]
+
+
+@pytest.fixture
+def stored(monkeypatch, tmp_path):
+    """Banco com agregados de uma execução anterior; foto ainda não lida."""
+    monkeypatch.setattr(playback.settings, "PLAYBACK_DB", tmp_path / "playback.sqlite3")
+    monkeypatch.setattr(playback, "_snapshot", {})
+    monkeypatch.setattr(playback, "_loaded", False)
+    conn = playback._connect()
+    rows = playback._aggregate(
+        [("play", "fast", "classic", 200.0)] * 3
+        + [("play", "slow", "classic", 2500.0)] * 3 + [("stall", "slow", "classic", 900.0)] * 3
+        + [("stall", "stalls-only", "classic", 500.0), ("blocked", "blocked-only", "classic", 0.0)]
+    )
+    with conn:
+        conn.executemany("INSERT INTO playback VALUES (?, ?, ?, ?, ?, ?)",
+                         [(*k, c, t) for k, (c, t) in rows.items()])
+    conn.close()
+
+
+def test_snapshot_loaded_on_first_read_after_restart(stored, monkeypatch):
+    monkeypatch.setattr(playback.settings, "PLAYBACK_MIN_SAMPLES", 3)
+
+    assert playback.station_stats("fast")["plays"] == 3
+    assert playback.field_health("slow", "ok") == "slow"
+    assert playback.ranking() == ["fast", "slow"]
+
+
+def test_ranking_puts_unmeasured_stations_last(stored, monkeypatch):
+    monkeypatch.setattr(playback.settings, "PLAYBACK_MIN_SAMPLES", 0)
+
+    assert playback.ranking()[:2] == ["fast", "slow"]
+    assert sorted(playback.ranking()[2:]) == ["blocked-only", "stalls-only"]
+    assert playback.field_health("stalls-only", "ok") == "ok"
+    assert playback.summary()["ranking"] == playback.ranking()
@@ -0,0 +1,44 @@
+import pytest
+from streamlit import config
+
+import pwa
+
+
+@pytest.fixture
+def base_url_path():
+    original = config.get_option("server.baseUrlPath")
+    yield lambda value: config.set_option("server.baseUrlPath", value)
+    config.set_option("server.baseUrlPath", original)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("", "/app/static"),
+    ("neuros", "/neuros/app/static"),
+    ("/radio/neuros/", "/radio/neuros/app/static"),
+])
+def test_bootstrap_urls_follow_base_url_path(monkeypatch, base_url_path, value, expected):
+    monkeypatch.setattr(pwa, "_published", "x")
+    base_url_path(value)
+
+    html = pwa.bootstrap_js()
+
+    assert f'href: "{expected}/manifest.json"' in html
+    assert f'register("{expected}/sw.js")' in html
+    assert "console.warn" in html
+
+
+def test_catalog_published_in_memory(monkeypatch):
+    import json
+
+    import catalog
+
+    monkeypatch.setattr(pwa, "_published", None)
+    monkeypatch.setattr(pwa.assets, "_generated", {})
+    raw = json.dumps({"stations": [{"id": "rock-fm", "name": "Rock FM", "url": "https://example.com/rock",
+                                    "color": "#FF8E53", "icon": "🤘", "genre": "Rock"}]})
+
+    pwa.publish_catalog(catalog.parse_catalog(raw.encode()))
+
+    content_type, cache_control, body = pwa.assets._generated["catalog.json"]
+    assert (content_type, cache_control) == ("application/json", "no-cache")
+    assert json.loads(body)["stations"][0]["url"] == "https://example.com/rock"
@@ -0,0 +1,20 @@
+import quality
+from fakestream import mp3_frame
+
+
+def test_scan_counts_mp3_frames():
+    buf = mp3_frame(128) * 20
+
+    stats = quality.scan(buf)
+
+    assert stats.kind == "mp3" and stats.frames == 20
+    assert stats.sync_loss == 0.0
+    assert round(stats.bitrate_kbps) == 128
+
+
+def test_label_flags_low_bitrate():
+    stats = quality.FrameStats("mp3", 10, 4000, 0.26, 100.0, 44100, 0.0, 0)
+    monitor = quality.QualityMonitor(60.0, 1.0, 5)
+    monitor.add("r", quality.Sample(0.0, stats, 128, 12.0, 1.0))
+
+    assert monitor.label("r") == "⚠ 100 kbps de 128"
@@ -0,0 +1,66 @@
+import json
+import logging
+import socket
+
+import relay
+import settings
+import sidecar
+
+
+def test_first_listener_gets_catalog_content_type(monkeypatch, stream_server):
+    info = {"id": "aac", "url": stream_server.url("/ok/aac"), "format": "audio/aac"}
+    monkeypatch.setattr(relay, "_station_info", lambda station_id: info)
+
+    # Antes de qualquer conexão com a origem.
+    station = relay.StationRelay("aac", 64 * 1024)
+
+    assert station.content_type == "audio/aac"
+
+
+def test_sniffed_format_wins_over_catalog(monkeypatch, stream_server):
+    info = {"id": "ogg", "url": stream_server.url("/ok/ogg"), "format": "audio/mpeg"}
+    monkeypatch.setattr(relay, "_station_info", lambda station_id: info)
+    monkeypatch.setattr(relay.sniff.formats, "get", {info["url"]: "audio/ogg"}.get)
+
+    assert relay.StationRelay("ogg", 64 * 1024).content_type == "audio/ogg"
+
+
+def test_sidecar_bind_failure_is_not_retried(monkeypatch, caplog):
+    busy = socket.socket()
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    monkeypatch.setattr(settings, "SIDECAR_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SIDECAR_PORT", busy.getsockname()[1])
+    monkeypatch.setattr(sidecar, "_server", None)
+    monkeypatch.setattr(sidecar, "_failed", False)
+    try:
+        with caplog.at_level(logging.ERROR, logger="sidecar"):
+            assert sidecar.ensure_started() is None
+            assert sidecar.ensure_started() is None
+    finally:
+        busy.close()
+
+    assert len([r for r in caplog.records if r.name == "sidecar"]) == 1
+
+
+def test_listen_url_none_without_sidecar(monkeypatch):
+    monkeypatch.setattr(sidecar, "ensure_started", lambda: None)
+
+    assert relay.listen_url("kiss-fm") is None
+
+
+
+def test_pwa_snapshot_plays_origin_without_sidecar(monkeypatch):
+    import catalog
+    import pwa
+
+    monkeypatch.setattr(settings, "RELAY_ENABLED", True)
+    monkeypatch.setattr(sidecar, "ensure_started", lambda: None)
+    station = {"id": "r", "name": "R", "url": "https://example.com/r", "color": "#ffffff",
+               "icon": "x", "genre": "g", "mirrors": ["https://mirror.example.com/r"]}
+    cat = catalog.parse_catalog(json.dumps({"stations": [station]}).encode())
+
+    snapshot = pwa.catalog_snapshot(cat)["stations"][0]
+
+    assert snapshot["url"] == "https://example.com/r"
+    assert snapshot["mirrors"] == ["https://mirror.example.com/r"]
@@ -0,0 +1,64 @@
+import json
+
+import catalog
+import search
+
+
+def _index(*stations):
+    raw = json.dumps({"stations": [
+        {"id": f"r{i}", "name": name, "url": f"https://example.com/{i}", "color": "#FF6B6B",
+         "icon": "📻", "genre": genre, **({"tags": tags} if tags else {})}
+        for i, (name, genre, tags) in enumerate(stations)
+    ]}).encode()
+    return search.StationIndex(catalog.parse_catalog(raw, version=1))
+
+
+INDEX = _index(
+    ("Rádio Clássica", "Clássico", None),
+    ("Jazz Café", "Jazz", ["lounge"]),
+    ("Rock Brasil", "Rock", ["nacional"]),
+    ("Rádio Rock", "Rock", None),
+)
+
+
+def test_normalize_folds_accents_and_case():
+    assert search.normalize("RÁDIO Clássica") == "radio classica"
+
+
+def test_accent_and_case_insensitive_match():
+    assert INDEX.search("radio") == ("Rádio Clássica", "Rádio Rock")
+    assert INDEX.search("CAFÉ") == INDEX.search("cafe") == ("Jazz Café",)
+    assert INDEX.search("classi") == ("Rádio Clássica",)
+
+
+def test_results_keep_catalog_order_and_all_terms():
+    assert INDEX.search("rock") == ("Rock Brasil", "Rádio Rock")
+    assert INDEX.search("rock radio") == ("Rádio Rock",)
+    assert INDEX.search("nacional") == ("Rock Brasil",)
+    assert INDEX.search("", genre="Rock") == ("Rock Brasil", "Rádio Rock")
+    assert INDEX.search("radio", genre="Rock") == ("Rádio Rock",)
+
+
+def test_typo_falls_back_to_trigrams_only_without_prefix():
+    assert INDEX.search("brasill") == ("Rock Brasil",)
+    # Havendo prefixo, a semelhança não entra.
+    assert INDEX.search("jaz") == ("Jazz Café",)
+    assert INDEX.search("xyzw") == ()
+
+
+def test_cache_is_lru_on_normalized_query(monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_CACHE_SIZE", 2)
+    index = _index(("Rock Brasil", "Rock", None))
+    calls = []
+    original = index._search
+    monkeypatch.setattr(index, "_search", lambda *key: calls.append(key) or original(*key))
+
+    index.search("Rock")
+    index.search("  rock ")          # mesma consulta normalizada
+    index.search("brasil")
+    index.search("rock")             # recente: continua no cache
+    index.search("bra")              # sai "brasil", a menos usada
+    index.search("rock")
+    index.search("brasil")
+
+    assert calls == [(("rock",), None), (("brasil",), None), (("bra",), None), (("brasil",), None)]
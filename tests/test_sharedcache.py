@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import sharedcache
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return sharedcache.SQLiteCache(tmp_path / "shared.sqlite3")
+
+
+def test_lease_is_exclusive_until_released(shared):
+    assert shared.acquire_many(["a", "b"], "r1", 30) == ["a", "b"]
+    assert shared.acquire_many(["a", "c"], "r2", 30) == ["c"]
+    # Quem já tem a reserva a renova.
+    assert shared.acquire_many(["a"], "r1", 30) == ["a"]
+
+    shared.release_many(["a"], "r2")          # não é de r2: nada muda
+    assert shared.acquire_many(["a"], "r2", 30) == []
+    shared.release_many(["a"], "r1")
+    assert shared.acquire_many(["a"], "r2", 30) == ["a"]
+
+
+def test_lease_taken_over_after_it_expires(shared, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(sharedcache.time, "time", lambda: now)
+    shared.acquire_many(["a"], "r1", 10)
+
+    now += 9
+    assert shared.acquire_many(["a"], "r2", 10) == []
+    now += 2
+    assert shared.acquire_many(["a"], "r2", 10) == ["a"]
+
+
+def test_entries_expire_with_ttl(shared, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(sharedcache.time, "time", lambda: now)
+    shared.set_many({"k": {"ok": True}}, 10)
+
+    assert shared.get_many(["k", "outra"]) == {"k": ({"ok": True}, now + 10)}
+    now += 10
+    assert shared.get_many(["k"]) == {}
+
+
+def test_resolve_skips_keys_leased_by_another_replica(shared, monkeypatch):
+    monkeypatch.setattr(sharedcache.settings, "SHARED_CACHE_LEASE", 30)
+    shared.set_many({"health:cached": "valor antigo"}, 60)
+    shared.acquire_many(["health:busy"], "outra-replica", 30)
+    computed = []
+
+    async def compute(keys):
+        computed.extend(keys)
+        return {k: f"novo {k}" for k in keys}
+
+    found = asyncio.run(sharedcache.resolve(shared, "health", ["cached", "busy", "free"], compute, 60))
+
+    assert computed == ["free"]
+    assert {k: v for k, (v, _) in found.items()} == {"cached": "valor antigo", "free": "novo free"}
+    assert shared.get_many(["health:free"])["health:free"][0] == "novo free"
+    # A reserva de "free" foi devolvida; a da outra réplica continua.
+    assert shared.acquire_many(["health:free", "health:busy"], "terceira", 30) == ["health:free"]
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import fakestream
+import sniff
+from fakestream import FakeStreamServer
+
+
+def adts_frame(length: int = 371) -> bytes:
+    """Quadro AAC-LC em ADTS, 44.1 kHz estéreo, só com zeros de conteúdo."""
+    header = bytes((0xFF, 0xF1, 0x50, 0x80 | (length >> 11), (length >> 3) & 0xFF,
+                    ((length & 7) << 5) | 0x1F, 0xFC))
+    return header + b"\x00" * (length - len(header))
+
+
+ID3 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+
+CASES = {
+    "mp3": (fakestream.MP3_FRAME * 8, "audio/mpeg"),
+    "mp3-id3": (ID3 + fakestream.MP3_FRAME * 8, "audio/mpeg"),
+    "aac": (adts_frame() * 8, "audio/aac"),
+    "ogg": (b"OggS\x00\x02" + b"\x00" * 200, "audio/ogg"),
+    "hls": (b"#EXTM3U\n#EXT-X-VERSION:3\n", sniff.HLS),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_sniff_bytes(name):
+    payload, expected = CASES[name]
+    assert sniff.sniff_bytes(payload) == expected
+
+
+def test_sniff_bytes_inconclusive():
+    assert sniff.sniff_bytes(b"<html>nada de audio</html>") is None
+    assert sniff.sniff_bytes(b"\x00" * 4096) is None
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_sniff_url_ignores_declared_content_type(name):
+    payload, expected = CASES[name]
+    # O servidor declara sempre audio/mpeg; vale o que os bytes dizem.
+    with FakeStreamServer(payload=payload, chunk_interval=0.01) as server:
+        assert asyncio.run(sniff.sniff_url(server.url("/ok/x"), timeout=2)) == expected
+
+
+def test_format_cache_persists_and_backs_off(stream_server, tmp_path):
+    path = tmp_path / "formats.json"
+    cache = sniff.FormatCache(path, timeout=2)
+    ok, bad = stream_server.url("/ok/a"), stream_server.url("/status/404")
+
+    results = cache.ensure([ok, bad]).result(timeout=10)
+
+    assert results == {ok: "audio/mpeg", bad: None}
+    assert cache.get(ok) == "audio/mpeg"
+    assert json.loads(path.read_text()) == {ok: "audio/mpeg"}
+    # Já conhecida ou em espera após falha: nada a farejar.
+    assert cache.ensure([ok, bad]) is None
+    # Outro processo lê do disco sem rede.
+    assert sniff.FormatCache(path).get(ok) == "audio/mpeg"
+
+
+def test_shared_cache_failure_releases_urls(monkeypatch, tmp_path):
+    async def broken(*args, **kwargs):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(sniff.sharedcache, "get_cache", lambda: object())
+    monkeypatch.setattr(sniff.sharedcache, "resolve", broken)
+    cache = sniff.FormatCache(tmp_path / "formats.json", timeout=2)
+    url = "http://127.0.0.1:9/stream"
+
+    assert cache.ensure([url]).result(timeout=10) == {}
+    assert url not in cache._pending
+    # Em espera curta (RETRY), não presa para sempre.
+    assert cache._failed[url] <= time.monotonic() + sniff.sharedcache.RETRY
+    cache._failed[url] = 0.0
+    assert cache.ensure([url]).result(timeout=10) == {}
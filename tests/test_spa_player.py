@@ -0,0 +1,17 @@
+import spa_player
+
+
+def test_payload_built_once_per_version(monkeypatch):
+    monkeypatch.setattr(spa_player, "_payload", None)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return len(builds)
+
+    assert spa_player.payload("1.0.0", build, max_age=60) == ("1.0.0", 1)
+    assert spa_player.payload("1.0.0", build, max_age=60) == ("1.0.0", 1)
+    # Saúde mudou (failover): nova versão, nova lista.
+    assert spa_player.payload("1.1.0", build, max_age=60) == ("1.1.0", 2)
+    # Velha demais: remonta, mesmo sem mudança de versão.
+    assert spa_player.payload("1.1.0", build, max_age=0) == ("1.1.0", 3)
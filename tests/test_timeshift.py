@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import settings
+import timeshift
+
+
+@pytest.fixture
+def ring_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "TIMESHIFT_DIR", tmp_path)
+    return tmp_path
+
+
+def test_map_stays_open_for_lagging_listener(ring_dir):
+    ring = timeshift.RingFile("r", 4096)
+    ring.data[:4] = b"abcd"
+    assert ring.acquire()          # ouvinte
+
+    ring.release()                 # relay encerrou
+    assert memoryview(ring.data)[:4] == b"abcd"
+    assert os.path.exists(ring.path)
+
+    ring.release()                 # último ouvinte saiu
+    assert ring.data.closed
+    assert not os.path.exists(ring.path)
+    assert not ring.acquire()
+
+
+def test_overlapping_relays_get_separate_files(ring_dir):
+    old = timeshift.RingFile("r", 4096)
+    new = timeshift.RingFile("r", 4096)
+
+    assert old.path != new.path
+    old.release()
+    assert os.path.exists(new.path)
+    new.release()
+
+
+def test_remove_stale_keeps_live_processes(ring_dir):
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                          capture_output=True, text=True).stdout.strip()
+    (ring_dir / f"rock-80s-{dead}-0.ring").write_bytes(b"x")
+    (ring_dir / f"rock-{dead}.ring").write_bytes(b"x")
+    live = timeshift.RingFile("rock-80s", 4096)
+
+    timeshift.remove_stale()
+
+    assert sorted(os.listdir(ring_dir)) == [os.path.basename(live.path)]
+    live.release()
+
+
+def test_failed_map_leaves_no_file(ring_dir, monkeypatch):
+    def refuse(*args):
+        raise OSError("sem memória")
+
+    monkeypatch.setattr(timeshift.mmap, "mmap", refuse)
+
+    with pytest.raises(OSError):
+        timeshift.RingFile("r", 4096)
+    assert os.listdir(ring_dir) == []
+
+
+def test_rewind_bounded_by_file_cap(monkeypatch):
+    monkeypatch.setattr(settings, "TIMESHIFT_MINUTES", 30.0)
+    monkeypatch.setattr(settings, "TIMESHIFT_MAX_MB", 32.0)
+
+    # 32 MB a 320 kbps: pouco menos de 14 min cabem, não 30.
+    assert 800 < timeshift.max_delay() < 840
+    assert list(timeshift.rewind_options().values()) == [0, 30, 60, 120, 300, 600]
+
+    monkeypatch.setattr(settings, "TIMESHIFT_MAX_MB", 1000.0)
+    assert timeshift.max_delay() == 1800
+    assert list(timeshift.rewind_options().values())[-1] == 1800
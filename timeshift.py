@@ -0,0 +1,214 @@
+"""Time-shift: os últimos minutos de cada rádio ouvida, para voltar ou retomar.
+
+No carro, um túnel derruba a conexão e o st.audio, ao voltar, recomeça
+do ao vivo — o trecho perdido some. Com NEUROS_TIMESHIFT_MINUTES e o
+relay ligado, o buffer circular de cada rádio com ouvintes passa a
+morar num arquivo mapeado em memória (mmap), do tamanho de
+TIMESHIFT_MINUTES no pior caso de taxa e nunca maior que
+TIMESHIFT_MAX_MB. O relay marca, a cada ~1 s de áudio, a posição de
+uma fronteira de quadro; `/relay/<id>?delay=<s>` começa a tocar <s>
+segundos atrás do ao vivo, sempre num quadro inteiro.
+
+O disco ocupado é fixo por rádio ativa; a RAM é só o índice de marcas
+(as páginas do arquivo são cache do sistema, que as devolve sob
+pressão). O arquivo é criado quando a rádio ganha o primeiro ouvinte e
+apagado quando o relay encerra — que, com o time-shift, espera
+TIMESHIFT_HOLD segundos sem ouvintes, para quem caiu poder voltar — e
+o último ouvinte ainda lendo dele sai. Arquivos de um processo que
+morreu sem apagá-los saem no início do próximo (remove_stale).
+
+No navegador, resume_js() acompanha o <audio> do relay: quando a
+conexão cai, anota o instante; quando a rede volta, reconecta com o
+atraso que o ouvinte já tinha somado ao tempo parado.
+"""
+import itertools
+import logging
+import mmap
+import os
+import re
+import threading
+
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Taxa (kbps) usada para dimensionar o arquivo: cabe a janela inteira
+# mesmo na rádio de maior taxa do catálogo.
+SIZING_KBPS = 320
+
+# Distância mínima entre o escritor e o leitor mais atrasado: o trecho
+# que o próximo pedaço vindo da origem vai sobrescrever.
+GUARD_BYTES = 256 * 1024
+
+# Opções de "voltar" no player (segundos), limitadas pela janela.
+REWIND_STEPS = (30, 60, 120, 300, 600, 1800)
+
+# <id da rádio>-<pid>-<n>.ring; o <n> separa relays da mesma rádio que
+# se sobrepõem (um encerrando, outro começando) no mesmo processo.
+_RING_NAME = re.compile(r"-(\d+)(?:-\d+)?\.ring$")
+_serial = itertools.count()
+
+
+def enabled() -> bool:
+    return settings.RELAY_ENABLED and settings.TIMESHIFT_MINUTES > 0
+
+
+def _byte_rate() -> float:
+    """Bytes por segundo na taxa de dimensionamento."""
+    return SIZING_KBPS * 1000 / 8
+
+
+def capacity() -> int:
+    """Bytes do arquivo de cada rádio."""
+    wanted = int(settings.TIMESHIFT_MINUTES * 60 * _byte_rate()) + 2 * GUARD_BYTES
+    return min(wanted, int(settings.TIMESHIFT_MAX_MB * 2**20))
+
+
+def max_delay() -> float:
+    """Atraso máximo pedido ao relay, em segundos.
+
+    TIMESHIFT_MINUTES, a menos que TIMESHIFT_MAX_MB corte o arquivo:
+    aí vale o que cabe nele na taxa de dimensionamento.
+    """
+    fits = (capacity() - 2 * GUARD_BYTES) / _byte_rate()
+    return max(0.0, min(settings.TIMESHIFT_MINUTES * 60, fits))
+
+
+class RingFile:
+    """Arquivo de tamanho fixo mapeado em memória para o buffer de uma rádio.
+
+    Contado por referência: o relay que o cria segura uma, cada ouvinte
+    outra (acquire/release). O mapa só fecha quando a última sai — um
+    ouvinte atrasado ainda pode estar lendo depois que o relay encerrou.
+    """
+
+    def __init__(self, station_id: str, size: int):
+        os.makedirs(settings.TIMESHIFT_DIR, exist_ok=True)
+        name = f"{station_id}-{os.getpid()}-{next(_serial)}.ring"
+        self.path = os.path.join(settings.TIMESHIFT_DIR, name)
+        self.size = size
+        try:
+            with open(self.path, "w+b") as fh:
+                fh.truncate(size)
+                self.data = mmap.mmap(fh.fileno(), size)
+        except BaseException:
+            # Disco cheio ou mmap recusado: o arquivo criado não fica para trás.
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            raise
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Mais uma referência; False se o arquivo já foi fechado."""
+        with self._lock:
+            if not self._refs:
+                return False
+            self._refs += 1
+            return True
+
+    def release(self):
+        """Larga uma referência; a última fecha o mapa e apaga o arquivo."""
+        with self._lock:
+            self._refs -= 1
+            if self._refs:
+                return
+        self._close()
+
+    def _close(self):
+        try:
+            self.data.close()
+        except BufferError:
+            # Um ouvinte ainda segura uma fatia; o mapa fecha quando ela
+            # for liberada, o arquivo pode sair já.
+            logger.info("Time-shift %s: mapa ainda em uso ao encerrar", self.path)
+        try:
+            os.remove(self.path)
+        except OSError as exc:
+            logger.warning("Time-shift: %s não removido: %s", self.path, exc)
+
+
+def remove_stale():
+    """Apaga arquivos de processos que já não existem (queda sem limpeza)."""
+    try:
+        names = os.listdir(settings.TIMESHIFT_DIR)
+    except OSError:
+        return
+    for name in names:
+        m = _RING_NAME.search(name)
+        if m is None or _alive(int(m.group(1))):
+            continue
+        try:
+            os.remove(os.path.join(settings.TIMESHIFT_DIR, name))
+            logger.info("Time-shift: %s de um processo encerrado removido", name)
+        except OSError as exc:
+            logger.warning("Time-shift: %s não removido: %s", name, exc)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass      # existe, de outro usuário
+    return True
+
+
+def rewind_options() -> dict:
+    """Rótulo -> atraso (s) das opções de voltar, a partir do ao vivo."""
+    options = {"Ao vivo": 0}
+    for step in REWIND_STEPS:
+        if step <= max_delay():
+            options[f"−{step} s" if step < 60 else f"−{step // 60} min"] = step
+    return options
+
+
+def resume_js() -> str:
+    """Script (para a página pai) que retoma o <audio> do relay após queda.
+
+    Instalado uma vez por aba na página pai. `waiting`, `stalled`,
+    `error` ou `ended` num áudio do relay marcam a queda (só a
+    primeira); enquanto ele não voltar a tocar, tenta a cada poucos
+    segundos — quando o navegador diz estar online — reabrir o stream
+    com `delay` = atraso atual + tempo parado, até o limite da janela.
+    """
+    return f"""
+        (function() {{
+            var w = window.parent;
+            if (w.__neurosResume) return;
+            var maxDelay = {max_delay():.0f};
+            var dropped = new WeakMap();
+            function isRelay(el) {{
+                return el && el.tagName === "AUDIO" && el.src.indexOf("/relay/") >= 0;
+            }}
+            function drop(e) {{
+                var a = e.target;
+                if (isRelay(a) && !dropped.has(a) && (e.type !== "waiting" || !a.paused)) {{
+                    dropped.set(a, Date.now());
+                }}
+            }}
+            ["waiting", "stalled", "error", "ended"].forEach(function(type) {{
+                w.document.addEventListener(type, drop, true);
+            }});
+            w.document.addEventListener("playing", function(e) {{
+                dropped.delete(e.target);
+            }}, true);
+            w.__neurosResume = w.setInterval(function() {{
+                if (w.navigator.onLine === false) return;
+                w.document.querySelectorAll("audio").forEach(function(a) {{
+                    var at = dropped.get(a);
+                    if (at === undefined || Date.now() - at < 4000) return;
+                    var url = new URL(a.src);
+                    var delay = Number(url.searchParams.get("delay") || 0);
+                    delay = Math.min(maxDelay, delay + (Date.now() - at) / 1000);
+                    url.searchParams.set("delay", delay.toFixed(1));
+                    dropped.set(a, Date.now());
+                    a.src = url.toString();
+                    a.play().catch(function() {{}});
+                }});
+            }}, 3000);
+        }})();
+    """